@@ -1,7 +1,6 @@
+import math
 import os
 import time
-import json
-import shutil
 import pandas as pd
 from datetime import datetime
 import threading
@@ -9,52 +8,81 @@ import logging
 from logging.handlers import RotatingFileHandler
 
 import ccxt
-import ta
 import config
+from utils import clock
 
 # ✅ Import indicator functions
 from utils.indicators import (
     calculate_indicators,
     detect_zigzag,
     detect_god_candle,
-    get_rsi,
-    get_macd,
-    get_bollinger_bands,
     is_god_candle,
     is_volume_spike,
-    get_sma
+    get_sma,
+    ZIGZAG_BOTTOM
 )
 
+# ✅ Import per-candle indicator memoization
+from utils.indicator_cache import indicator_cache, cached_atr, cached_rsi, cached_volume_mean
+
 # ✅ Import Telegram notifier
 from utils.telegram import notify
 
 # ✅ Import volatility scanner
 from utils.volatility_detector import get_top_volatile_tokens
 
+# ✅ Import OHLCV candle store + streaming indicators
+from utils.candle_store import CandleStore
+from utils.streaming_indicators import IndicatorEngine
+
+# ✅ Import shared market metadata (TTL refresh + disk snapshot)
+from utils.markets import get_market_cache
+
+# ✅ Import event-driven price watcher (WebSocket stream + REST fallback)
+from utils.price_watcher import PriceWatcher
+
 # ✅ Import exchange + daily loss logic
 from utils.exchange_utils import exchange, validate_api_keys, load_daily_loss
 
-# ✅ Import bot status controller
-from utils.bot_state import is_bot_active
+# ✅ Import shared rate limiter lanes (orders and stops go first)
+from utils.rate_limiter import RATE_LIMIT_ERRORS, all_rate_limiters, lane as rate_lane, run_in_lane
 
-import importlib
+# ✅ Import indicator registry (same columns the streaming engine provides, computed from scratch)
+from utils.indicator_registry import IndicatorFrame, params_from_config
+from utils.streaming_indicators import INDICATOR_COLUMNS
+INDICATOR_PARAMS = params_from_config(config)
 
-import threading
-from utils.scanner import scanner_loop
+# ✅ Import panel-wide entry evaluation (all symbols' latest candles at once)
+from utils.entry_panel import panel_from_engine, evaluate_panel, frame_key
+from utils.entry_rules import SIGNAL_RULES, SIGNAL_GATES, frame_values
+SIGNAL_PLAN = SIGNAL_RULES.compile()
+
+# ✅ Import journaled state store (open positions, alerts, trade times, daily loss)
+from utils.state_store import StateStore
 
+# ✅ Import position book (per-symbol locks, opening/open/closing transitions, snapshots for readers)
+from utils.position_book import PositionBook, OPENING, OPEN, CLOSING
 
-# Start Telegram command loop
-threading.Thread(
-    target=lambda: importlib.import_module("utils.telegram_command_poll").telegram_command_loop(),
-    daemon=True
-).start()
+# ✅ Import order tracker (entry orders followed in the background)
+from utils.order_tracker import OrderTracker, TERMINAL_STATUSES
+
+# ✅ Import trade journal (fills, PnL, fees, drawdown)
+from utils.trade_journal import trade_journal, fill_price
+
+# ✅ Import metrics (latency histograms, loop stage timings, gauges; Prometheus endpoint)
+from utils.metrics import metrics, start_server as start_metrics_server
+
+# ✅ Import bot status controller
+from utils.bot_state import is_bot_active
+
+from utils.scanner import scanner_loop
 
 
 
 # New features (unchanged)
 def volume_spike_vs_avg(df, lookback=20):
     try:
-        avg_volume = df['volume'].rolling(window=lookback).mean().iloc[-2]
+        avg_volume = cached_volume_mean(df, lookback).iloc[-2]
         current_volume = df['volume'].iloc[-1]
         return current_volume > avg_volume, current_volume, avg_volume
     except Exception as e:
@@ -65,7 +93,7 @@ def should_exit_stale_trade(entry_time, max_duration_minutes=60):
     if not entry_time:
         return False
     try:
-        now = time.time()
+        now = clock.now()
         return (now - entry_time) > (max_duration_minutes * 60)
     except:
         return False
@@ -78,10 +106,8 @@ def log_missed_trade_conditions(symbol, df15, reason, df1h=None):
         signal = df15['signal'].iloc[-1]
         price = df15['close'].iloc[-1]
         volume = df15['volume'].iloc[-1]
-        avg_volume = df15['volume'].rolling(window=int(config.volume_lookback)).mean().iloc[-1]
-        atr = ta.volatility.AverageTrueRange(
-            high=df15['high'], low=df15['low'], close=df15['close'], window=config.atr_period
-        ).average_true_range().iloc[-1]
+        avg_volume = cached_volume_mean(df15, int(config.volume_lookback)).iloc[-1]
+        atr = cached_atr(df15, config.atr_period).iloc[-1]
         
         sma_1h = df1h['sma'].iloc[-1] if df1h is not None else 0
         rsi_1h = df1h['rsi'].iloc[-1] if df1h is not None else 0
@@ -125,7 +151,7 @@ def price_moved_too_far(entry_signal_price, current_price, max_distance_percent=
 
 def filter_trend_with_rsi(df1h, rsi_threshold=65):
     try:
-        rsi_1h = get_rsi(df1h['close']).iloc[-1]
+        rsi_1h = cached_rsi(df1h).iloc[-1]
         return rsi_1h < rsi_threshold
     except:
         return True
@@ -141,19 +167,14 @@ logger = logging.getLogger(__name__)
 from collections import defaultdict
 no_entry_alerts_sent = defaultdict(float)
 
-# Exchange (unchanged)
+# Exchange: shared instance from utils.exchange_utils (config.exchange_backend = live exchange or offline fake)
 try:
-    exchange = ccxt.mexc({
-        'apiKey': config.mexc_api_key,
-        'secret': config.mexc_api_secret,
-        'enableRateLimit': True
-    })
     logger.info(f"✅ Using exchange: {exchange.id}")
     logger.info(f"fetchOHLCV supported: {exchange.has.get('fetchOHLCV')}")
     logger.info(f"Available timeframes: {exchange.timeframes}")
 except Exception as e:
     logger.error(f"Init failed: {e}")
-    notify(f"❌ Init failed: {e}")
+    notify(f"❌ Init failed: {e}", priority='critical')
     exit(1)
 
 # Config (unchanged, references config.py with tp_multipliers)
@@ -170,42 +191,44 @@ try:
     RSI_SELL = config.rsi_sell
 except AttributeError as e:
     logger.error(f"Missing config var: {e}")
-    notify(f"❌ Missing config var: {e}")
+    notify(f"❌ Missing config var: {e}", priority='critical')
     exit(1)
 
 # Daily loss tracking (unchanged)
 daily_loss = {'date': '', 'loss': 0.0, 'starting_balance': 0.0}
 DAILY_LOSS_FILE = 'daily_loss.json'
 
+# Legacy whole-file state, imported into the state journal on first start
 OPEN_POSITIONS_FILE = 'open_positions.json'
 RSI_ALERTS_FILE = 'rsi_alerts_sent.json'
 LAST_TRADE_FILE = 'last_trade_time.json'
-BACKUP_DIR = 'backups'
-os.makedirs(BACKUP_DIR, exist_ok=True)
 
-def load_json(fn):
+# ✅ State persists as an append-only journal of changed keys + periodic snapshots (utils/state_store.py)
+state_store = StateStore(
+    getattr(config, 'state_dir', 'state'),
+    fsync_sec=getattr(config, 'state_fsync_sec', 1.0),
+    compact_sec=getattr(config, 'state_compact_sec', 3600),
+    compact_records=getattr(config, 'state_compact_records', 5000)
+)
+
+def load_json(name, legacy_file=None):
     try:
-        return json.load(open(fn)) if os.path.exists(fn) else {}
+        return state_store.load(name, legacy_file)
     except Exception as e:
-        logger.error(f"Error loading {fn}: {e}")
-        notify(f"⚠️ Error loading {fn}: {e}")
+        logger.error(f"Error loading {name}: {e}")
+        notify(f"⚠️ Error loading {name}: {e}")
         return {}
 
-def save_json(fn, data):
+def save_json(name, data):
     try:
-        if os.path.exists(fn):
-            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-            shutil.copy(fn, os.path.join(BACKUP_DIR, f"{os.path.basename(fn)}_{ts}.bak"))
-        tmp = fn + '.tmp'
-        json.dump(data, open(tmp, 'w'), indent=2)
-        os.replace(tmp, fn)
+        state_store.save(name, data)
     except Exception as e:
-        logger.error(f"Error saving {fn}: {e}")
-        notify(f"⚠️ Error saving {fn}: {e}")
+        logger.error(f"Error saving {name}: {e}")
+        notify(f"⚠️ Error saving {name}: {e}")
 
 def load_daily_loss():
     try:
-        data = json.load(open(DAILY_LOSS_FILE)) if os.path.exists(DAILY_LOSS_FILE) else {}
+        data = state_store.load('daily_loss', DAILY_LOSS_FILE)
         today = datetime.now().strftime('%Y-%m-%d')
         if data.get('date') != today:
             return {'date': today, 'loss': 0.0, 'starting_balance': safe_fetch_balance()['free'].get('USDT', 0)}
@@ -215,26 +238,64 @@ def load_daily_loss():
         return {'date': datetime.now().strftime('%Y-%m-%d'), 'loss': 0.0, 'starting_balance': safe_fetch_balance()['free'].get('USDT', 0)}
 
 def save_daily_loss():
-    save_json(DAILY_LOSS_FILE, daily_loss)
+    save_json('daily_loss', daily_loss)
 
-rsi_alerts_sent = load_json(RSI_ALERTS_FILE)
-open_positions = load_json(OPEN_POSITIONS_FILE)
-last_trade_time = load_json(LAST_TRADE_FILE)
+_daily_loss_lock = threading.Lock()
+
+def add_daily_loss(amount):
+    # amount > 0 is a loss, < 0 a profit; positions managed in parallel settle here one at a time
+    with _daily_loss_lock:
+        daily_loss['loss'] += amount
+        save_daily_loss()
+
+rsi_alerts_sent = load_json('rsi_alerts_sent', RSI_ALERTS_FILE)
+open_positions = PositionBook(load_json('open_positions', OPEN_POSITIONS_FILE))
+last_trade_time = load_json('last_trade_time', LAST_TRADE_FILE)
 
 def save_state():
-    save_json(OPEN_POSITIONS_FILE, open_positions)
-    save_json(RSI_ALERTS_FILE, rsi_alerts_sent)
-    save_json(LAST_TRADE_FILE, last_trade_time)
+    # Only keys that changed since the last save hit the disk
+    save_json('open_positions', open_positions.snapshot())
+    save_json('rsi_alerts_sent', rsi_alerts_sent)
+    save_json('last_trade_time', last_trade_time)
+    save_json('pending_orders', order_tracker.snapshot())
+
+# ✅ Shared market metadata: also reused by utils/portfolio's exchange instance
+market_cache = get_market_cache(exchange)
+
+# ✅ Persistent candle store: only candles newer than the last stored one are fetched
+candle_store = CandleStore(
+    exchange,
+    max_candles=getattr(config, 'ohlcv_max_candles', 1000),
+    refresh_sec=getattr(config, 'ohlcv_refresh_sec', 5)
+)
+
+# ✅ Streaming indicators, updated in O(1) as the candle store appends/replaces candles
+indicator_engine = IndicatorEngine(
+    sma_period=config.sma_period,
+    atr_period=config.atr_period,
+    bb_period=config.bb_period,
+    bb_stddev=config.bb_stddev,
+    volume_lookback=int(config.volume_lookback),
+    max_history=getattr(config, 'ohlcv_max_candles', 1000),
+    zigzag_deviation=config.zigzag_deviation if getattr(config, 'use_zigzag_filter', False) else None
+)
+candle_store.add_listener(indicator_engine.on_candles)
+
+# Set while the async engine evaluates a symbol: candles it prefetched within this many seconds are read
+# from the store as they are, without the store planning another refresh (see evaluate_symbol)
+_store_only = threading.local()
 
 def safe_fetch_ohlcv(symbol, tf, max_retries=3, delay=5):
+    max_age = getattr(_store_only, 'max_age', None)
+    if max_age is not None:
+        age = candle_store.age(symbol, tf)
+        if age is not None and age <= max_age:
+            return candle_store.frame(symbol, tf)
     for attempt in range(max_retries):
         try:
-            data = exchange.fetch_ohlcv(symbol, tf)
-            if isinstance(data, list):
-                df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                return df
-            return None
+            if not candle_store.update(symbol, tf):
+                return None
+            return candle_store.frame(symbol, tf)
         except Exception as e:
             error_message = str(e)
             if hasattr(e, 'response'):
@@ -244,15 +305,28 @@ def safe_fetch_ohlcv(symbol, tf, max_retries=3, delay=5):
             elif hasattr(e, 'code'):
                 error_message += f"\nCode: {e.code}"
             logger.error(f"{symbol} {tf} fetch error on attempt {attempt + 1}: {error_message}")
-            if '429' in error_message or '403' in error_message or 'rate limit' in error_message.lower():
+            if attempt + 1 < max_retries:
+                metrics.inc('ohlcv_fetch_retries_total', timeframe=tf)
+            if isinstance(e, RATE_LIMIT_ERRORS) and getattr(config, 'shared_rate_limit', True):
+                # The shared limiter has already paused the bucket; the retry queues behind that backoff
+                logger.warning(f"Rate limited on {symbol} {tf}, retrying after limiter backoff")
+            elif '429' in error_message or '403' in error_message or 'rate limit' in error_message.lower():
                 logger.warning(f"Rate limit or forbidden error detected. Sleeping for 60 seconds...")
-                time.sleep(60)
+                clock.sleep(60)
             else:
-                time.sleep(delay)
+                clock.sleep(delay)
     logger.error(f"❌ Failed to fetch OHLCV for {symbol} ({tf}) after {max_retries} attempts.")
+    metrics.inc('ohlcv_fetch_failures_total', timeframe=tf)
     return None
 
+# ✅ Tickers prefetched by the async engine, reused for a couple of seconds
+_prefetched_tickers = {}
+PREFETCH_MAX_AGE_SEC = 2
+
 def safe_fetch_ticker(symbol, retries=3, delay=2):
+    cached = _prefetched_tickers.get(symbol)
+    if cached and clock.now() - cached[0] < PREFETCH_MAX_AGE_SEC:
+        return cached[1]
     for attempt in range(retries):
         try:
             t = exchange.fetch_ticker(symbol)
@@ -263,25 +337,30 @@ def safe_fetch_ticker(symbol, retries=3, delay=2):
             logger.error(f"{symbol} ticker error: {e}")
             notify(f"⚠️ {symbol} ticker error: {e}")
             if attempt < retries - 1:
-                time.sleep(delay * 2**attempt)
+                clock.sleep(delay * 2**attempt)
     return None
 
 def can_trade_now(symbol):
-    return (time.time() - last_trade_time.get(symbol, 0)) >= TRADE_COOLDOWN_SEC
+    return (clock.now() - last_trade_time.get(symbol, 0)) >= TRADE_COOLDOWN_SEC
 
 def validate_symbol(symbol):
     try:
-        mk = exchange.load_markets()
-        if symbol not in mk or not mk[symbol]['active']:
+        if not market_cache.is_tradable(symbol):
             notify(f"⚠️ {symbol} not tradable")
             return False, None
-        prec = mk[symbol]['precision']['amount']
+        prec = market_cache.amount_precision(symbol)
         return True, prec
     except Exception as e:
         logger.error(f"validate_symbol {symbol}: {e}")
         notify(f"⚠️ validate_symbol {symbol}: {e}")
         return False, None
 
+def attach_indicators(df, symbol, tf):
+    # Streamed columns when the engine is in sync with the frame, full recompute otherwise
+    if indicator_engine.attach(df, symbol, tf):
+        return df
+    return IndicatorFrame(df, INDICATOR_PARAMS).require(INDICATOR_COLUMNS)
+
 def prepare_indicators(df):
     if df is None or df.empty or len(df) < 50:
         print("Not enough data to calculate indicators.")
@@ -296,7 +375,7 @@ def prepare_indicators(df):
 
 def get_adaptive_rsi_levels(df, base_levels, atr_multiplier=1.5, atr_period=14):
     try:
-        atr = ta.volatility.AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=atr_period).average_true_range().iloc[-1]
+        atr = cached_atr(df, atr_period).iloc[-1]
         price = df['close'].iloc[-1]
         atr_ratio = atr / price
         scale = 1 + atr_ratio * atr_multiplier
@@ -307,39 +386,22 @@ def get_adaptive_rsi_levels(df, base_levels, atr_multiplier=1.5, atr_period=14):
         return base_levels
 
 def check_indicators(df15, df1h):
-    rsi = df15['rsi'].iloc[-1]
-    macd = df15['macd'].iloc[-1]
-    signal_macd = df15['signal'].iloc[-1]
-    upper_band = df15['upper_band'].iloc[-1]
-    lower_band = df15['lower_band'].iloc[-1]
-    close = df15['close'].iloc[-1]
-    volume = df15['volume'].iloc[-1]
-    prev_volume = df15['volume'].iloc[-2]
-    rsi_cond = rsi < 30
-    macd_cond = macd > signal_macd
-    boll_cond = close <= lower_band
-    vol_cond = volume > prev_volume
-    sma_1h = get_sma(df1h['close'], config.sma_period).iloc[-1]
-    trend_cond = close < sma_1h * 1.01
+    # Entry gates and buy / sell signal are SIGNAL_RULES in utils/entry_rules.py
+    values = frame_values(df15, df1h, SIGNAL_PLAN.fields)
+    values['sma_1h'] = get_sma(df1h['close'], config.sma_period).iloc[-1]
+    result = SIGNAL_PLAN.evaluate_row(values)
     signal = ''
-    if rsi_cond and macd_cond and boll_cond and vol_cond and trend_cond:
+    if result.strategy_passed('buy')[0]:
         signal = 'buy'
-    elif not rsi_cond and macd < signal_macd and close >= upper_band and vol_cond:
+    elif result.strategy_passed('sell')[0]:
         signal = 'sell'
     if is_god_candle(df15):
         return True, signal
-    true_count = sum([rsi_cond, macd_cond, boll_cond, vol_cond])
-    if true_count >= 3 and trend_cond:
-        return True, signal
-    if true_count == 2 and rsi_cond and vol_cond and trend_cond:
-        return True, signal
-    return False, signal
+    return any(result.strategy_passed(gate)[0] for gate in SIGNAL_GATES), signal
 
 def get_adaptive_rsi_sell(df, base=70, multiplier=1.5, min_rsi=60, max_rsi=80, atr_period=14):
     try:
-        atr = ta.volatility.AverageTrueRange(
-            high=df['high'], low=df['low'], close=df['close'], window=atr_period
-        ).average_true_range().iloc[-1]
+        atr = cached_atr(df, atr_period).iloc[-1]
         price = df['close'].iloc[-1]
         atr_ratio = atr / price
         adaptive_rsi = base + (atr_ratio * 100 * multiplier)
@@ -370,11 +432,26 @@ def is_hammer_candle(df):
 
 _last_good_balance = {'free': {'USDT': 0}}
 
+_last_balance_at = 0
+
+def apply_prefetched(balance=None, tickers=None):
+    global _last_good_balance, _last_balance_at
+    now = clock.now()
+    if balance:
+        _last_good_balance = balance
+        _last_balance_at = now
+    for sym, t in (tickers or {}).items():
+        if t and 'bid' in t and 'ask' in t:
+            _prefetched_tickers[sym] = (now, t)
+
 def safe_fetch_balance():
-    global _last_good_balance
+    global _last_good_balance, _last_balance_at
+    if clock.now() - _last_balance_at < PREFETCH_MAX_AGE_SEC:
+        return _last_good_balance
     try:
         balance = exchange.fetch_balance()
         _last_good_balance = balance
+        _last_balance_at = clock.now()
         return balance
     except Exception as e:
         notify(f"⚠️ fetch_balance error: {e}")
@@ -406,7 +483,7 @@ def monitor_orders(symbol):
 
         for tp in expected_tps:
             if all(abs(tp - active_price) > 0.001 for active_price in active_tp_prices):
-                tp_order_cancelled_time[symbol] = time.time()
+                tp_order_cancelled_time[symbol] = clock.now()
                 logger.info(f"🛑 Manual TP cancel detected for {symbol} at TP {tp:.4f} — pausing TP for 60s")
                 break
 
@@ -419,7 +496,7 @@ def monitor_orders(symbol):
 def set_take_profit(symbol, pos, api, logger):
     try:
         # 🚫 Respect delay after manual cancel
-        now = time.time()
+        now = clock.now()
         delay = getattr(config, "tp_reset_delay_sec", 60)
         if symbol in tp_order_cancelled_time and now - tp_order_cancelled_time[symbol] < delay:
             logger.info(f"⏳ Skipping TP setup for {symbol}, still in 60s delay window after cancel")
@@ -430,13 +507,10 @@ def set_take_profit(symbol, pos, api, logger):
             logger.warning(f"No OHLCV data for {symbol} in set_take_profit")
             return
 
-        atr = ta.volatility.AverageTrueRange(
-            high=df15['high'], low=df15['low'], close=df15['close'], window=config.atr_period
-        ).average_true_range().iloc[-1]
+        atr = cached_atr(df15, config.atr_period).iloc[-1]
 
         pos['tp_prices'] = []
-        market = api.markets.get(symbol, {})
-        min_cost = market.get('limits', {}).get('cost', {}).get('min', 1.0)  # Fallback = 1 USDT
+        min_cost = market_cache.min_cost_for(symbol, 1.0)  # Fallback = 1 USDT
 
         for i, mult in enumerate(config.tp_multipliers):
             tp_price = pos['entry_price'] + (atr * mult)
@@ -447,8 +521,11 @@ def set_take_profit(symbol, pos, api, logger):
                 logger.warning(f"⚠️ TP {i+1} for {symbol} skipped: order value {order_value:.4f} < min cost {min_cost} USDT")
                 continue
 
-            api.create_limit_sell_order(symbol, qty, tp_price)
+            order = api.create_limit_sell_order(symbol, qty, tp_price)
             pos['tp_prices'].append(tp_price)
+            # Filled on the exchange, not by a bot sell: record_tp_fills journals these as they fill
+            pos.setdefault('tp_orders', []).append(
+                {'id': str(order['id']), 'qty': qty, 'filled': 0.0, 'cost': 0.0, 'fee': 0.0})
             logger.info(f"✅ Set TP {i+1} for {symbol}: {qty} at {tp_price:.4f}")
 
         save_state()
@@ -458,88 +535,166 @@ def set_take_profit(symbol, pos, api, logger):
         notify(f"⚠️ set_take_profit {symbol}: {e}")
 
 
+def record_tp_fills(symbol):
+    # Journal whatever the exchange-side TP orders filled since the last look and shrink the position by it
+    with open_positions.edit(symbol) as pos:
+        if pos is None or not pos.get('tp_orders') or open_positions.state(symbol) == CLOSING:
+            return
+        still_open = []
+        for tp in pos['tp_orders']:
+            try:
+                order = exchange.fetch_order(tp['id'], symbol)
+            except ccxt.OrderNotFound:
+                continue
+            except Exception as e:
+                logger.warning(f"TP order {tp['id']} for {symbol}: {e}")
+                still_open.append(tp)
+                continue
+            filled = float(order.get('filled') or 0.0)
+            if filled > tp['filled'] + 1e-12:
+                qty = filled - tp['filled']
+                cost = float(order['cost']) if order.get('cost') else filled * fill_price(order, 0.0)
+                price = (cost - tp['cost']) / qty
+                fee = order.get('fee') or {}
+                fee_delta = None
+                if fee.get('cost') is not None:
+                    fee_delta = {'cost': float(fee['cost']) - tp['fee'], 'currency': fee.get('currency')}
+                    tp['fee'] = float(fee['cost'])
+                tp['filled'], tp['cost'] = filled, cost
+                trade_journal.record_fill(symbol, 'sell', price, qty, fee_delta)
+                pos['qty'] = max(pos['qty'] - qty, 0.0)
+                notify(f"🎯 TP filled {symbol}: {qty} @ {price:.4f} | Left: {pos['qty']}", priority='critical')
+            if order.get('status') not in TERMINAL_STATUSES:
+                still_open.append(tp)
+        pos['tp_orders'] = still_open
+        closed = pos['qty'] <= 0
+    if closed:
+        open_positions.remove(symbol)
+        price_watcher.unwatch(symbol)
+    save_state()
+
 def sync_positions():
     try:
         bal = safe_fetch_balance()
         usdt = bal['free'].get('USDT', 0)
         if usdt < MINIMUM_BALANCE:
             notify(f"⚠️ Low USDT: {usdt}")
-        actual = {}
+        held = set()
         for sym in config.symbols:
+            state = open_positions.state(sym)
+            if state in (OPENING, CLOSING):
+                continue  # an entry or exit is in flight; its own thread settles the position
             asset = sym.split('/')[0]
-            qty = bal['free'].get(asset, 0)
-            if qty > 0:
-                tk = safe_fetch_ticker(sym)
-                if tk:
-                    df15 = safe_fetch_ohlcv(sym, '15m')
-                    atr = ta.volatility.AverageTrueRange(
-                        high=df15['high'],
-                        low=df15['low'],
-                        close=df15['close'],
-                        window=14
-                    ).average_true_range().iloc[-1] if df15 is not None and not df15.empty else 0
-                    
-                    recent_cancel = tp_order_cancelled_time.get(sym, 0)
-                    if time.time() - recent_cancel < 60:
-                        logger.info(f"⏸️ Skipping TP setup for {sym}, recent manual cancel within 60s")
-                        continue  # Delay TP reset
-
-                    actual[sym] = {
-                        'entry_price': tk['last'],
-                        'qty': qty,
-                        'highest_price': tk['last'],
-                        'stop_loss': tk['last'] - (atr * config.stop_loss_atr_multiplier),
-                        'tps_triggered': [],
-                        'tp_prices': []
-                    }
-
-                    set_take_profit(sym, actual[sym], exchange, logger)
-        for sym in list(open_positions):
-            if sym not in actual:
-                open_positions.pop(sym, None)
-        open_positions.update(actual)
+            # Total, not free: quantity locked in resting TP orders is still held
+            qty = bal.get('total', bal['free']).get(asset, 0)
+            if qty <= 0:
+                continue
+            held.add(sym)
+            if state == OPEN:
+                # Known position: keep its entry, trailing and TP state, only follow the balance
+                with open_positions.edit(sym) as pos:
+                    if pos is not None and abs(pos['qty'] - qty) > 1e-12:
+                        logger.info(f"🔄 {sym} qty reconciled with balance: {pos['qty']} -> {qty}")
+                        pos['qty'] = qty
+                continue
+            tk = safe_fetch_ticker(sym)
+            if tk:
+                df15 = safe_fetch_ohlcv(sym, '15m')
+                atr = cached_atr(df15, 14).iloc[-1] if df15 is not None and not df15.empty else 0
+
+                recent_cancel = tp_order_cancelled_time.get(sym, 0)
+                if clock.now() - recent_cancel < 60:
+                    logger.info(f"⏸️ Skipping TP setup for {sym}, recent manual cancel within 60s")
+                    continue  # Delay TP reset
+
+                pos = {
+                    'entry_price': tk['last'],
+                    'qty': qty,
+                    'highest_price': tk['last'],
+                    'stop_loss': tk['last'] - (atr * config.stop_loss_atr_multiplier),
+                    'tps_triggered': [],
+                    'tp_prices': []
+                }
+                with open_positions.lock(sym):
+                    if open_positions.state(sym) is None:
+                        set_take_profit(sym, pos, exchange, logger)
+                        open_positions.put(sym, pos)
+        for sym in list(open_positions.keys()):
+            with open_positions.lock(sym):
+                if sym not in held and open_positions.state(sym) == OPEN:
+                    open_positions.remove(sym)
         save_state()
     except Exception as e:
         notify(f"⚠️ sync_positions: {e}")
 
 
+def settled_order(symbol, order):
+    # Market orders usually come back with only an id: look the fill up so it is booked at its real price
+    if order and order.get('id') and not (order.get('average') or order.get('cost')):
+        try:
+            order = exchange.fetch_order(order['id'], symbol) or order
+        except Exception as e:
+            logger.warning(f"fetch_order {symbol} {order['id']}: {e}")
+    return order
+
 def close_position(symbol, qty, price, reason):
-    try:
-        bal = exchange.fetch_balance()
-        avail = bal['free'].get(symbol.split('/')[0], 0)
-        if qty > avail: qty = avail
-        if qty <= 0:
-            open_positions.pop(symbol, None)
+    # Sells qty of the position; the rest (partial TP) stays open. Only one close per position runs at a time.
+    with open_positions.lock(symbol):
+        pos = open_positions.begin_close(symbol)
+        if pos is None:
+            logger.info(f"{symbol} has no position or is already closing, skipping sell ({reason})")
+            return
+        remaining = pos['qty'] - qty if qty < pos['qty'] else 0.0
+        try:
+            bal = exchange.fetch_balance()
+            avail = bal['free'].get(symbol.split('/')[0], 0)
+            if qty > avail: qty = avail
+            if qty <= 0:
+                open_positions.end_close(symbol)
+                price_watcher.unwatch(symbol)
+                save_state()
+                return
+            prec = market_cache.amount_precision(symbol)
+            qty = round(qty, prec)
+            if qty > avail:
+                qty = math.floor(avail * 10 ** prec) / 10 ** prec  # rounding must not sell more than is held
+            order = settled_order(symbol, exchange.create_market_sell_order(symbol, qty))
+            trade_journal.record_order(symbol, 'sell', order, price, qty)
+            price = fill_price(order, price)
+            fill_status = f"Filled: {order['filled'] / qty * 100:.0f}%" if order.get('filled') else "Unknown"
+            entry_price = pos.get('entry_price', price)
+            pl = (price - entry_price) * qty
+            time_held = (clock.now() - last_trade_time.get(symbol, clock.now())) / 60
+            message = (
+                f"✅ SELL {symbol} qty:{qty} @ {price:.4f} ({reason})\n"
+                f"🔸 Position Size: ${qty * price:.2f} | P/L: ${pl:.2f}\n"
+                f"🔸 Time Held: {time_held:.0f}min\n"
+                f"🔸 Order Status: {fill_status}\n"
+                f"🔸 Daily Loss: ${daily_loss['loss']:.2f} | Remaining: ${(config.max_daily_loss_percent / 100 * daily_loss['starting_balance']) - daily_loss['loss']:.2f}"
+            )
+            notify(message, priority='critical')
+            logger.info(message)
+            open_positions.end_close(symbol, remaining)
+            if remaining > 0:
+                watch_position(symbol)
+            else:
+                price_watcher.unwatch(symbol)
             save_state()
+        except Exception as e:
+            open_positions.end_close(symbol, pos['qty'])  # nothing sold: back to its previous state
+            notify(f"🚫 close_position {symbol}: {e}", priority='critical')
+            logger.error(f"close_position {symbol}: {e}")
+
+def manage_position(symbol, price=None):
+    # One check per position at a time (scan loop, price watcher); other symbols are managed in parallel
+    with open_positions.edit(symbol) as pos:
+        if pos is None or open_positions.state(symbol) == CLOSING:
             return
-        mk = exchange.load_markets()
-        prec = mk[symbol]['precision']['amount']
-        qty = round(qty, prec)
-        order = exchange.create_market_sell_order(symbol, qty)
-        fill_status = f"Filled: {order['filled'] / qty * 100:.0f}%" if order.get('filled') else "Unknown"
-        pos = open_positions.get(symbol, {})
-        entry_price = pos.get('entry_price', price)
-        pl = (price - entry_price) * qty
-        time_held = (time.time() - last_trade_time.get(symbol, time.time())) / 60
-        message = (
-            f"✅ SELL {symbol} qty:{qty} @ {price:.4f} ({reason})\n"
-            f"🔸 Position Size: ${qty * price:.2f} | P/L: ${pl:.2f}\n"
-            f"🔸 Time Held: {time_held:.0f}min\n"
-            f"🔸 Order Status: {fill_status}\n"
-            f"🔸 Daily Loss: ${daily_loss['loss']:.2f} | Remaining: ${(config.max_daily_loss_percent / 100 * daily_loss['starting_balance']) - daily_loss['loss']:.2f}"
-        )
-        notify(message)
-        logger.info(message)
-        open_positions.pop(symbol, None)
-        save_state()
-    except Exception as e:
-        notify(f"🚫 close_position {symbol}: {e}")
-        logger.error(f"close_position {symbol}: {e}")
+        _manage_position(symbol, pos, price)
 
-def manage_position(symbol):
-    if symbol not in open_positions:
-        return
-    tk = safe_fetch_ticker(symbol)
+def _manage_position(symbol, pos, price):
+    # price comes from the price watcher when it triggered this check; otherwise fetch a ticker
+    tk = {'last': price} if price is not None else safe_fetch_ticker(symbol)
     if not tk:
         logger.warning(f"No ticker data for {symbol} in manage_position")
         return
@@ -547,32 +702,28 @@ def manage_position(symbol):
     if df15 is None or df15.empty or len(df15) < 20:
         logger.warning(f"Insufficient OHLCV data for {symbol} in manage_position")
         return
-    rsi15 = get_rsi(df15['close']).iloc[-1]
+    df15 = attach_indicators(df15, symbol, '15m')
+    rsi15 = df15['rsi'].iloc[-1]
     macd = df15['macd'].iloc[-1]
     signal_macd = df15['signal'].iloc[-1]
-    atr = ta.volatility.AverageTrueRange(
-        high=df15['high'], low=df15['low'], close=df15['close'], window=14
-    ).average_true_range().iloc[-1]
+    atr = cached_atr(df15, 14).iloc[-1]
     current_price = tk['last']
-    pos = open_positions[symbol]
+    pos['atr'] = atr  # keeps the price watcher band on the same ATR as these checks
     pos['highest_price'] = max(pos['highest_price'], current_price)
-    time_held = (time.time() - last_trade_time.get(symbol, time.time())) / 60
+    time_held = (clock.now() - last_trade_time.get(symbol, clock.now())) / 60
     df1h = safe_fetch_ohlcv(symbol, '1h')
     sma_1h = get_sma(df1h['close'], config.sma_period).iloc[-1] if df1h is not None else 0
     trend = "Below SMA" if current_price < sma_1h else "Above SMA" if sma_1h > 0 else "Unknown"
     atr_stop_loss = pos['entry_price'] - (atr * config.stop_loss_atr_multiplier)
     if current_price <= atr_stop_loss:
         loss = (pos['entry_price'] - current_price) * pos['qty']
-        global daily_loss
-        daily_loss['loss'] += loss
-        save_daily_loss()
+        add_daily_loss(loss)
         close_position(symbol, pos['qty'], current_price, f"ATR Stop-loss | SMA Trend: {trend}")
         return
     trailing_threshold = pos['highest_price'] - (atr * config.trailing_atr_multiplier)
     if current_price <= trailing_threshold:
         profit_loss = (current_price - pos['entry_price']) * pos['qty']
-        daily_loss['loss'] -= profit_loss
-        save_daily_loss()
+        add_daily_loss(-profit_loss)
         close_position(symbol, pos['qty'], current_price, f"ATR Trailing stop | SMA Trend: {trend}")
         return
     for i, tp in enumerate(pos['tp_prices']):
@@ -581,18 +732,13 @@ def manage_position(symbol):
                 qty_to_sell = pos['qty'] * (0.5 if i < len(pos['tp_prices']) - 1 else 1.0)
                 if qty_to_sell > 0:
                     profit = (current_price - pos['entry_price']) * qty_to_sell
-                    daily_loss['loss'] -= profit
-                    save_daily_loss()
-                    close_position(symbol, qty_to_sell, current_price, f"TP {i+1} (ATR x {config.tp_multipliers[i]}) | SMA Trend: {trend}")
+                    add_daily_loss(-profit)
                     pos['tps_triggered'].append(tp)
-                    pos['qty'] -= qty_to_sell
-                    if pos['qty'] <= 0:
-                        open_positions.pop(symbol, None)
-                    save_state()
+                    close_position(symbol, qty_to_sell, current_price, f"TP {i+1} (ATR x {config.tp_multipliers[i]}) | SMA Trend: {trend}")
                     return
             else:
                 reason = "RSI ≤ 50" if rsi15 <= 50 else "MACD Bullish"
-                notify(f"🚫 TP {i+1} Skipped for {symbol}: {reason} | RSI: {rsi15:.2f} | MACD: {macd:.4f}/{signal:.4f}")
+                notify(f"🚫 TP {i+1} Skipped for {symbol}: {reason} | RSI: {rsi15:.2f} | MACD: {macd:.4f}/{signal_macd:.4f}")
                 logger.info(f"TP {i+1} Skipped for {symbol}: {reason}")
     adaptive_rsi_sell = get_adaptive_rsi_sell(
         df15, base=config.rsi_sell_base, multiplier=config.rsi_atr_multiplier,
@@ -600,30 +746,172 @@ def manage_position(symbol):
     )
     if rsi15 >= adaptive_rsi_sell:
         profit_loss = (current_price - pos['entry_price']) * pos['qty']
-        daily_loss['loss'] -= profit_loss
-        save_daily_loss()
+        add_daily_loss(-profit_loss)
         close_position(symbol, pos['qty'], current_price, f"RSI sell {rsi15:.2f} ≥ Adaptive {adaptive_rsi_sell} | SMA Trend: {trend}")
         return
 
 
+# ✅ Price watcher: stop / trailing / TP checks run when a price update leaves the position's band
+TRAILING_RATCHET_PCT = getattr(config, 'trailing_ratchet_pct', 0.001)
+
+def position_band(symbol):
+    # (low, high): at or below low a stop may trigger; at or above high a TP may trigger or the trailing stop moves up
+    with open_positions.lock(symbol):
+        pos = open_positions[symbol]
+        atr = pos.get('atr')
+        if not atr:
+            df15 = safe_fetch_ohlcv(symbol, '15m')
+            atr = cached_atr(df15, 14).iloc[-1] if df15 is not None and not df15.empty else 0
+            with open_positions.edit(symbol) as pos:
+                pos['atr'] = atr
+    stop_loss = pos['entry_price'] - (atr * config.stop_loss_atr_multiplier)
+    trailing = pos['highest_price'] - (atr * config.trailing_atr_multiplier)
+    next_high = pos['highest_price'] * (1 + TRAILING_RATCHET_PCT)
+    tps_ahead = [tp for tp in pos.get('tp_prices', []) if tp not in pos.get('tps_triggered', []) and tp > pos['highest_price']]
+    return max(stop_loss, trailing), min([next_high] + tps_ahead)
+
+def watch_position(symbol):
+    with open_positions.lock(symbol):
+        if symbol in open_positions:
+            low, high = position_band(symbol)
+            price_watcher.watch(symbol, low, high)
+        else:
+            price_watcher.unwatch(symbol)
+
+def on_price_cross(symbol, price):
+    with open_positions.lock(symbol):
+        pos = open_positions.get(symbol)
+        if pos is None:
+            price_watcher.unwatch(symbol)
+            return
+        low, _ = position_band(symbol)
+        tp_reached = any(price >= tp for tp in pos.get('tp_prices', []) if tp not in pos.get('tps_triggered', []))
+        if price > low and not tp_reached:
+            # Just a new high: move the trailing stop up locally, no exchange calls
+            with open_positions.edit(symbol) as pos:
+                pos['highest_price'] = max(pos['highest_price'], price)
+        else:
+            # Stop / take-profit exits jump the rate limiter queue
+            with rate_lane('critical'):
+                manage_position(symbol, price=price)
+        watch_position(symbol)
+
+def sync_watches():
+    for symbol in list(open_positions.keys()):
+        watch_position(symbol)
+    for symbol in price_watcher.watched():
+        if symbol not in open_positions:
+            price_watcher.unwatch(symbol)
+
+price_watcher = PriceWatcher(
+    exchange,
+    on_price_cross,
+    ws_url=getattr(config, 'price_ws_url', None) if getattr(config, 'price_watcher_mode', 'ws') == 'ws' else None,
+    poll_sec=getattr(config, 'price_poll_sec', 2),
+    stale_sec=getattr(config, 'price_stale_sec', None)
+)
+
+def start_price_watcher():
+    if price_watcher.ws_url and exchange.id == 'fake':
+        # Offline runs stream from a local stand-in fed by the fake market
+        from utils.fake_exchange import FakePriceServer
+        price_watcher.ws_url = FakePriceServer(exchange).start()
+    sync_watches()
+    price_watcher.start()
+
+
+# ✅ Entry order fills: positions grow with each (partial) fill, TPs are set once the order is done
+def on_entry_fill(tracked, qty, price, fee):
+    symbol = tracked.symbol
+    trade_journal.record_fill(symbol, 'buy', price, qty, fee)
+    with open_positions.edit(symbol) as pos:
+        if pos is None:
+            open_positions.put(symbol, {
+                'entry_price': price,
+                'qty': qty,
+                'highest_price': price,
+                'tps_triggered': [],
+                'tp_prices': [],
+                'atr': tracked.context.get('atr')
+            }, state=OPENING)
+            rsi_alerts_sent[tracked.context['key']] = True
+            last_trade_time[symbol] = clock.now()
+        else:
+            total = pos['qty'] + qty
+            pos['entry_price'] = (pos['entry_price'] * pos['qty'] + price * qty) / total
+            pos['qty'] = total
+    logger.info(f"🟢 Fill {symbol}: {qty} @ {price:.4f} ({tracked.fill_ratio * 100:.0f}% of {tracked.qty})")
+    watch_position(symbol)
+    save_state()
+
+def on_entry_done(tracked):
+    symbol = tracked.symbol
+    pos = open_positions.get(symbol)
+    if tracked.filled <= 0 or pos is None:
+        open_positions.release(symbol)
+        logger.warning(f"Order not filled for {symbol}: Status {tracked.status}, Filled: {tracked.filled}/{tracked.qty}")
+        notify(f"🚫 Order not filled for {symbol}. Status: {tracked.status} | Fill: {tracked.fill_ratio * 100:.0f}%",
+               priority='critical')
+        save_state()
+        return
+
+    with open_positions.edit(symbol) as pos:
+        if open_positions.state(symbol) == OPENING:
+            open_positions.mark(symbol, OPEN)
+        set_take_profit(symbol, pos, exchange, logger)
+    watch_position(symbol)
+    save_state()
+
+    atr = tracked.context.get('atr') or pos.get('atr') or 0
+    tp_prices = [pos['entry_price'] + (atr * mult) for mult in config.tp_multipliers]
+    outcome = "✅ Entry Confirmed!" if tracked.status == 'filled' else \
+        f"🟡 Partially filled ({tracked.fill_ratio * 100:.0f}%), rest cancelled after {tracked.reprices} re-price(s)"
+    message = (
+        f"{tracked.context.get('headline', f'📈 Entry: {symbol}')}\n"
+        f"💰 Price: {pos['entry_price']:.4f} | Limit Order\n"
+        f"{tracked.context.get('details', '')}\n"
+        f"🎯 TPs: {', '.join([f'${p:.4f}' for p in tp_prices])}\n"
+        f"🧮 Position Size: ${pos['qty'] * pos['entry_price']:.2f}\n"
+        f"{outcome}"
+    )
+    notify(message, priority='critical')
+    logger.info(message)
+
+order_tracker = OrderTracker(
+    exchange,
+    on_fill=on_entry_fill,
+    on_done=on_entry_done,
+    poll_min_sec=getattr(config, 'order_poll_min_sec', 0.5),
+    poll_max_sec=getattr(config, 'order_poll_max_sec', 10),
+    backoff=getattr(config, 'order_poll_backoff', 1.6),
+    stale_sec=getattr(config, 'order_stale_sec', 120),
+    stale_action=getattr(config, 'order_stale_action', 'cancel'),
+    max_reprices=getattr(config, 'order_max_reprices', 2),
+    reprice_offset=getattr(config, 'limit_order_offset', 0.0),
+    round_qty=lambda symbol, qty: round(qty, market_cache.amount_precision(symbol)),
+    not_found_polls=getattr(config, 'order_not_found_polls', 3)
+)
+
+
+@run_in_lane('critical')
 def panic_close_all_positions():
     from utils.telegram import notify
     for symbol, pos in list(open_positions.items()):
         try:
             qty = pos.get('qty')
-            price = pos.get('entry_price')
+            price = price_watcher.last_price(symbol) or pos.get('entry_price')  # fallback only, the fill is looked up
             if qty and qty > 0:
                 close_position(symbol, qty, price, "🚨 PANIC CLOSE via Telegram")
-                time.sleep(1)
+                clock.sleep(1)
         except Exception as e:
-            notify(f"⚠️ Failed to close {symbol}: {e}")
+            notify(f"⚠️ Failed to close {symbol}: {e}", priority='critical')
 
 
+@run_in_lane('critical')
 def cancel_all_orders():
     from utils.telegram import notify
     try:
-        mk = exchange.load_markets()
-        symbols = config.symbols  # You already have this defined in your config
+        symbols = list(dict.fromkeys(list(config.symbols) + [t.symbol for t in order_tracker.pending()]))
 
         for symbol in symbols:
             try:
@@ -634,17 +922,41 @@ def cancel_all_orders():
             except Exception as sym_err:
                 logger.warning(f"⚠️ Could not fetch/cancel orders for {symbol}: {sym_err}")
         
+        order_tracker.nudge()  # tracked entries see their cancellation on the next poll
         notify("✅ All pending orders cancelled via Telegram.")
         
     except Exception as e:
         logger.error(f"cancel_all_orders failed: {e}")
-        notify(f"⚠️ Failed to cancel orders: {e}")
+        notify(f"⚠️ Failed to cancel orders: {e}", priority='critical')
+
+
 
 
+# ✅ Entry conditions for the whole universe, evaluated once per cycle after candles are fetched
+_entry_outcomes = {}  # symbol -> (frame key, (passed, strategy, explanation))
+
+def evaluate_entry_panel(symbols):
+    global _entry_outcomes
+    with metrics.timer('stage_seconds', stage='evaluate_panel'):
+        panel = panel_from_engine(symbols, indicator_engine, candle_store)
+        outcomes = evaluate_panel(panel).outcomes()
+    _entry_outcomes = {sym: (key, outcomes[sym]) for sym, key in zip(panel.symbols, panel.keys) if key}
+
+def entry_outcome(symbol, df15, df1h):
+    # Panel result when it was computed from these exact candles, otherwise the single-symbol evaluation
+    cached = _entry_outcomes.get(symbol)
+    if cached is not None and cached[0] == frame_key(df15, df1h):
+        return cached[1]
+    from utils.entry_conditions import evaluate_all_entry_conditions
+    return evaluate_all_entry_conditions(df15, df1h, config)
 
 
 def trade(symbol, df15, df1h, prec):
-    if len(open_positions) >= config.max_concurrent_trades:
+    if open_positions.state(symbol) is not None or order_tracker.pending(symbol):
+        logger.info(f"{symbol} already has a position or a working entry, skipping")
+        return
+
+    if open_positions.active_count() >= config.max_concurrent_trades:
         logger.info(f"Max concurrent trades reached ({config.max_concurrent_trades}), skipping {symbol}")
         return
 
@@ -661,7 +973,7 @@ def trade(symbol, df15, df1h, prec):
     global daily_loss
     if daily_loss['loss'] / daily_loss['starting_balance'] >= config.max_daily_loss_percent / 100:
         logger.info(f"Daily loss limit reached, skipping {symbol}")
-        notify(f"🚫 Daily loss limit reached for {symbol} | Daily Loss: ${daily_loss['loss']:.2f}")
+        notify(f"🚫 Daily loss limit reached for {symbol} | Daily Loss: ${daily_loss['loss']:.2f}", priority='critical')
         return
 
     # === Budget Calculation ===
@@ -675,9 +987,7 @@ def trade(symbol, df15, df1h, prec):
     price = df15['close'].iloc[-1]
     lower_bb_15m = df15['lower_band'].iloc[-1]
     sma_1h = df1h['sma'].iloc[-1]
-    atr = ta.volatility.AverageTrueRange(
-        high=df15['high'], low=df15['low'], close=df15['close'], window=config.atr_period
-    ).average_true_range().iloc[-1]
+    atr = cached_atr(df15, config.atr_period).iloc[-1]
     hammer = is_hammer_candle(df15)
     trend = "Below SMA" if price < sma_1h else "Above SMA"
 
@@ -686,16 +996,21 @@ def trade(symbol, df15, df1h, prec):
         f"Price: {price:.4f}, Lower BB: {lower_bb_15m:.4f}, SMA(1h): {sma_1h:.4f}, ATR: {atr:.4f}"
     )
 
-    from utils.entry_conditions import evaluate_all_entry_conditions
-    passed, strategy, explanation = evaluate_all_entry_conditions(df15, df1h, config)
+    with metrics.timer('stage_seconds', stage='evaluate'):
+        passed, strategy, explanation = entry_outcome(symbol, df15, df1h)
 
     if not passed:
-        now = time.time()
+        now = clock.now()
         if now - no_entry_alerts_sent.get(symbol, 0) > 120:
             log_missed_trade_conditions(symbol, df15, explanation, df1h)
             no_entry_alerts_sent[symbol] = now
         return
 
+    # 🔀 Optional ZigZag confirmation: only enter after the latest swing turned up from a bottom
+    if getattr(config, 'use_zigzag_filter', False) and indicator_engine.zigzag_last_type(symbol, '15m') != ZIGZAG_BOTTOM:
+        logger.info(f"ZigZag filter: last swing for {symbol} is not a bottom, skipping")
+        return
+
     logger.info(f"✅ Entry Logic Passed: {strategy} | {explanation}")
     adaptive_rsi_levels = get_adaptive_rsi_levels(df15, config.rsi_entry_zones,
                                                   atr_multiplier=config.rsi_atr_multiplier,
@@ -719,56 +1034,46 @@ def trade(symbol, df15, df1h, prec):
                     logger.error(f"No ticker data for {symbol}, skipping")
                     continue
 
-                limit_price = ticker['ask'] * (1 + config.limit_order_offset)
-                order = exchange.create_limit_buy_order(symbol, qty, limit_price)
-                time.sleep(1.5)
-                oi = exchange.fetch_order(order['id'], symbol)
-                fill_status = f"{oi['filled'] / qty * 100:.0f}%" if oi.get('filled') else "Unknown"
-
-                if oi['status'] == 'closed' and oi['filled'] >= qty * 0.99:
-                    open_positions[symbol] = {
-                        'entry_price': oi.get('average', price),
-                        'qty': oi['filled'],
-                        'highest_price': price,
-                        'tps_triggered': [],
-                        'tp_prices': [],
-                        'atr': atr
-                    }
-                    set_take_profit(symbol, open_positions[symbol], exchange, logger)
-                    rsi_alerts_sent[key] = True
-                    last_trade_time[symbol] = time.time()
-                    save_state()
-
-                    avg_volume = df15['volume'].rolling(window=config.volume_lookback).mean().iloc[-1]
-                    tp_prices = [open_positions[symbol]['entry_price'] + (atr * mult) for mult in config.tp_multipliers]
-
-                    message = (
+                # Claim the slot before the order exists so concurrent entries can't overshoot max_concurrent_trades
+                if not open_positions.reserve(symbol, config.max_concurrent_trades):
+                    logger.info(f"Max concurrent trades reached ({config.max_concurrent_trades}), skipping {symbol}")
+                    return
+                limit_price = ticker['ask'] * (1 + getattr(config, 'limit_order_offset', 0.0))
+                try:
+                    with metrics.timer('stage_seconds', stage='order'):
+                        order = exchange.create_limit_buy_order(symbol, qty, limit_price)
+                except Exception:
+                    open_positions.release(symbol)
+                    raise
+
+                avg_volume = cached_volume_mean(df15, int(config.volume_lookback)).iloc[-1]
+                context = {
+                    'key': key,
+                    'atr': float(atr),
+                    'headline': (
                         f"📈 Entry Signal: {symbol} @ RSI ≈ {lvl} (±{config.rsi_tolerance}){' with Hammer' if hammer else ''}\n"
-                        f"💡 Strategy: {strategy}\n"
-                        f"💰 Price: {oi.get('average', price):.4f} | Limit Order\n"
+                        f"💡 Strategy: {strategy}"
+                    ),
+                    'details': (
                         f"📊 RSI(15m): {current_rsi_15m:.2f} | RSI(1h): {current_rsi_1h:.2f}\n"
                         f"📊 MACD(15m): {macd_15m:.4f} | MACD(1h): {macd_1h:.4f}\n"
                         f"📊 Bollinger: Lower BB: {lower_bb_15m:.4f} | Price: {price:.4f}\n"
                         f"📊 Volume: {df15['volume'].iloc[-1]:.0f} ≥ Avg: {avg_volume:.0f}\n"
                         f"📊 SMA Trend: {trend}\n"
-                        f"📊 ATR: {atr:.4f}\n"
-                        f"🎯 TPs: {', '.join([f'${p:.4f}' for p in tp_prices])}\n"
-                        f"🧮 Position Size: ${qty * price:.2f}\n"
-                        f"✅ Entry Confirmed!"
-                    )
-
-                    notify(message)
-                    logger.info(message)
-                    return
-                else:
-                    logger.warning(f"Order not filled for {symbol}: Status {oi.get('status')}, Filled: {oi.get('filled')}/{qty}")
-                    notify(f"🚫 Order not filled for {symbol}. Status: {oi.get('status')} | Fill: {fill_status}")
+                        f"📊 ATR: {atr:.4f}"
+                    ),
+                }
+                # Fills, TPs and the entry message happen in on_entry_fill / on_entry_done; the scan moves on
+                order_tracker.track(symbol, 'buy', order, qty, limit_price, context)
+                logger.info(f"📨 Limit buy {symbol} {qty} @ {limit_price:.4f} placed, tracking fills")
+                save_state()
+                return
             except Exception as e:
                 logger.error(f"Trade error for {symbol}: {e}")
-                notify(f"❌ Trade error for {symbol}: {e}")
+                notify(f"❌ Trade error for {symbol}: {e}", priority='critical')
                 return
         else:
-            now = time.time()
+            now = clock.now()
             if now - no_entry_alerts_sent.get(symbol, 0) > 120:
                 log_missed_trade_conditions(symbol, df15, f"Not within RSI tolerance ({lvl})", df1h)
                 no_entry_alerts_sent[symbol] = now
@@ -777,6 +1082,138 @@ def trade(symbol, df15, df1h, prec):
 
 
 
+# Stages in metrics' stage_seconds: scan (select_symbols) and prefetch / evaluate_panel (async engine) once
+# per cycle; fetch, indicators, manage, evaluate and order once per symbol (fetch / indicators per timeframe)
+def select_symbols():
+    with metrics.timer('stage_seconds', stage='scan'):
+        return _select_symbols()
+
+
+def _select_symbols():
+    syms = config.symbols
+
+    # 🔍 Volatility Scanner
+    if getattr(config, 'enable_volatility_scan', False):
+        try:
+            scan_filters = {k: v for k, v in config.volatility_filters.items() if k != 'scan_interval'}
+            volatile = get_top_volatile_tokens(exchange, **scan_filters)
+            syms = [sym for sym, _, _ in volatile if sym not in open_positions]
+
+            for sym, pct, vol in volatile:
+                notify(f"🔥 Volatile Token Detected: {sym} | {pct:.2f}% | Vol ${vol:,.0f}")
+                logger.info(f"🔥 Volatile Token: {sym} | Change: {pct:.2f}% | Vol: ${vol:,.0f}")
+
+        except Exception as e:
+            logger.warning(f"⚠️ Volatility scan failed: {e}")
+            syms = config.symbols
+
+    return syms
+
+
+def load_symbol_frames(sym, throttle=0.0):
+    # 15m Data
+    with metrics.timer('stage_seconds', stage='fetch'):
+        df15 = safe_fetch_ohlcv(sym, '15m')
+    if df15 is not None and not df15.empty:
+        with metrics.timer('stage_seconds', stage='indicators'):
+            df15, ok15 = prepare_indicators(df15)
+            if ok15:
+                df15 = attach_indicators(df15, sym, '15m')
+    if throttle:
+        clock.sleep(throttle)
+
+    # 1h Data
+    with metrics.timer('stage_seconds', stage='fetch'):
+        df1h = safe_fetch_ohlcv(sym, '1h')
+    if df1h is not None and not df1h.empty:
+        with metrics.timer('stage_seconds', stage='indicators'):
+            df1h, ok1h = prepare_indicators(df1h)
+            if ok1h:
+                df1h = attach_indicators(df1h, sym, '1h')
+    if throttle:
+        clock.sleep(throttle)
+
+    return df15, df1h
+
+
+def process_symbol(sym, df15, df1h):
+    if df15.get('rsi') is None or df1h.get('rsi') is None:
+        logger.warning(f"⚠️ {sym}: Indicators not ready, skipping")
+        return
+
+    # Manage position
+    with metrics.timer('stage_seconds', stage='manage'):
+        manage_position(sym)
+
+    try:
+        prec = market_cache.amount_precision(sym)
+    except KeyError as e:
+        logger.warning(f"⚠️ {sym}: {e}, skipping entry")
+        return
+    trade(sym, df15, df1h, prec)
+
+
+def log_cycle_stats():
+    cache_stats = indicator_cache.stats()
+    logger.info(
+        f"🧮 Indicator cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}) | {cache_stats['evictions']} evictions"
+    )
+    if hasattr(exchange, 'summary'):
+        requests = exchange.summary()
+        logger.info(
+            f"🔗 Exchange reads: {requests['calls']} calls / {requests['upstream']} sent | "
+            f"{requests['saved']} saved ({requests['saved_rate']:.0%})"
+        )
+    for name, limiter in all_rate_limiters().items():
+        for bucket, m in limiter.metrics().items():
+            if not m['acquired']:
+                continue
+            queued = '/'.join(str(n) for n in m['queued'].values())
+            logger.info(
+                f"🚦 Rate limit {name} {bucket}: {m['acquired']} calls, {m['waited']} waited "
+                f"(avg {m['wait_avg_ms']:.0f}ms, max {m['wait_max_ms']:.0f}ms) | queued c/n/b {queued} | "
+                f"{m['penalties']} 429s" + (f" | paused {m['blocked_for_sec']:.1f}s" if m['blocked_for_sec'] else "")
+            )
+
+
+def collect_metrics():
+    # Gauges and running totals read at scrape time (utils/metrics.py)
+    cache_stats = indicator_cache.stats()
+    yield 'indicator_cache_requests_total', {'result': 'hit'}, cache_stats['hits']
+    yield 'indicator_cache_requests_total', {'result': 'miss'}, cache_stats['misses']
+    yield 'indicator_cache_hit_ratio', {}, cache_stats['hit_rate']
+    if hasattr(exchange, 'summary'):
+        reads = exchange.summary()
+        yield 'exchange_reads_total', {'kind': 'requested'}, reads['calls']
+        yield 'exchange_reads_total', {'kind': 'sent'}, reads['upstream']
+        yield 'exchange_coalesced_ratio', {}, reads['saved_rate']
+    updates = candle_store.stats
+    for kind in ('fresh_hits', 'full_fetches', 'incremental_fetches'):
+        yield 'candle_store_requests_total', {'kind': kind}, updates[kind]
+    total_updates = updates['fresh_hits'] + updates['full_fetches'] + updates['incremental_fetches']
+    yield 'candle_store_fresh_ratio', {}, updates['fresh_hits'] / total_updates if total_updates else 0.0
+    for name, limiter in all_rate_limiters().items():
+        for bucket, m in limiter.metrics().items():
+            for lane_name, queued in m['queued'].items():
+                yield 'rate_limit_queued', {'limiter': name, 'bucket': bucket, 'lane': lane_name}, queued
+            yield 'rate_limit_wait_max_seconds', {'limiter': name, 'bucket': bucket}, m['wait_max_ms'] / 1000
+            yield 'rate_limit_penalties_total', {'limiter': name, 'bucket': bucket}, m['penalties']
+    for state, count in open_positions.state_counts().items():
+        yield 'positions', {'state': state}, count
+    yield 'order_tracker_pending', {}, len(order_tracker.pending())
+    for event in ('polls', 'fills', 'filled', 'canceled', 'repriced', 'errors'):
+        yield 'order_tracker_events_total', {'event': event}, order_tracker.stats[event]
+    yield 'price_watch_queue_depth', {}, price_watcher.queue_depth()
+    yield 'price_watch_connected', {}, int(price_watcher.connected)
+    yield 'price_watch_updates_total', {'source': 'stream'}, price_watcher.stats['ws_updates']
+    yield 'price_watch_updates_total', {'source': 'rest'}, price_watcher.stats['rest_polls']
+    yield 'watched_price_age_seconds', {}, price_watcher.stalest_age()
+    yield 'position_sync_age_seconds', {}, clock.now() - _last_position_sync['at']
+
+metrics.add_collector(collect_metrics)
+
+
 def trade_loop():
     consecutive_fetch_errors = 0
     FETCH_ERROR_THRESHOLD = 3
@@ -785,26 +1222,11 @@ def trade_loop():
         # ✅ Telegram Pause Check (stop/resume)
         if not is_bot_active["status"]:
             logger.info("⏸️ Bot is currently stopped via Telegram.")
-            time.sleep(5)
+            clock.sleep(5)
             continue
 
-        syms = config.symbols
-
-        # 🔍 Volatility Scanner
-        if getattr(config, 'enable_volatility_scan', False):
-            try:
-                volatile = get_top_volatile_tokens(exchange, **config.volatility_filters)
-                syms = [sym for sym, _, _ in volatile if sym not in open_positions]
-
-                for sym, pct, vol in volatile:
-                    notify(f"🔥 Volatile Token Detected: {sym} | {pct:.2f}% | Vol ${vol:,.0f}")
-                    logger.info(f"🔥 Volatile Token: {sym} | Change: {pct:.2f}% | Vol: ${vol:,.0f}")
-
-            except Exception as e:
-                logger.warning(f"⚠️ Volatility scan failed: {e}")
-                syms = config.symbols
-
-        ohlcv_cache = {}
+        cycle_started = time.perf_counter()
+        syms = select_symbols()
 
         for sym in syms:
             try:
@@ -812,36 +1234,7 @@ def trade_loop():
                     logger.info("⏸️ Bot paused mid-scan. Exiting current loop early.")
                     break
 
-                if sym not in ohlcv_cache:
-                    ohlcv_cache[sym] = {}
-
-                # 15m Data
-                if '15m' not in ohlcv_cache[sym]:
-                    df15 = safe_fetch_ohlcv(sym, '15m')
-                    if df15 is not None and not df15.empty:
-                        df15, ok15 = prepare_indicators(df15)
-                        if ok15:
-                            df15['rsi'] = get_rsi(df15['close'])
-                            df15['macd'], df15['signal'], df15['macd_hist'] = get_macd(df15['close'])
-                            df15['upper_band'], df15['middle_band'], df15['lower_band'] = get_bollinger_bands(df15['close'])
-                            ohlcv_cache[sym]['15m'] = df15
-                    time.sleep(0.5)
-                else:
-                    df15 = ohlcv_cache[sym]['15m']
-
-                # 1h Data
-                if '1h' not in ohlcv_cache[sym]:
-                    df1h = safe_fetch_ohlcv(sym, '1h')
-                    if df1h is not None and not df1h.empty:
-                        df1h, ok1h = prepare_indicators(df1h)
-                        if ok1h:
-                            df1h['rsi'] = get_rsi(df1h['close'])
-                            df1h['macd'], df1h['signal'], df1h['macd_hist'] = get_macd(df1h['close'])
-                            df1h['sma'] = get_sma(df1h['close'], config.sma_period)
-                            ohlcv_cache[sym]['1h'] = df1h
-                    time.sleep(0.5)
-                else:
-                    df1h = ohlcv_cache[sym]['1h']
+                df15, df1h = load_symbol_frames(sym, throttle=0.5)
 
                 # Handle missing data
                 if df15 is None or df1h is None:
@@ -849,28 +1242,63 @@ def trade_loop():
                     logger.warning(f"⚠️ OHLCV fetch None for {sym}. Errors: {consecutive_fetch_errors}")
                     if consecutive_fetch_errors >= FETCH_ERROR_THRESHOLD:
                         logger.warning("🚨 Too many fetch errors, sleeping for 60s")
-                        time.sleep(60)
+                        clock.sleep(60)
                         consecutive_fetch_errors = 0
                     continue
                 else:
                     consecutive_fetch_errors = 0
 
-                if df15.get('rsi') is None or df1h.get('rsi') is None:
-                    logger.warning(f"⚠️ {sym}: Indicators not ready, skipping")
-                    continue
-
-                mk = exchange.load_markets()
-                prec = mk[sym]['precision']['amount']
-
-                # Manage position
-                manage_position(sym)
-                trade(sym, df15, df1h, prec)
+                process_symbol(sym, df15, df1h)
 
             except Exception as e:
                 logger.error(f"⚠️ Error processing {sym}: {e}")
 
-        time.sleep(60)
+        # Wall time of the pass, including the per-symbol throttle sleeps
+        metrics.observe('cycle_seconds', time.perf_counter() - cycle_started, engine='sync')
+        log_cycle_stats()
 
+        clock.sleep(60)
+
+
+def evaluate_symbol(sym):
+    # Per-symbol step for the async engine: candles are already in the store, so this only reads them
+    _store_only.max_age = getattr(config, 'async_cycle_sec', 60)
+    try:
+        if not is_bot_active["status"]:
+            return
+        df15, df1h = load_symbol_frames(sym)
+        if df15 is None or df1h is None:
+            logger.warning(f"⚠️ OHLCV missing for {sym}, skipping")
+            return
+        process_symbol(sym, df15, df1h)
+    except Exception as e:
+        logger.error(f"⚠️ Error processing {sym}: {e}")
+    finally:
+        _store_only.max_age = None
+
+
+def run_async_engine():
+    from utils.async_engine import AsyncTradeEngine
+    from utils.exchange_utils import create_async_exchange
+
+    async_exchange = create_async_exchange(exchange)
+    engine = AsyncTradeEngine(
+        async_exchange,
+        candle_store,
+        # The fake's async view already calls through the shared, rate-limited sync client
+        rate_limiter=None if async_exchange.id == 'fake' else getattr(exchange, 'rate_limiter', None),
+        select_symbols=select_symbols,
+        evaluate=evaluate_symbol,
+        on_prefetch=apply_prefetched,
+        on_batch=evaluate_entry_panel,
+        time_requests=async_exchange.id != 'fake',
+        is_active=lambda: is_bot_active["status"],
+        max_concurrency=getattr(config, 'async_max_concurrency', 8),
+        eval_workers=getattr(config, 'async_eval_workers', 1),
+        cycle_sec=getattr(config, 'async_cycle_sec', 60),
+        after_cycle=log_cycle_stats
+    )
+    engine.run_forever()
 
 
 def validate_api_keys():
@@ -878,13 +1306,21 @@ def validate_api_keys():
         bal = exchange.fetch_balance()
         notify(f"✅ API OK.|  USDT: ${bal['free'].get('USDT',0):.2f} | Send /help for all command.")
     except Exception as e:
-        notify(f"❌ API error: {e}")
+        notify(f"❌ API error: {e}", priority='critical')
         exit(1)
 
-def hard_stop_loss_loop():
+_last_position_sync = {'at': clock.now()}
+
+def position_sync_loop():
+    # Balance/position reconciliation; stop checks themselves are driven by the price watcher
     while True:
-        sync_positions()
-        time.sleep(1.2)
+        with metrics.timer('position_sync_seconds'):
+            for sym in list(open_positions.keys()):
+                record_tp_fills(sym)
+            sync_positions()
+            sync_watches()
+        _last_position_sync['at'] = clock.now()
+        clock.sleep(getattr(config, 'position_sync_sec', 60))
 
 # main.py
 
@@ -894,12 +1330,14 @@ markets = None
 volume_lookback = None
 daily_loss = None
 
-from utils.telegram_command_poll import telegram_command_loop, is_bot_active
-
 def main():
     global markets, volume_lookback, daily_loss
+    # Imported here, not at module level: the command poller takes the polling lock and
+    # answers the live chat, which importing bot (benchmarks, backtests) must not do
+    from utils.telegram_command_poll import telegram_command_loop
     validate_api_keys()
-    markets = exchange.load_markets()
+    markets = market_cache.markets()
+    market_cache.start()
     volume_lookback = int(getattr(config, 'volume_lookback', 10))
     daily_loss = load_daily_loss()
 
@@ -909,11 +1347,19 @@ def main():
         notify("⏸️ Bot is paused. Send /start to start trading.")
 
 
-    threading.Thread(target=hard_stop_loss_loop, daemon=True).start()
+    start_metrics_server()
+    start_price_watcher()
+    order_tracker.restore(load_json('pending_orders'))
+    for tracked in order_tracker.pending():
+        open_positions.mark(tracked.symbol, OPENING)
+    threading.Thread(target=position_sync_loop, daemon=True).start()
     threading.Thread(target=telegram_command_loop, daemon=True).start()
     threading.Thread(target=scanner_loop, daemon=True).start()
-    
-    trade_loop()
+
+    if getattr(config, 'engine_mode', 'sync') == 'async':
+        run_async_engine()
+    else:
+        trade_loop()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,79 @@ min_trade_usdt = 5                # Avoid micro trades that can get stuck or fai
 max_trade_usdt = 10               # Prevent any single trade from using full balance
 max_concurrent_trades = 1          # One trade at a time in volatility mode for better control
 
+# === EXCHANGE BACKEND ===
+exchange_backend = 'mexc'          # 'mexc' = live exchange, 'fake' = offline simulated exchange (utils/fake_exchange.py)
+fake_exchange = {
+    'symbols': 50,                 # Number of simulated pairs, or a list of symbol names
+    'recorded': {},                # e.g. {'XRP/USDT': 'data/XRPUSDT_1m.csv'}: replay 1m candles, then random-walk on
+    'history_minutes': 20000,      # Candle history available when the simulation starts
+    'speed': 1.0,                  # Simulated seconds per real second (bot sleeps and cooldowns scale with it)
+    'latency_ms': 50,              # Simulated round trip per request, plus up to latency_jitter_ms
+    'latency_jitter_ms': 50,
+    'rate_limit_per_sec': 20,      # Request budget; going over raises RateLimitExceeded (429)
+    'error_rate': 0.0,             # Share of requests failing with NetworkError
+    'fill_mode': 'touch',          # 'immediate', 'touch' (fill once price crosses the limit) or 'partial'
+    'partial_fill_ratio': 0.5,     # Share of the remaining amount filled per check in 'partial' mode
+    'fee_rate': 0.001,
+    'spread_bps': 5,
+    'starting_balance': {'USDT': 160},
+    'seed': 42,
+}
+
+# === REQUEST COALESCING ===
+coalesce_requests = True           # Concurrent identical exchange reads share one in-flight call
+coalesce_freshness = {             # Seconds a finished read is reused (0 = share in-flight calls only)
+    'fetch_ticker': 1,
+    'fetch_tickers': 1,
+    'fetch_balance': 5,
+    'fetch_ohlcv': 1,
+    'fetch_order_book': 1,
+    'fetch_open_orders': 1,
+    'fetch_order': 0,
+}
+
+# === RATE LIMITING ===
+shared_rate_limit = True           # All clients for one exchange account share one token-bucket limiter (utils/rate_limiter.py)
+rate_limits = {
+    'buckets': {                   # Tokens refilled per second and bucket size per endpoint class
+        'public': {'rate': 20, 'burst': 20},
+        'private': {'rate': 10, 'burst': 10},
+        'orders': {'rate': 5, 'burst': 5},
+    },
+    'endpoints': {},               # Overrides, e.g. {'fetch_tickers': ('public', 10)}
+}
+
+# === STATE PERSISTENCE ===
+state_dir = 'state'                # Journal + snapshot of open positions, alerts, trade times and daily loss
+state_fsync_sec = 1.0              # Journal appends are fsynced in batches at most this often
+state_compact_sec = 3600           # Fold the journal into a fresh snapshot this often...
+state_compact_records = 5000       # ...or once it holds this many change records
+
+# === TRADE JOURNAL ===
+trade_journal_path = 'logs/trade_journal.bin'  # Every fill, fixed-width binary records (utils/trade_journal.py)
+trade_fee_rate = 0.001             # Fee estimate when the exchange doesn't report one on the order
+
+# === ORDER TRACKING ===
+limit_order_offset = 0.0           # Entry limit price = ask * (1 + offset); also used when re-pricing
+order_poll_min_sec = 0.5           # First fill check after placing / after a fill (utils/order_tracker.py)...
+order_poll_max_sec = 10            # ...backing off to this while the order sits unchanged
+order_poll_backoff = 1.6           # Poll interval multiplier per unchanged check
+order_stale_sec = 120              # Entry orders still open this long are handled per order_stale_action
+order_stale_action = 'cancel'      # 'cancel' = cancel the rest, 'reprice' = cancel and re-place at the current ask
+order_max_reprices = 2             # Re-prices per entry before the rest is cancelled
+order_not_found_polls = 3          # Consecutive 'order not found' polls before an entry order is given up
+
+# === METRICS ===
+metrics_enabled = True             # Latency histograms, loop stage timings, cache / queue gauges (utils/metrics.py)
+metrics_host = '127.0.0.1'         # Prometheus endpoint: http://127.0.0.1:9464/metrics (local only by default)
+metrics_port = 9464                # 0 = no HTTP endpoint; Telegram /metrics still works
+
+# === ENGINE ===
+engine_mode = 'sync'               # 'sync' = classic trade_loop, 'async' = asyncio engine (ccxt.async_support)
+async_max_concurrency = 8          # Max in-flight exchange requests per async cycle
+async_eval_workers = 1             # Threads evaluating symbols (order/position logic) in async mode
+async_cycle_sec = 60               # Minimum seconds between async cycle starts
+
 # === TRADE COOLDOWN & LIMITS ===
 trade_cooldown_sec = 120           # Prevents re-entry too quickly
 max_daily_loss_percent = 5         # Stop trading after 5% capital loss
@@ -17,6 +90,13 @@ max_daily_loss_percent = 5         # Stop trading after 5% capital loss
 symbols = ['XRP/USDT']             # Only used if volatility scan is disabled
 timeframe = '15m'
 
+# === MARKET METADATA ===
+markets_ttl_sec = 3600             # Refresh markets in the background every N seconds (snapshot kept on disk)
+
+# === OHLCV CANDLE STORE ===
+ohlcv_max_candles = 1000           # Candles kept in memory per symbol/timeframe
+ohlcv_refresh_sec = 5              # Reuse stored candles (incl. open candle) if refreshed within N seconds
+
 # === VOLATILITY SCAN SETTINGS ===
 enable_volatility_scan = True
 volatility_mode = 'multi'
@@ -25,7 +105,9 @@ volatility_filters = {
     'top_n': 10,
     'min_volume': 500000,
     'min_change_percent': 1,
-    'max_price': 5
+    'max_price': 5,
+    'scan_mode': 'bulk',           # 'bulk' = fetch_tickers in one call, 'per_symbol' = one fetch_ticker per pair
+    'batch_size': None,            # Split bulk fetch into chunks of N symbols (None = whole market in one call)
     'scan_interval': 60  # seconds
 }
 
@@ -33,6 +115,14 @@ volatility_filters = {
 stop_loss_atr_multiplier = 1.0
 trailing_atr_multiplier = 1.0
 
+# === PRICE WATCHER (stop / trailing / TP triggers) ===
+price_watcher_mode = 'ws'          # 'ws' = WebSocket deals stream with REST fallback, 'rest' = poll tickers only
+price_ws_url = 'wss://wbs-api.mexc.com/ws'  # spot v3 aggregated deals, protobuf pushes (utils/price_watcher.py)
+price_poll_sec = 2                 # REST polling interval while the stream is down (one fetch_tickers for all positions)
+price_stale_sec = 6                # Stream up but a watched symbol quiet this long: poll it over REST
+trailing_ratchet_pct = 0.001       # Move the trailing stop up once price makes a new high by this fraction
+position_sync_sec = 60             # Balance / position reconciliation interval
+
 # === TAKE-PROFIT STRATEGY ===
 tp_multipliers = [2.0, 4.0, 6.0]
 tp_reset_delay_sec = 60
@@ -69,8 +159,15 @@ zigzag_deviation = 5
 use_telegram = True
 telegram_token = os.getenv('telegram_token')
 telegram_chat_id = os.getenv('telegram_chat_id')
-telegram_poll_delay = 2  # ⬅️ Add this line
+telegram_poll_delay = 2            # Wait after a failed poll before retrying
+telegram_long_poll_sec = 25        # getUpdates long-poll timeout; commands arrive as soon as they're sent
+telegram_command_workers = 4       # Threads for regular commands (/scanner, /recommend, ...)
+telegram_command_queue = 16        # Regular commands running or waiting before new ones are turned away
 telegram_allowed_users = [os.getenv('telegram_chat_id')]  # Replace with your real Telegram user ID
+telegram_queue_size = 500          # Outgoing messages held while Telegram is slow; oldest info messages drop first
+telegram_batch_sec = 1.0           # Info messages arriving within this window go out as one message
+telegram_min_interval_sec = 1.0    # Spacing between sends to the chat (Telegram allows ~1/s per chat)
+telegram_timeout_sec = 10          # HTTP timeout per send
 
 # === EXCHANGE KEYS ===
 mexc_api_key = os.getenv('mexc_api_key')
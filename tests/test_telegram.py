@@ -0,0 +1,36 @@
+from utils.telegram import TelegramNotifier
+
+
+def make_notifier(monkeypatch, max_queue=3):
+    notifier = TelegramNotifier('token', 'chat', max_queue=max_queue)
+    monkeypatch.setattr(notifier, '_start', lambda: None)   # keep the worker from sending
+    return notifier
+
+
+def test_full_queue_of_critical_drops_incoming_info(monkeypatch):
+    notifier = make_notifier(monkeypatch)
+    for i in range(3):
+        notifier.notify(f"fill {i}", priority='critical')
+    notifier.notify("status")
+    assert notifier.pending() == {'critical': 3, 'info': 0}
+    assert [text for _, text in notifier._queues['critical']] == ['fill 0', 'fill 1', 'fill 2']
+    assert notifier.stats['dropped'] == 1
+
+
+def test_full_queue_of_critical_drops_oldest_critical(monkeypatch):
+    notifier = make_notifier(monkeypatch)
+    for i in range(4):
+        notifier.notify(f"fill {i}", priority='critical')
+    assert [text for _, text in notifier._queues['critical']] == ['fill 1', 'fill 2', 'fill 3']
+    assert notifier.stats['dropped'] == 1
+
+
+def test_full_queue_drops_oldest_info_first(monkeypatch):
+    notifier = make_notifier(monkeypatch)
+    notifier.notify("status 0")
+    notifier.notify("status 1")
+    notifier.notify("fill", priority='critical')
+    notifier.notify("exit", priority='critical')
+    assert notifier.pending() == {'critical': 2, 'info': 1}
+    assert [text for _, text in notifier._queues['info']] == ['status 1']
+    assert notifier.stats['dropped'] == 1
@@ -0,0 +1,155 @@
+# utils/async_engine.py
+#
+# asyncio trade engine on top of ccxt.async_support. Every cycle fetches the
+# balance, tickers and candles for all symbols concurrently (bounded by a
+# semaphore on top of the shared rate limiter from utils/rate_limiter.py, or
+# ccxt's own throttle when that is off), then evaluates each symbol as its own
+# task. Cycle time follows the exchange rate limit instead of symbol count x
+# fixed sleeps.
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import clock
+from utils.metrics import metrics
+from utils.rate_limiter import RATE_LIMIT_ERRORS
+
+
+async def _none():
+    return None
+
+
+class AsyncTradeEngine:
+    def __init__(self, exchange, candle_store, select_symbols, evaluate, on_prefetch=None, is_active=None,
+                 timeframes=('15m', '1h'), max_concurrency=8, eval_workers=1, cycle_sec=60, after_cycle=None,
+                 rate_limiter=None, on_batch=None, time_requests=True):
+        self.exchange = exchange
+        self.time_requests = time_requests  # off when the client already times its calls (the fake's async view)
+        self.rate_limiter = rate_limiter
+        self.candle_store = candle_store
+        self.select_symbols = select_symbols
+        self.evaluate = evaluate
+        self.on_prefetch = on_prefetch
+        self.on_batch = on_batch          # called with all symbols once their candles are in, before per-symbol evaluation
+        self.is_active = is_active
+        self.timeframes = timeframes
+        self.max_concurrency = max_concurrency
+        self.cycle_sec = cycle_sec
+        self.after_cycle = after_cycle
+        # Evaluation still calls the blocking bot logic (orders, position state), so it runs in
+        # worker threads; keep eval_workers at 1 unless that state is safe to mutate concurrently
+        self._executor = ThreadPoolExecutor(max_workers=eval_workers)
+        self._semaphore = None
+        self.last_cycle = {}
+
+    async def _call(self, method, *args, **kwargs):
+        async with self._semaphore:
+            if self.rate_limiter is None:
+                return await self._timed(method, *args, **kwargs)
+            # Same token buckets as the sync threads; waiting happens off the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.rate_limiter.acquire, method)
+            try:
+                result = await self._timed(method, *args, **kwargs)
+            except RATE_LIMIT_ERRORS:
+                self.rate_limiter.penalize(method)
+                raise
+            self.rate_limiter.succeeded(method)
+            return result
+
+    async def _timed(self, method, *args, **kwargs):
+        # Same exchange_request_seconds series as the sync client (utils/metrics.py)
+        if not self.time_requests:
+            return await getattr(self.exchange, method)(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await getattr(self.exchange, method)(*args, **kwargs)
+        except Exception as e:
+            metrics.inc('exchange_errors_total', method=method, error=type(e).__name__)
+            raise
+        finally:
+            metrics.observe('exchange_request_seconds', time.perf_counter() - started, method=method)
+
+    async def _fetch_ohlcv(self, symbol, tf, since=None, limit=None):
+        return await self._call('fetch_ohlcv', symbol, tf, since=since, limit=limit)
+
+    async def _safe(self, coro, label):
+        try:
+            return await coro
+        except Exception as e:
+            print(f"⚠️ Async {label} failed: {e}")
+            return None
+
+    async def prefetch(self, symbols):
+        balance_task = self._safe(self._call('fetch_balance'), 'fetch_balance')
+        if symbols and self.exchange.has.get('fetchTickers'):
+            tickers_task = self._safe(self._call('fetch_tickers', symbols), 'fetch_tickers')
+        else:
+            tickers_task = _none()
+        candle_tasks = [
+            self._safe(self.candle_store.update_async(sym, tf, self._fetch_ohlcv), f"{sym} {tf} candles")
+            for sym in symbols for tf in self.timeframes
+        ]
+
+        balance, tickers, *candles = await asyncio.gather(balance_task, tickers_task, *candle_tasks)
+        if self.on_prefetch:
+            self.on_prefetch(balance=balance, tickers=tickers)
+        return sum(1 for ok in candles if ok)
+
+    async def run_cycle(self):
+        loop = asyncio.get_running_loop()
+        started = time.time()
+
+        symbols = await loop.run_in_executor(self._executor, self.select_symbols)
+        scanned = time.time()
+
+        fetched = await self.prefetch(symbols)
+        metrics.observe('stage_seconds', time.time() - scanned, stage='prefetch')
+        if self.on_batch and symbols:
+            await loop.run_in_executor(self._executor, self.on_batch, symbols)
+        prefetched = time.time()
+
+        tasks = [
+            asyncio.ensure_future(loop.run_in_executor(self._executor, self.evaluate, sym))
+            for sym in symbols
+        ]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        finished = time.time()
+
+        self.last_cycle = {
+            'symbols': len(symbols),
+            'series_fetched': fetched,
+            'scan_sec': scanned - started,
+            'fetch_sec': prefetched - scanned,
+            'evaluate_sec': finished - prefetched,
+            'total_sec': finished - started,
+        }
+        metrics.observe('cycle_seconds', finished - started, engine='async')
+        print(
+            f"⚡ Async cycle: {len(symbols)} symbols | scan {self.last_cycle['scan_sec']:.2f}s | "
+            f"fetch {self.last_cycle['fetch_sec']:.2f}s | evaluate {self.last_cycle['evaluate_sec']:.2f}s"
+        )
+        if self.after_cycle:
+            self.after_cycle()
+
+    async def run(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            while True:
+                if self.is_active and not self.is_active():
+                    await asyncio.sleep(5 / clock.speed())
+                    continue
+
+                started = clock.now()
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    print(f"⚠️ Async cycle failed: {e}")
+                await asyncio.sleep(max(self.cycle_sec - (clock.now() - started), 0) / clock.speed())
+        finally:
+            await self.exchange.close()
+            self._executor.shutdown(wait=False)
+
+    def run_forever(self):
+        asyncio.run(self.run())
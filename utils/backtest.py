@@ -0,0 +1,315 @@
+# utils/backtest.py
+#
+# Offline replay of the bot's strategy over historical 15m candles.
+#
+# Indicators are computed once per series (prepare_arrays); the entry logic of
+# trade() -- evaluate_all_entry_conditions, adaptive RSI levels, 1h RSI
+# confirmation -- is evaluated for the whole history as NumPy masks, and only
+# the position state machine (manage_position exits) walks candle by candle
+# while a position is open.
+#
+# Approximations compared to live trading:
+#   * decisions are taken on candle closes, fills happen at the close
+#     (entries at close * (1 + limit_order_offset));
+#   * the 1h RSI/SMA come from the last fully closed 1h candle (no lookahead);
+#   * a TP sells its share of the remaining position and keeps managing the rest.
+#
+# Usage: python -m utils.backtest candles_15m.csv [--candles-1h candles_1h.csv] [--trades out.csv]
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+import config
+from utils.entry_rules import entry_plan
+from utils.indicators import get_rsi, get_macd, get_bollinger_bands, get_sma
+
+STRATEGY_PARAMS = [
+    'rsi_entry_zones', 'rsi_tolerance', 'rsi_1h_max', 'rsi_atr_multiplier',
+    'stop_loss_atr_multiplier', 'trailing_atr_multiplier', 'tp_multipliers',
+    'rsi_sell_base', 'rsi_sell_min', 'rsi_sell_max',
+    'percent_per_trade', 'min_trade_usdt', 'max_trade_usdt', 'minimum_balance',
+    'trade_cooldown_sec', 'budget_usdt',
+]
+
+WARMUP_CANDLES = 50  # prepare_indicators() refuses frames shorter than this
+
+
+def strategy_params(overrides=None):
+    params = {name: getattr(config, name) for name in STRATEGY_PARAMS if hasattr(config, name)}
+    params['limit_order_offset'] = getattr(config, 'limit_order_offset', 0.0)
+    params['default_min_score'] = 3  # utils.entry_conditions' Default Logic threshold
+    params.update(overrides or {})
+    return params
+
+
+def load_candles(path):
+    df = pd.read_csv(path)
+    df.columns = [c.lower() for c in df.columns]
+    ts = df['timestamp']
+    if not np.issubdtype(ts.dtype, np.number):
+        ts = pd.to_datetime(ts).to_numpy().astype('datetime64[ms]').astype('int64')
+    df['timestamp'] = np.asarray(ts, dtype='int64')
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        df[col] = df[col].astype(float)
+    return df.sort_values('timestamp').reset_index(drop=True)
+
+
+def resample_1h(df15):
+    hours = df15['timestamp'] // 3_600_000 * 3_600_000
+    grouped = df15.groupby(hours, sort=True)
+    df1h = pd.DataFrame({
+        'open': grouped['open'].first(),
+        'high': grouped['high'].max(),
+        'low': grouped['low'].min(),
+        'close': grouped['close'].last(),
+        'volume': grouped['volume'].sum(),
+    })
+    df1h.index.name = 'timestamp'
+    return df1h.reset_index()
+
+
+def prepare_arrays(df15, df1h=None, bar_ms=15 * 60 * 1000):
+    # Every indicator the strategy reads, computed once over the whole history
+    df15 = df15.reset_index(drop=True)
+    if df1h is None:
+        df1h = resample_1h(df15)
+    df1h = df1h.reset_index(drop=True)
+
+    close = df15['close']
+    macd, signal, hist = get_macd(close)
+    upper, middle, lower = get_bollinger_bands(close)
+    atr = ta.volatility.AverageTrueRange(
+        high=df15['high'], low=df15['low'], close=close, window=config.atr_period
+    ).average_true_range()
+
+    # Align the last closed 1h candle to each 15m candle close
+    h1 = pd.DataFrame({
+        'close_time': df1h['timestamp'] + 3_600_000,
+        'rsi_1h': get_rsi(df1h['close']).to_numpy(),
+        'sma_1h': get_sma(df1h['close'], config.sma_period).to_numpy(),
+    })
+    m15 = pd.DataFrame({'close_time': df15['timestamp'] + bar_ms})
+    aligned = pd.merge_asof(m15, h1, on='close_time', direction='backward')
+
+    return {
+        'timestamp': df15['timestamp'].to_numpy(dtype='int64'),
+        'close': close.to_numpy(dtype=float),
+        'volume': df15['volume'].to_numpy(dtype=float),
+        'rsi': get_rsi(close).to_numpy(dtype=float),
+        'macd': macd.to_numpy(dtype=float),
+        'signal': signal.to_numpy(dtype=float),
+        'macd_hist': hist.to_numpy(dtype=float),
+        'lower_band': lower.to_numpy(dtype=float),
+        'volume_avg': df15['volume'].rolling(window=int(config.volume_lookback)).mean().to_numpy(dtype=float),
+        'atr': atr.to_numpy(dtype=float),
+        'rsi_1h': aligned['rsi_1h'].to_numpy(dtype=float),
+        'sma_1h': aligned['sma_1h'].to_numpy(dtype=float),
+    }
+
+
+def entry_signals(a, p):
+    # Vectorized trade() entry gate: candidate mask, adaptive levels, level hits, per-candle strategy results
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # The live entry strategies (utils/entry_rules.py), evaluated for every candle at once
+        rules = entry_plan(p['default_min_score']).evaluate(a)
+        passed = rules.any_passed
+
+        confirmed = a['rsi_1h'] < p['rsi_1h_max']
+
+        # get_adaptive_rsi_levels: min(max(int(lvl * scale), 10), 50)
+        scale = 1 + (a['atr'] / a['close']) * p['rsi_atr_multiplier']
+        zones = np.asarray(p['rsi_entry_zones'], dtype=float)
+        levels = np.clip(np.trunc(zones[None, :] * scale[:, None]), 10, 50)
+        levels = np.where(np.isfinite(levels), levels, zones[None, :]).astype(int)
+        hits = np.abs(a['rsi'][:, None] - levels) <= p['rsi_tolerance']
+
+    candidate = passed & confirmed & hits.any(axis=1)
+    candidate[:WARMUP_CANDLES] = False
+    return candidate, levels, hits, rules
+
+
+def exit_signals(a, p):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        atr_ratio = a['atr'] / a['close']
+        # get_adaptive_rsi_sell: max(min_rsi, min(int(base + atr_ratio * 100 * mult), max_rsi))
+        raw = np.trunc(p['rsi_sell_base'] + atr_ratio * 100 * p['rsi_atr_multiplier'])
+        rsi_sell = np.where(np.isfinite(raw), np.clip(raw, p['rsi_sell_min'], p['rsi_sell_max']), p['rsi_sell_base'])
+        tp_allowed = (a['rsi'] > 50) & (a['macd'] < a['signal'])
+        rsi_exit = a['rsi'] >= rsi_sell
+    return tp_allowed, rsi_exit
+
+
+def simulate(a, params=None, fee_rate=0.0, respect_rsi_alerts=True, symbol='BACKTEST'):
+    # respect_rsi_alerts: like the live bot, each adaptive RSI level triggers at most one entry
+    p = strategy_params(params)
+    close, atr, rsi, ts = a['close'], a['atr'], a['rsi'], a['timestamp']
+    n = len(close)
+
+    candidate, levels, hits, rules = entry_signals(a, p)
+    tp_allowed, rsi_exit = exit_signals(a, p)
+    candidates = np.flatnonzero(candidate)
+    tp_mults = list(p['tp_multipliers'])
+    cooldown_ms = p['trade_cooldown_sec'] * 1000
+
+    cash = float(p['budget_usdt'])
+    used_levels = set()
+    last_entry_ts = None
+    trades = []
+    events = [(0, cash, 0.0)]    # (candle index, cash, qty held) after each fill
+    t = 0
+
+    while t < n:
+        # === Flat: jump straight to the next candle where trade() could enter ===
+        k = np.searchsorted(candidates, t)
+        if k >= len(candidates):
+            break
+        i = int(candidates[k])
+        if last_entry_ts is not None and ts[i] - last_entry_ts < cooldown_ms:
+            t = int(np.searchsorted(ts, last_entry_ts + cooldown_ms))
+            continue
+
+        level = None
+        for j, lvl in enumerate(levels[i]):
+            if respect_rsi_alerts and lvl in used_levels:
+                continue
+            if hits[i, j]:
+                level = int(lvl)
+                break
+        budget = max(min(cash * p['percent_per_trade'], p['max_trade_usdt']), p['min_trade_usdt'])
+        if level is None or cash < p['minimum_balance'] or budget > cash:
+            t = i + 1
+            continue
+
+        entry_price = close[i] * (1 + p['limit_order_offset'])
+        qty = budget / entry_price
+        fee = qty * entry_price * fee_rate
+        cash -= qty * entry_price + fee
+        used_levels.add(level)
+        last_entry_ts = ts[i]
+        events.append((i, cash, qty))
+
+        entry_atr = atr[i]
+        tps = [entry_price + entry_atr * m for m in tp_mults]
+        triggered = set()
+        highest = close[i]
+        entry = {
+            'symbol': symbol, 'entry_index': i, 'entry_time': int(ts[i]), 'entry_price': entry_price,
+            'strategy': rules.best_name(i), 'rsi_level': level, 'entry_fee': fee,
+        }
+
+        # === In position: replay manage_position candle by candle ===
+        exit_index = None
+        for i in range(i + 1, n):
+            price = close[i]
+            highest = max(highest, price)
+            sell_qty, reason = 0.0, None
+
+            if price <= entry_price - atr[i] * p['stop_loss_atr_multiplier']:
+                sell_qty, reason = qty, 'ATR Stop-loss'
+            elif price <= highest - atr[i] * p['trailing_atr_multiplier']:
+                sell_qty, reason = qty, 'ATR Trailing stop'
+            else:
+                for j, tp in enumerate(tps):
+                    if price >= tp and j not in triggered and tp_allowed[i]:
+                        sell_qty = qty * (0.5 if j < len(tps) - 1 else 1.0)
+                        reason = f"TP {j + 1} (ATR x {tp_mults[j]})"
+                        triggered.add(j)
+                        break
+                if reason is None and rsi_exit[i]:
+                    sell_qty, reason = qty, 'RSI sell'
+
+            if reason is None:
+                continue
+
+            fee = sell_qty * price * fee_rate
+            entry_fee = entry['entry_fee'] * (sell_qty / qty)
+            entry['entry_fee'] -= entry_fee
+            cash += sell_qty * price - fee
+            qty -= sell_qty
+            events.append((i, cash, qty))
+            trades.append(dict(
+                entry, exit_index=i, exit_time=int(ts[i]), exit_price=float(price), qty=sell_qty,
+                reason=reason, fees=entry_fee + fee,
+                pnl=(price - entry_price) * sell_qty - entry_fee - fee,
+            ))
+            if qty <= 1e-12:
+                exit_index = i
+                break
+
+        if exit_index is None:
+            break  # still open at the end of the data
+        t = exit_index  # trade() runs right after manage_position on the same candle
+
+    # Mark-to-market equity from the fill events, filled forward per candle
+    ev_index = np.array([e[0] for e in events])
+    ev_cash = np.array([e[1] for e in events])
+    ev_qty = np.array([e[2] for e in events])
+    pos = np.searchsorted(ev_index, np.arange(n), side='right') - 1
+    equity = ev_cash[pos] + ev_qty[pos] * close
+
+    peak = np.maximum.accumulate(equity) if n else equity
+    drawdown = peak - equity
+    max_dd = float(drawdown.max()) if n else 0.0
+    max_dd_pct = float((drawdown / peak).max() * 100) if n else 0.0
+    start_equity = float(p['budget_usdt'])
+    final_equity = float(equity[-1]) if n else start_equity
+    wins = sum(1 for tr in trades if tr['pnl'] > 0)
+
+    return {
+        'trades': trades,
+        'num_trades': len(trades),
+        'pnl': final_equity - start_equity,
+        'realized_pnl': float(sum(tr['pnl'] for tr in trades)),
+        'fees': float(sum(tr['fees'] for tr in trades)),
+        'return_pct': (final_equity / start_equity - 1) * 100 if start_equity else 0.0,
+        'max_drawdown': max_dd,
+        'max_drawdown_pct': max_dd_pct,
+        'win_rate': wins / len(trades) if trades else 0.0,
+        'final_equity': final_equity,
+        'equity': equity,
+    }
+
+
+def run_backtest(df15, df1h=None, params=None, fee_rate=0.0, respect_rsi_alerts=True, symbol='BACKTEST'):
+    return simulate(prepare_arrays(df15, df1h), params, fee_rate, respect_rsi_alerts, symbol)
+
+
+def format_summary(result):
+    return (
+        f"📊 Backtest: {result['num_trades']} fills | P/L: ${result['pnl']:.2f} ({result['return_pct']:.2f}%)\n"
+        f"🔸 Realized: ${result['realized_pnl']:.2f} | Fees: ${result['fees']:.2f} | Win rate: {result['win_rate']:.0%}\n"
+        f"🔸 Max drawdown: ${result['max_drawdown']:.2f} ({result['max_drawdown_pct']:.2f}%)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the bot's entry/exit logic over historical candles")
+    parser.add_argument('candles', help='15m OHLCV CSV (timestamp, open, high, low, close, volume)')
+    parser.add_argument('--candles-1h', help='1h OHLCV CSV (default: resampled from the 15m file)')
+    parser.add_argument('--symbol', default='BACKTEST')
+    parser.add_argument('--fee', type=float, default=0.0, help='fee rate per fill, e.g. 0.001')
+    parser.add_argument('--all-levels', action='store_true', help='let every RSI level trigger repeatedly')
+    parser.add_argument('--trades', help='write the fills to this CSV')
+    args = parser.parse_args()
+
+    df15 = load_candles(args.candles)
+    df1h = load_candles(args.candles_1h) if args.candles_1h else None
+
+    started = time.perf_counter()
+    arrays = prepare_arrays(df15, df1h)
+    prepared = time.perf_counter()
+    result = simulate(arrays, fee_rate=args.fee, respect_rsi_alerts=not args.all_levels, symbol=args.symbol)
+    finished = time.perf_counter()
+
+    print(format_summary(result))
+    print(f"⏱️ {len(df15)} candles | indicators {prepared - started:.3f}s | simulation {finished - prepared:.3f}s")
+    if args.trades:
+        pd.DataFrame(result['trades']).to_csv(args.trades, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+# utils/benchmark.py
+#
+# Benchmarks for the indicator, entry-evaluation and trade-loop hot paths.
+# Function benchmarks run over synthetic candle frames at several universe
+# sizes and candle counts; the loop benchmark runs one trade_loop iteration
+# (scan, candles, indicators, position/entry logic) against the offline fake
+# exchange, first cold (empty candle store) and then warm (one new candle).
+#
+# Usage:
+#   python -m utils.benchmark [--symbols 10 100 1000] [--candles 200 1000] [--repeat 3]
+#                             [--output bench.json] [--compare baseline.json --threshold 0.15]
+#
+# --compare exits with status 1 when any case is slower than the baseline by more than the threshold.
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+
+FUNCTION_BENCHMARKS = (
+    'calculate_indicators', 'detect_zigzag', 'detect_god_candle', 'evaluate_all_entry_conditions',
+    'evaluate_all_entry_conditions_strict', 'check_indicators', 'get_adaptive_rsi_levels',
+)
+# Timed once over the whole universe instead of once per symbol
+BATCH_BENCHMARKS = ('evaluate_entry_panel',)
+LOOP_BENCHMARKS = ('trade_loop_cold', 'trade_loop_warm')
+
+
+# === Bot import against the fake exchange ===
+
+_bot = {}
+
+
+def load_bot(workdir):
+    # bot.py creates its exchange, state files and log at import time, so point it at the
+    # fake backend and a scratch directory first
+    if 'module' in _bot:
+        return _bot['module']
+    config.exchange_backend = 'fake'
+    config.use_telegram = False
+    config.telegram_token = None        # never reach the live bot's chat or its command queue
+    config.telegram_allowed_users = []
+    config.fake_exchange = dict(getattr(config, 'fake_exchange', {}), speed=1.0, latency_ms=0,
+                                latency_jitter_ms=0, rate_limit_per_sec=0)
+    os.chdir(workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import bot
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.daily_loss = {'date': '', 'loss': 0.0, 'starting_balance': config.budget_usdt}
+    _bot['module'] = bot
+    return bot
+
+
+def bind_exchange(bot, exchange):
+    # Swap a fresh fake market (one per universe size) into the bot's module globals
+    from utils.candle_store import CandleStore
+    from utils.markets import MarketCache
+    from utils.streaming_indicators import IndicatorEngine
+
+    bot.exchange = exchange
+    bot.price_watcher.exchange = exchange
+    bot.order_tracker.exchange = exchange
+    bot.market_cache = MarketCache(exchange, snapshot_path=os.path.join(os.getcwd(), 'markets_bench.json'))
+    bot.market_cache.refresh()
+    bot.candle_store = CandleStore(exchange, max_candles=getattr(config, 'ohlcv_max_candles', 1000),
+                                   refresh_sec=getattr(config, 'ohlcv_refresh_sec', 5))
+    bot.indicator_engine = IndicatorEngine(
+        sma_period=config.sma_period,
+        atr_period=config.atr_period,
+        bb_period=config.bb_period,
+        bb_stddev=config.bb_stddev,
+        volume_lookback=int(config.volume_lookback),
+        max_history=getattr(config, 'ohlcv_max_candles', 1000),
+        zigzag_deviation=config.zigzag_deviation if getattr(config, 'use_zigzag_filter', False) else None
+    )
+    bot.candle_store.add_listener(bot.indicator_engine.on_candles)
+    bot.open_positions.clear()
+    bot.rsi_alerts_sent.clear()
+    bot.last_trade_time.clear()
+
+
+def trade_loop_iteration(bot):
+    # Body of bot.trade_loop() for one pass, without the throttle and cycle sleeps
+    for sym in bot.select_symbols():
+        try:
+            df15, df1h = bot.load_symbol_frames(sym)
+            if df15 is None or df1h is None:
+                continue
+            bot.process_symbol(sym, df15, df1h)
+        except Exception as e:
+            print(f"⚠️ Error processing {sym}: {e}")
+
+
+# === Synthetic frames ===
+
+def synthetic_candles(n, minutes, seed, start_price=1.0):
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_t(4, n) * 0.004
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    wick = np.abs(rng.standard_normal((2, n))) * 0.002
+    end = pd.Timestamp('2024-01-01') + pd.Timedelta(minutes=minutes * n)
+    return pd.DataFrame({
+        'timestamp': pd.date_range(end=end, periods=n, freq=f"{minutes}min"),
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + wick[0]),
+        'low': np.minimum(open_, close) * (1 - wick[1]),
+        'close': close,
+        'volume': rng.lognormal(8, 0.6, n),
+    })
+
+
+def synthetic_frames(bot, n_symbols, n_candles, seed=7):
+    # (df15, df1h) pairs with the bot's indicator columns, like load_symbol_frames() returns
+    frames = []
+    for i in range(n_symbols):
+        df15 = bot.attach_indicators(synthetic_candles(n_candles, 15, seed + i), None, '15m')
+        df1h = bot.attach_indicators(synthetic_candles(max(n_candles // 4, 60), 60, seed + 10000 + i), None, '1h')
+        frames.append((df15, df1h))
+    return frames
+
+
+# === Timing ===
+
+def time_cases(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def record(name, symbols, candles, timings):
+    median = statistics.median(timings)
+    return {
+        'name': name,
+        'symbols': symbols,
+        'candles': candles,
+        'repeat': len(timings),
+        'best_sec': min(timings),
+        'median_sec': median,
+        'per_symbol_us': median / symbols * 1e6 if symbols else None,
+    }
+
+
+def function_cases(bot):
+    from utils.indicators import calculate_indicators, detect_zigzag, detect_god_candle
+    from utils.indicator_registry import BASE_COLUMNS
+    from utils.indicators import evaluate_all_entry_conditions
+    from utils.entry_conditions import evaluate_all_entry_conditions as evaluate_all_entry_conditions_strict
+
+    return {
+        # Raw candles only: calculate_indicators keeps columns a frame already has
+        'calculate_indicators': lambda df15, df1h: calculate_indicators(df15[list(BASE_COLUMNS)].copy()),
+        'detect_zigzag': lambda df15, df1h: detect_zigzag(df15),
+        'detect_god_candle': lambda df15, df1h: detect_god_candle(df15),
+        'evaluate_all_entry_conditions': lambda df15, df1h: evaluate_all_entry_conditions(df15, df1h, config),
+        'evaluate_all_entry_conditions_strict':
+            lambda df15, df1h: evaluate_all_entry_conditions_strict(df15, df1h, config),
+        'check_indicators': lambda df15, df1h: bot.check_indicators(df15, df1h),
+        'get_adaptive_rsi_levels': lambda df15, df1h: bot.get_adaptive_rsi_levels(
+            df15, config.rsi_entry_zones, atr_multiplier=config.rsi_atr_multiplier, atr_period=config.atr_period),
+    }
+
+
+def run_function_benchmarks(bot, symbol_counts, candle_counts, repeat, only=None, progress=print):
+    from utils.entry_panel import panel_from_frames, evaluate_panel
+
+    cases = function_cases(bot)
+    results = []
+    for n_candles in candle_counts:
+        all_frames = synthetic_frames(bot, max(symbol_counts), n_candles)
+        for n_symbols in symbol_counts:
+            frames = all_frames[:n_symbols]
+            for name, fn in cases.items():
+                if only and name not in only:
+                    continue
+
+                def run():
+                    for df15, df1h in frames:
+                        fn(df15, df1h)
+
+                results.append(record(name, n_symbols, n_candles, time_cases(run, repeat)))
+                progress(format_result(results[-1]))
+
+            if not only or 'evaluate_entry_panel' in only:
+                # Panel built outside the timing, as the engine keeps it current from streamed values
+                panel = panel_from_frames([f"SYM{i}" for i in range(n_symbols)], frames)
+                timings = time_cases(lambda: evaluate_panel(panel).outcomes(), repeat)
+                results.append(record('evaluate_entry_panel', n_symbols, n_candles, timings))
+                progress(format_result(results[-1]))
+    return results
+
+
+def run_loop_benchmarks(bot, symbol_counts, repeat, latency_ms=0, progress=print):
+    from utils import clock
+    from utils.fake_exchange import FakeExchange
+
+    # A full 500-candle 15m window and ~130 1h candles (the 1h SMA needs 50) while keeping
+    # 1000 simulated symbols in a few hundred MB
+    history_minutes = 8000
+    results = []
+    for n_symbols in symbol_counts:
+        cold, warm = [], []
+        for _ in range(repeat):
+            exchange = FakeExchange(symbols=n_symbols, history_minutes=history_minutes, latency_ms=latency_ms,
+                                    latency_jitter_ms=0, rate_limit_per_sec=0)
+            bind_exchange(bot, exchange)
+            with contextlib.redirect_stdout(io.StringIO()):
+                cold.extend(time_cases(lambda: trade_loop_iteration(bot), 1))
+                clock.advance(15 * 60)  # next iteration sees one new 15m candle
+                warm.extend(time_cases(lambda: trade_loop_iteration(bot), 1))
+        for name, timings in (('trade_loop_cold', cold), ('trade_loop_warm', warm)):
+            results.append(record(name, n_symbols, None, timings))
+            progress(format_result(results[-1]))
+    return results
+
+
+# === Output / comparison ===
+
+def format_result(r):
+    candles = f"{r['candles']} candles" if r['candles'] else "fake exchange"
+    per_symbol = f" | {r['per_symbol_us']:.0f} µs/symbol" if r['per_symbol_us'] is not None else ""
+    return (f"⏱️ {r['name']:<38} {r['symbols']:>5} symbols | {candles:<14} | "
+            f"median {r['median_sec'] * 1000:9.2f} ms | best {r['best_sec'] * 1000:9.2f} ms{per_symbol}")
+
+
+def compare(results, baseline, threshold):
+    # Returns (rows, regressions); a case regresses when its median is slower than the baseline by > threshold
+    base = {(r['name'], r['symbols'], r['candles']): r for r in baseline['results']}
+    rows, regressions = [], []
+    for r in results:
+        b = base.get((r['name'], r['symbols'], r['candles']))
+        if b is None or not b['median_sec']:
+            continue
+        ratio = r['median_sec'] / b['median_sec']
+        row = dict(r, baseline_median_sec=b['median_sec'], ratio=ratio, regression=ratio > 1 + threshold)
+        rows.append(row)
+        if row['regression']:
+            regressions.append(row)
+    return rows, regressions
+
+
+def format_comparison(rows, threshold):
+    lines = [f"📊 Against baseline (threshold +{threshold:.0%}):"]
+    for row in rows:
+        flag = "🔴 REGRESSION" if row['regression'] else ("🟢 faster" if row['ratio'] < 1 - threshold else "⚪ same")
+        candles = row['candles'] if row['candles'] else '-'
+        lines.append(
+            f"  {row['name']:<38} {row['symbols']:>5} x {candles:>5} | "
+            f"{row['baseline_median_sec'] * 1000:9.2f} → {row['median_sec'] * 1000:9.2f} ms ({row['ratio']:.2f}x) {flag}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark indicator, entry and trade-loop hot paths')
+    parser.add_argument('--symbols', type=int, nargs='+', default=[10, 100, 1000], help='universe sizes')
+    parser.add_argument('--candles', type=int, nargs='+', default=[200, 1000], help='15m candles per symbol')
+    parser.add_argument('--loop-symbols', type=int, nargs='+', default=None,
+                        help='universe sizes for the trade_loop benchmark (default: --symbols)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=FUNCTION_BENCHMARKS + BATCH_BENCHMARKS + LOOP_BENCHMARKS)
+    parser.add_argument('--no-loop', action='store_true', help='skip the trade_loop benchmark')
+    parser.add_argument('--latency-ms', type=float, default=0, help='simulated exchange latency for the loop')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown vs baseline (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    workdir = tempfile.mkdtemp(prefix='akaai_bench_')
+    bot = load_bot(workdir)
+
+    started = time.perf_counter()
+    results = []
+    only = set(args.only) if args.only else None
+    if only is None or only & set(FUNCTION_BENCHMARKS + BATCH_BENCHMARKS):
+        results += run_function_benchmarks(bot, args.symbols, args.candles, args.repeat, only)
+    if not args.no_loop and (only is None or only & set(LOOP_BENCHMARKS)):
+        results += run_loop_benchmarks(bot, args.loop_symbols or args.symbols, args.repeat, args.latency_ms)
+    print(f"🏁 {len(results)} cases in {time.perf_counter() - started:.1f}s")
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(format_comparison(rows, args.threshold))
+        if regressions:
+            print(f"🚨 {len(regressions)} regression(s) over +{args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# utils/candle_store.py
+
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from utils import clock
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+_TIMEFRAME_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(tf):
+    return int(tf[:-1]) * _TIMEFRAME_UNITS_MS[tf[-1]]
+
+
+class CandleStore:
+    # In-process, append-only OHLCV store keyed by (symbol, timeframe).
+    # After the first full window, only candles from the last stored timestamp
+    # onwards are fetched (the last one is still open, so it gets overwritten).
+
+    def __init__(self, exchange, max_candles=1000, page_limit=500, refresh_sec=5):
+        self.exchange = exchange
+        self.max_candles = max_candles
+        self.page_limit = page_limit
+        self.refresh_sec = refresh_sec
+        self._series = {}                       # (symbol, tf) -> [[ts, o, h, l, c, v], ...]
+        self._updated_at = {}                   # (symbol, tf) -> clock.now() of last successful update
+        self._listeners = []
+        self._key_locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'full_fetches': 0, 'incremental_fetches': 0, 'fresh_hits': 0}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks[key]
+
+    def add_listener(self, callback):
+        # callback(key, rows, start) is called after every merge; start is the
+        # index of the first row that was replaced or appended
+        self._listeners.append(callback)
+
+    @staticmethod
+    def _clean(data):
+        if not isinstance(data, list):
+            return None
+        return [list(r[:6]) for r in data if r and r[0] is not None]
+
+    def _fetch(self, symbol, tf, since=None, limit=None):
+        self.stats['requests'] += 1
+        return self._clean(self.exchange.fetch_ohlcv(symbol, tf, since=since, limit=limit))
+
+    def plan(self, symbol, tf, now=None):
+        # Returns (needs_fetch, since, limit) for the next request on this series
+        key = (symbol, tf)
+        now = now or clock.now()
+        rows = self._series.get(key)
+        if rows and now - self._updated_at.get(key, 0) < self.refresh_sec:
+            return False, None, None
+        if not rows or now * 1000 - rows[-1][0] > timeframe_to_ms(tf) * self.max_candles:
+            return True, None, None
+        return True, rows[-1][0], self.page_limit
+
+    def merge(self, symbol, tf, new_rows):
+        key = (symbol, tf)
+        if not new_rows:
+            return
+        new_rows = sorted(new_rows, key=lambda r: r[0])
+        rows = self._series.setdefault(key, [])
+
+        # Drop stored candles the fresh batch overlaps (open candle + any revised bars)
+        first_ts = new_rows[0][0]
+        start = len(rows)
+        while start > 0 and rows[start - 1][0] >= first_ts:
+            start -= 1
+        del rows[start:]
+
+        last_ts = rows[-1][0] if rows else None
+        for r in new_rows:
+            if last_ts is None or r[0] > last_ts:
+                rows.append(r)
+                last_ts = r[0]
+
+        overflow = len(rows) - self.max_candles
+        if overflow > 0:
+            del rows[:overflow]
+            start = max(start - overflow, 0)
+
+        for callback in self._listeners:
+            callback(key, rows, start)
+
+    def reset(self, symbol, tf):
+        key = (symbol, tf)
+        self._series.pop(key, None)
+        self._updated_at.pop(key, None)
+
+    def update(self, symbol, tf):
+        key = (symbol, tf)
+        with self._key_lock(key):
+            needs_fetch, since, limit = self.plan(symbol, tf)
+            if not needs_fetch:
+                self.stats['fresh_hits'] += 1
+                return True
+
+            if since is None:
+                # First load (or store too stale to bridge): full default window
+                rows = self._fetch(symbol, tf)
+                if rows is None:
+                    return False
+                self.stats['full_fetches'] += 1
+                self.reset(symbol, tf)
+                self.merge(symbol, tf, rows)
+            else:
+                # Incremental: page forward from the last stored candle until caught up,
+                # which also repairs any gap left by a missed cycle
+                self.stats['incremental_fetches'] += 1
+                while True:
+                    rows = self._fetch(symbol, tf, since=since, limit=limit)
+                    if rows is None:
+                        return False
+                    self.merge(symbol, tf, rows)
+                    if len(rows) < limit or rows[-1][0] <= since:
+                        break
+                    since = rows[-1][0]
+
+            self._updated_at[key] = clock.now()
+            return True
+
+    async def update_async(self, symbol, tf, fetch_ohlcv):
+        # Same as update() for an async fetch_ohlcv(symbol, tf, since=, limit=) coroutine.
+        # The key lock is only held while merging so the event loop never waits on the network under it.
+        key = (symbol, tf)
+        needs_fetch, since, limit = self.plan(symbol, tf)
+        if not needs_fetch:
+            self.stats['fresh_hits'] += 1
+            return True
+
+        if since is None:
+            self.stats['requests'] += 1
+            rows = self._clean(await fetch_ohlcv(symbol, tf))
+            if rows is None:
+                return False
+            self.stats['full_fetches'] += 1
+            with self._key_lock(key):
+                self.reset(symbol, tf)
+                self.merge(symbol, tf, rows)
+        else:
+            self.stats['incremental_fetches'] += 1
+            while True:
+                self.stats['requests'] += 1
+                rows = self._clean(await fetch_ohlcv(symbol, tf, since=since, limit=limit))
+                if rows is None:
+                    return False
+                with self._key_lock(key):
+                    self.merge(symbol, tf, rows)
+                if len(rows) < limit or rows[-1][0] <= since:
+                    break
+                since = rows[-1][0]
+
+        self._updated_at[key] = clock.now()
+        return True
+
+    def rows(self, symbol, tf):
+        with self._key_lock((symbol, tf)):
+            return [list(r) for r in self._series.get((symbol, tf), [])]
+
+    def age(self, symbol, tf):
+        # Seconds since the series was last updated from the exchange, None if it never was
+        updated = self._updated_at.get((symbol, tf))
+        return None if updated is None else clock.now() - updated
+
+    def last_timestamp(self, symbol, tf):
+        rows = self._series.get((symbol, tf))
+        return rows[-1][0] if rows else None
+
+    def frame(self, symbol, tf):
+        rows = self.rows(symbol, tf)
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.attrs['symbol'] = symbol
+        df.attrs['timeframe'] = tf
+        return df
@@ -0,0 +1,47 @@
+# utils/clock.py
+#
+# Bot-wide clock. Normally it is just time.time()/time.sleep(); when the fake
+# exchange runs a simulated market faster than real time (set_speed), every
+# timestamp and sleep in the bot follows the simulated clock so cooldowns,
+# candle freshness and loop pacing all scale together.
+
+import threading
+import time
+
+_lock = threading.Lock()
+_speed = 1.0
+_origin_real = time.time()
+_origin_sim = _origin_real
+
+
+def set_speed(speed):
+    global _speed, _origin_real, _origin_sim
+    with _lock:
+        real = time.time()
+        _origin_sim = _origin_sim + (real - _origin_real) * _speed
+        _origin_real = real
+        _speed = float(speed)
+
+
+def speed():
+    return _speed
+
+
+def now():
+    return _origin_sim + (time.time() - _origin_real) * _speed
+
+
+def milliseconds():
+    return int(now() * 1000)
+
+
+def sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds / _speed)
+
+
+def advance(seconds):
+    # Jump simulated time forward (offline runs and benchmarks only)
+    global _origin_sim
+    with _lock:
+        _origin_sim += seconds
@@ -0,0 +1,100 @@
+# utils/entry_panel.py
+#
+# Batch version of evaluate_all_entry_conditions (utils/entry_conditions.py,
+# utils/indicators.py). The latest candle of every scanned symbol becomes one
+# row of an EntryPanel (aligned NumPy arrays); evaluate_panel runs the
+# compiled entry rules (utils/entry_rules.py) over all rows at once.
+# Explanations are only formatted for rows that pass, and match the
+# single-symbol functions' output exactly.
+
+import numpy as np
+
+from utils.entry_rules import ENTRY_FIELDS, NO_ENTRY_MESSAGE, entry_plan
+
+PANEL_FIELDS = ENTRY_FIELDS
+
+
+class EntryPanel:
+    # One row per symbol; keys[i] identifies the candles row i was built from (see panel_from_engine)
+    def __init__(self, symbols, columns, keys=None):
+        self.symbols = list(symbols)
+        self.columns = {f: np.asarray(columns[f], dtype=float) for f in PANEL_FIELDS}
+        self.keys = keys or [None] * len(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def row(self, i):
+        return {f: float(self.columns[f][i]) for f in PANEL_FIELDS}
+
+
+def panel_from_frames(symbols, frames):
+    # frames: [(df15, df1h)] with indicator columns attached, like bot.load_symbol_frames() returns
+    columns = {f: np.full(len(symbols), np.nan) for f in PANEL_FIELDS}
+    for i, (df15, df1h) in enumerate(frames):
+        last = df15.iloc[-1]
+        for f in PANEL_FIELDS[:-1]:
+            columns[f][i] = last[f]
+        columns['sma_1h'][i] = df1h['sma'].iloc[-1] if 'sma' in df1h.columns else 0
+    return EntryPanel(symbols, columns)
+
+
+def panel_from_engine(symbols, indicator_engine, candle_store):
+    # Latest streamed indicator values (utils/streaming_indicators.py) plus the last stored candle.
+    # keys[i] = (15m ts, close, volume, 1h ts) so callers can tell whether a frame is the one evaluated.
+    columns = {f: np.full(len(symbols), np.nan) for f in PANEL_FIELDS}
+    keys = []
+    for i, symbol in enumerate(symbols):
+        rows15 = candle_store.rows(symbol, '15m')
+        ind15 = indicator_engine.latest(symbol, '15m')
+        ind1h = indicator_engine.latest(symbol, '1h')
+        if not rows15 or not ind15:
+            keys.append(None)
+            continue
+        ts, _, _, _, close, volume = rows15[-1][:6]
+        columns['close'][i] = close
+        columns['volume'][i] = volume
+        for f in ('rsi', 'macd_hist', 'lower_band', 'volume_avg'):
+            columns[f][i] = ind15[f]
+        columns['sma_1h'][i] = ind1h.get('sma', 0) if ind1h else 0
+        keys.append((ts, close, volume, candle_store.last_timestamp(symbol, '1h')))
+    return EntryPanel(symbols, columns, keys)
+
+
+def _ms(ts):
+    return int(ts.value // 10**6) if hasattr(ts, 'value') else int(ts)
+
+
+def frame_key(df15, df1h):
+    # Same identity as panel_from_engine's keys, taken from the frames a single-symbol check would use
+    last = df15.iloc[-1]
+    return _ms(last['timestamp']), float(last['close']), float(last['volume']), _ms(df1h['timestamp'].iloc[-1])
+
+
+class PanelResult:
+    def __init__(self, panel, result):
+        self.panel = panel
+        self.result = result            # utils.entry_rules.RuleResult, one row per panel symbol
+        self.scores = result.scores     # (symbols, strategies) int
+        self.passed = result.passed     # (symbols, strategies) bool
+        self.best = result.best         # winning strategy index per symbol, -1 if none passed
+
+    @property
+    def any_passed(self):
+        return self.result.any_passed
+
+    def outcome(self, i):
+        # (passed, strategy, explanation) exactly as evaluate_all_entry_conditions returns it
+        return self.result.outcome(i, self.panel.row(i))
+
+    def outcomes(self):
+        # symbol -> outcome; only passing symbols pay for string formatting
+        result = dict.fromkeys(self.panel.symbols, (False, None, NO_ENTRY_MESSAGE))
+        for i in np.flatnonzero(self.any_passed):
+            result[self.panel.symbols[i]] = self.outcome(i)
+        return result
+
+
+def evaluate_panel(panel, default_min_score=None):
+    # default_min_score overrides Default Logic's threshold (utils/indicators.py uses config.min_entry_signals_required)
+    return PanelResult(panel, entry_plan(default_min_score).evaluate(panel.columns))
@@ -0,0 +1,254 @@
+# utils/entry_rules.py
+#
+# Entry strategies declared as data. A condition compares one field of the
+# latest candle with a constant, another field or a scaled field; a Strategy
+# weights some conditions, may gate on others (required / excluded) and
+# passes at a score threshold. RuleSet.compile() turns a set of strategies
+# into a Plan: every distinct condition is evaluated once, as one NumPy
+# comparison over all rows, and the strategy scores are a single matrix
+# product. One row = one symbol's latest candle (per-symbol checks), many
+# rows = the scanned universe (utils/entry_panel.py) or a whole history
+# (utils/backtest.py). New strategies are new entries here; the evaluation
+# code does not change.
+
+import operator
+
+import numpy as np
+
+_OPS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# name -> (field, op, operand); operand = number, field name, or (field, factor)
+CONDITIONS = {
+    'rsi_oversold': ('rsi', '<', 30),
+    'macd_positive': ('macd_hist', '>', 0),
+    'below_lower_band': ('close', '<', 'lower_band'),
+    'volume_above_avg': ('volume', '>', 'volume_avg'),
+    'macd_above_signal': ('macd', '>', 'signal'),
+    'macd_below_signal': ('macd', '<', 'signal'),
+    'at_lower_band': ('close', '<=', 'lower_band'),
+    'at_upper_band': ('close', '>=', 'upper_band'),
+    'volume_rising': ('volume', '>', 'prev_volume'),
+    'near_1h_sma': ('close', '<', ('sma_1h', 1.01)),
+}
+
+NO_ENTRY_MESSAGE = "❌ No entry condition met in any strategy."
+
+
+class Strategy:
+    def __init__(self, name, conditions, threshold=None, required=(), excluded=(), details=None, rank=None):
+        # conditions: names (weight 1 each) or {name: weight}; threshold None = every weighted condition
+        # rank: score used to pick the winner when several strategies pass (None = its own score)
+        self.name = name
+        self.weights = dict(conditions) if isinstance(conditions, dict) else dict.fromkeys(conditions, 1)
+        self.threshold = sum(self.weights.values()) if threshold is None else threshold
+        self.required = tuple(required)
+        self.excluded = tuple(excluded)
+        self.details = details
+        self.rank = rank
+
+    def conditions(self):
+        return list(self.weights) + list(self.required) + list(self.excluded)
+
+
+class RuleSet:
+    def __init__(self, strategies, conditions=None):
+        self.strategies = list(strategies)
+        self.conditions = CONDITIONS if conditions is None else conditions
+        self._plans = {}
+
+    def names(self):
+        return [s.name for s in self.strategies]
+
+    def compile(self, thresholds=None):
+        # thresholds: {strategy name: score} overriding the declared ones; plans are cached per override
+        key = tuple(sorted((thresholds or {}).items()))
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = Plan(self, dict(thresholds or {}))
+        return plan
+
+
+class Plan:
+    def __init__(self, rules, thresholds):
+        self.strategies = rules.strategies
+        used = []
+        for strategy in self.strategies:
+            for name in strategy.conditions():
+                if name not in rules.conditions:
+                    raise KeyError(f"Strategy {strategy.name!r} uses unknown condition {name!r}")
+                if name not in used:
+                    used.append(name)
+        self.condition_names = used
+        self.checks = [self._check(rules.conditions[name]) for name in used]
+        self.fields = sorted({f for name in used for f in self._fields(rules.conditions[name])})
+
+        index = {name: i for i, name in enumerate(used)}
+        shape = (len(used), len(self.strategies))
+        self.weights = np.zeros(shape, dtype=np.int64)
+        self.required = np.zeros(shape, dtype=np.int64)
+        self.excluded = np.zeros(shape, dtype=np.int64)
+        for j, strategy in enumerate(self.strategies):
+            for name, weight in strategy.weights.items():
+                self.weights[index[name], j] = weight
+            for name in strategy.required:
+                self.required[index[name], j] = 1
+            for name in strategy.excluded:
+                self.excluded[index[name], j] = 1
+        self.required_count = self.required.sum(axis=0)
+        self.thresholds = np.array([thresholds.get(s.name, s.threshold) for s in self.strategies])
+        # Winner between passing strategies: highest (rank score, name), as the hand-written evaluators sorted
+        self.name_rank = np.argsort(np.argsort([s.name for s in self.strategies]))
+        self.fixed_rank = np.array([-1 if s.rank is None else s.rank for s in self.strategies])
+
+        # Same plan as plain index lists for evaluate_row
+        self._rows = [
+            ([(index[n], w) for n, w in s.weights.items()], [index[n] for n in s.required],
+             [index[n] for n in s.excluded], int(threshold), s.rank, int(name_rank))
+            for s, threshold, name_rank in zip(self.strategies, self.thresholds, self.name_rank)
+        ]
+
+    @staticmethod
+    def _fields(spec):
+        field, _, operand = spec
+        if isinstance(operand, str):
+            return field, operand
+        if isinstance(operand, tuple):
+            return field, operand[0]
+        return (field,)
+
+    @staticmethod
+    def _check(spec):
+        field, op, operand = spec
+        compare = _OPS[op]
+        if isinstance(operand, str):
+            return lambda c: compare(c[field], c[operand])
+        if isinstance(operand, tuple):
+            other, factor = operand
+            return lambda c: compare(c[field], c[other] * factor)
+        return lambda c: compare(c[field], operand)
+
+    def evaluate(self, columns):
+        # columns: field -> array (one value per row); missing / NaN values make their conditions False
+        with np.errstate(invalid='ignore'):
+            matrix = np.column_stack([np.asarray(check(columns), dtype=bool) for check in self.checks])
+        hits = matrix.astype(np.int64)
+        scores = hits @ self.weights
+        passed = ((scores >= self.thresholds)
+                  & (hits @ self.required == self.required_count)
+                  & (hits @ self.excluded == 0))
+        rank_score = np.where(self.fixed_rank >= 0, self.fixed_rank, scores)
+        rank = np.where(passed, rank_score * len(self.strategies) + self.name_rank, -1)
+        best = np.where(passed.any(axis=1), rank.argmax(axis=1), -1)
+        return RuleResult(self, matrix, scores, passed, best)
+
+    def evaluate_row(self, values):
+        # Single symbol: values = field -> scalar. Same plan in plain Python, which beats array setup for one row
+        hits = [bool(check(values)) for check in self.checks]
+        scores, passed = [], []
+        best, best_rank = -1, -1
+        for j, (weighted, required, excluded, threshold, fixed_rank, name_rank) in enumerate(self._rows):
+            score = sum(w for i, w in weighted if hits[i])
+            ok = (score >= threshold and all(hits[i] for i in required)
+                  and not any(hits[i] for i in excluded))
+            scores.append(score)
+            passed.append(ok)
+            rank = (score if fixed_rank is None else fixed_rank) * len(self._rows) + name_rank
+            if ok and rank > best_rank:
+                best, best_rank = j, rank
+        return RuleResult(self, np.array([hits]), np.array([scores]), np.array([passed]), np.array([best]))
+
+
+class RuleResult:
+    def __init__(self, plan, matrix, scores, passed, best):
+        self.plan = plan
+        self.matrix = matrix            # (rows, conditions) bool
+        self.scores = scores            # (rows, strategies) int
+        self.passed = passed            # (rows, strategies) bool
+        self.best = best                # winning strategy index per row, -1 if none passed
+
+    @property
+    def any_passed(self):
+        return self.best >= 0
+
+    def condition(self, name):
+        return self.matrix[:, self.plan.condition_names.index(name)]
+
+    def strategy_passed(self, name):
+        return self.passed[:, [s.name for s in self.plan.strategies].index(name)]
+
+    def strategy_score(self, name):
+        return self.scores[:, [s.name for s in self.plan.strategies].index(name)]
+
+    def best_name(self, i=0):
+        b = int(self.best[i])
+        return self.plan.strategies[b].name if b >= 0 else None
+
+    def outcome(self, i, values):
+        # (passed, strategy, explanation) for row i, as evaluate_all_entry_conditions returns it
+        b = int(self.best[i])
+        if b < 0:
+            return False, None, NO_ENTRY_MESSAGE
+        strategy = self.plan.strategies[b]
+        trend = "Below SMA" if values['close'] < values['sma_1h'] else "Above SMA"
+        return True, strategy.name, f"{strategy.details.format(**values)} | Score: {int(self.scores[i, b])} | Trend: {trend}"
+
+
+# === Rule sets ===
+
+# evaluate_all_entry_conditions: Default Logic's threshold is config.min_entry_signals_required
+# (utils/indicators.py) or 3 (utils/entry_conditions.py), see entry_plan(). The two-condition
+# strategies rank at 1, as their numpy-bool sums did in the original evaluators, so a passing
+# Default Logic still wins over them; their reported Score is the real count (2).
+ENTRY_RULES = RuleSet([
+    Strategy(
+        'Default Logic', ('rsi_oversold', 'macd_positive', 'below_lower_band', 'volume_above_avg'), threshold=3,
+        details="RSI: {rsi:.2f}, MACD Hist: {macd_hist:.4f}, Price: {close:.4f}, "
+                "BB: {lower_band:.4f}, Vol: {volume:.0f} > Avg: {volume_avg:.0f}"
+    ),
+    Strategy('RSI + MACD', ('rsi_oversold', 'macd_positive'), rank=1,
+             details="RSI: {rsi:.2f}, MACD Hist: {macd_hist:.4f}"),
+    Strategy('MACD + Volume', ('macd_positive', 'volume_above_avg'), rank=1,
+             details="MACD Hist: {macd_hist:.4f}, Volume: {volume:.0f} > Avg: {volume_avg:.0f}"),
+    Strategy('RSI + Bollinger Bands', ('rsi_oversold', 'below_lower_band'), rank=1,
+             details="RSI: {rsi:.2f}, Price: {close:.4f} < Lower BB: {lower_band:.4f}"),
+])
+
+# bot.check_indicators: the two entry gates plus the buy / sell signal it reports
+SIGNAL_RULES = RuleSet([
+    Strategy('Confluence', ('rsi_oversold', 'macd_above_signal', 'at_lower_band', 'volume_rising'),
+             threshold=3, required=('near_1h_sma',)),
+    Strategy('RSI + Volume', ('rsi_oversold', 'volume_rising'), required=('near_1h_sma',)),
+    Strategy('buy', ('rsi_oversold', 'macd_above_signal', 'at_lower_band', 'volume_rising', 'near_1h_sma')),
+    Strategy('sell', ('macd_below_signal', 'at_upper_band', 'volume_rising'), excluded=('rsi_oversold',)),
+])
+SIGNAL_GATES = ('Confluence', 'RSI + Volume')
+
+ENTRY_FIELDS = ('close', 'rsi', 'macd_hist', 'lower_band', 'volume', 'volume_avg', 'sma_1h')
+
+
+def entry_plan(default_min_score=None):
+    return ENTRY_RULES.compile(None if default_min_score is None else {'Default Logic': default_min_score})
+
+
+def frame_values(df15, df1h, fields=ENTRY_FIELDS, volume_lookback=20):
+    # Latest-candle values for a per-symbol check; sma_1h = 0 without an SMA column, like the original checks
+    values = {}
+    for f in fields:
+        if f == 'sma_1h':
+            values[f] = float(df1h['sma'].iat[-1]) if 'sma' in df1h.columns else 0.0
+        elif f == 'prev_volume':
+            values[f] = float(df15['volume'].iat[-2])
+        elif f == 'volume_avg' and f not in df15.columns:
+            values[f] = float(df15['volume'].rolling(window=int(volume_lookback)).mean().iloc[-1])
+        else:
+            values[f] = float(df15[f].iat[-1])
+    return values
+
+
+def evaluate_entry(df15, df1h, default_min_score=None, volume_lookback=20):
+    # Per-symbol evaluate_all_entry_conditions through the compiled entry plan
+    try:
+        values = frame_values(df15, df1h, volume_lookback=volume_lookback)
+        return entry_plan(default_min_score).evaluate_row(values).outcome(0, values)
+    except Exception as e:
+        return False, None, f"⚠️ Error evaluating entry conditions: {e}"
@@ -1,16 +1,42 @@
 # utils/exchange_utils.py
 
 import ccxt
+import config
 from config import mexc_api_key, mexc_api_secret
 import json
 import os
+from utils.request_coalescer import CoalescingExchange
+from utils.rate_limiter import limit_exchange
+from utils.metrics import instrument_exchange
 
-# Initialize MEXC Exchange
-exchange = ccxt.mexc({
-    'apiKey': mexc_api_key,
-    'secret': mexc_api_secret,
-    'enableRateLimit': True
-})
+# Build the exchange selected by config.exchange_backend: a ccxt exchange id
+# ('mexc') or 'fake' for the offline simulated exchange (utils/fake_exchange.py)
+def create_exchange(backend=None):
+    backend = backend or getattr(config, 'exchange_backend', 'mexc')
+    if backend == 'fake':
+        from utils.fake_exchange import FakeExchange
+        client = FakeExchange(**getattr(config, 'fake_exchange', {}))
+    else:
+        client = getattr(ccxt, backend)({
+            'apiKey': mexc_api_key,
+            'secret': mexc_api_secret,
+            'enableRateLimit': True
+        })
+    # Latency is timed next to the client, so it excludes rate limiter waits and coalesced reads
+    return rate_limited(instrument_exchange(client))
+
+# Route a client through the process-wide limiter for its exchange/account (utils/rate_limiter.py)
+def rate_limited(client):
+    if not getattr(config, 'shared_rate_limit', True):
+        return client
+    limits = getattr(config, 'rate_limits', {})
+    return limit_exchange(client, limits.get('buckets'), limits.get('endpoints'))
+
+# Initialize the shared exchange (MEXC unless configured otherwise). Every thread goes through
+# this one client, so identical concurrent reads are coalesced into a single request.
+exchange = create_exchange()
+if getattr(config, 'coalesce_requests', True):
+    exchange = CoalescingExchange(exchange, getattr(config, 'coalesce_freshness', None))
 
 def validate_api_keys():
     try:
@@ -39,6 +65,25 @@ def save_daily_loss(data):
 def get_exchange():
     return exchange
 
+# Async twin of a sync exchange (same class and credentials) for the asyncio engine
+def create_async_exchange(sync_exchange=None):
+    import ccxt.async_support as ccxt_async
+
+    sync_exchange = sync_exchange or exchange
+    if sync_exchange.id == 'fake':
+        from utils.fake_exchange import AsyncFakeExchange
+        return AsyncFakeExchange(sync_exchange)
+    exchange_class = getattr(ccxt_async, sync_exchange.id)
+    async_exchange = exchange_class({
+        'apiKey': sync_exchange.apiKey,
+        'secret': sync_exchange.secret,
+        # With the shared limiter on, the async engine takes its tokens from it instead
+        'enableRateLimit': not getattr(config, 'shared_rate_limit', True)
+    })
+    if sync_exchange.markets:
+        async_exchange.set_markets(sync_exchange.markets)
+    return async_exchange
+
 # Safe OHLCV fetch wrapper
 def fetch_ohlcv_safe(symbol, timeframe='1h', limit=100):
     try:
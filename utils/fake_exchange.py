@@ -0,0 +1,667 @@
+# utils/fake_exchange.py
+#
+# Offline stand-in for the ccxt exchange the bot trades on. It serves the
+# ccxt calls the bot uses (candles, tickers, balance, limit/market orders,
+# markets) from a local market: seeded random-walk pairs, or recorded 1m
+# candles that are replayed and then continue as a random walk. Latency, rate
+# limits, request errors and fill behaviour are configurable, and the market
+# runs on utils.clock, so speed > 1 soak-tests the whole bot faster than
+# wall-clock time. Select it with exchange_backend = 'fake' in config.py.
+
+import asyncio
+import functools
+import itertools
+import json
+import random
+import threading
+from datetime import datetime, timezone
+
+import ccxt
+import numpy as np
+
+from utils import clock
+from utils.candle_store import timeframe_to_ms
+from utils.price_watcher import MexcDealsProtocol
+
+MINUTE_MS = 60 * 1000
+DAY_MINUTES = 24 * 60
+DECIMAL_PLACES = 2  # ccxt.DECIMAL_PLACES
+FILL_MODES = ('immediate', 'touch', 'partial')
+
+
+class _MinuteSeries:
+    # 1m OHLCV for one symbol on the simulated timeline (index 0 = origin minute),
+    # generated lazily as simulated time passes
+
+    def __init__(self, rng, price, volatility, quote_volume, recorded=None):
+        self.rng = rng
+        self.volatility = volatility
+        self.base_volume = quote_volume / price
+        self.size = 0
+        self.data = np.empty((5, 4096))  # open, high, low, close, volume
+        if recorded is not None and len(recorded):
+            self._append(recorded)
+
+    def _append(self, block):
+        n = block.shape[1]
+        if self.size + n > self.data.shape[1]:
+            grown = np.empty((5, max(self.data.shape[1] * 2, self.size + n)))
+            grown[:, :self.size] = self.data[:, :self.size]
+            self.data = grown
+        self.data[:, self.size:self.size + n] = block
+        self.size += n
+
+    def _generate(self, n, last_close):
+        # Fat-tailed log returns so some pairs show up in the volatility scan
+        returns = self.rng.standard_t(4, n) * self.volatility
+        close = last_close * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([last_close], close[:-1]))
+        wick = np.abs(self.rng.standard_normal((2, n))) * self.volatility * 0.5
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = self.base_volume * self.rng.lognormal(0.0, 0.5, n) * (1 + 50 * np.abs(returns))
+        return np.vstack([open_, high, low, close, volume])
+
+    def extend_to(self, index, start_price):
+        missing = index + 1 - self.size
+        if missing > 0:
+            last_close = self.data[3, self.size - 1] if self.size else start_price
+            self._append(self._generate(missing, last_close))
+
+    def view(self, start, stop):
+        return self.data[:, start:stop]
+
+
+class FakeExchange:
+    id = 'fake'
+    name = 'Fake Exchange'
+    precisionMode = DECIMAL_PLACES
+    timeframes = {tf: tf for tf in ('1m', '5m', '15m', '30m', '1h', '4h', '1d')}
+    has = {
+        'fetchOHLCV': True, 'fetchTicker': True, 'fetchTickers': True, 'fetchBalance': True,
+        'fetchOrder': True, 'fetchOpenOrders': True, 'fetchOrderBook': True, 'cancelOrder': True,
+        'createLimitOrder': True, 'createMarketOrder': True, 'fetchPosition': False,
+    }
+
+    def __init__(self, symbols=50, recorded=None, history_minutes=20000, speed=1.0, latency_ms=50,
+                 latency_jitter_ms=50, rate_limit_per_sec=20, error_rate=0.0, fill_mode='touch',
+                 partial_fill_ratio=0.5, fee_rate=0.001, spread_bps=5, starting_balance=None, seed=42):
+        if fill_mode not in FILL_MODES:
+            raise ValueError(f"fill_mode must be one of {FILL_MODES}, got {fill_mode!r}")
+        clock.set_speed(speed)
+        self.apiKey = None
+        self.secret = None
+        self.enableRateLimit = True
+        self.rateLimit = 1000 / rate_limit_per_sec if rate_limit_per_sec else 0
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_limit_per_sec = rate_limit_per_sec
+        self.error_rate = error_rate
+        self.fill_mode = fill_mode
+        self.partial_fill_ratio = partial_fill_ratio
+        self.fee_rate = fee_rate
+        self.spread = spread_bps / 10000
+        self.origin_ms = clock.milliseconds() // MINUTE_MS * MINUTE_MS - history_minutes * MINUTE_MS
+
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._order_ids = itertools.count(1)
+        self._orders = {}
+        self._open_ids = []
+        self._tokens = float(rate_limit_per_sec or 0)
+        self._tokens_at = clock.now()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'fills': 0}
+
+        # === Market ===
+        if isinstance(symbols, int):
+            symbols = [f"SIM{i:03d}/USDT" for i in range(symbols)]
+        names = list(dict.fromkeys(list(symbols) + list(recorded or {})))
+        self._series = {}
+        self._start_price = {}
+        for i, symbol in enumerate(names):
+            rng = np.random.default_rng(seed * 100003 + i)
+            price = float(np.exp(rng.uniform(np.log(0.01), np.log(5))))
+            replay = None
+            if recorded and symbol in recorded:
+                replay = self._load_recorded(recorded[symbol])
+                price = float(replay[0, 0])
+            self._start_price[symbol] = price
+            self._series[symbol] = _MinuteSeries(
+                rng, price, volatility=rng.uniform(0.0005, 0.003),
+                quote_volume=rng.uniform(200, 3000), recorded=replay
+            )
+        self.markets = self._build_markets(names)
+        self.symbols = sorted(self.markets)
+
+        self._balance = {'USDT': 0.0}
+        self._balance.update(starting_balance or {'USDT': 160.0})
+        self._used = {}
+
+    @staticmethod
+    def _load_recorded(path):
+        from utils.backtest import load_candles
+
+        df = load_candles(path)
+        return df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float).T
+
+    def _build_markets(self, names):
+        markets = {}
+        for symbol in names:
+            base, quote = symbol.split('/')
+            price = self._start_price[symbol]
+            markets[symbol] = {
+                'id': base + quote, 'symbol': symbol, 'base': base, 'quote': quote,
+                'type': 'spot', 'spot': True, 'active': True,
+                'precision': {'amount': 2, 'price': max(4, int(np.ceil(-np.log10(price))) + 4)},
+                'limits': {'amount': {'min': 0.01, 'max': None}, 'cost': {'min': 1.0, 'max': None}},
+                'info': {},
+            }
+        return markets
+
+    # === ccxt housekeeping ===
+
+    def milliseconds(self):
+        return clock.milliseconds()
+
+    @staticmethod
+    def iso8601(timestamp):
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    @staticmethod
+    def parse_timeframe(timeframe):
+        return timeframe_to_ms(timeframe) // 1000
+
+    def load_markets(self, reload=False, params={}):
+        self._request('load_markets')
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        # Keep the simulated pairs; snapshots from disk only refresh metadata for known symbols
+        for symbol, market in markets.items():
+            if symbol in self._series:
+                self.markets[symbol] = market
+        self.symbols = sorted(self.markets)
+        return self.markets
+
+    def close(self):
+        pass
+
+    # === Request simulation: rate limit, latency, injected errors ===
+
+    def _request(self, method):
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.rate_limit_per_sec:
+                now = clock.now()
+                self._tokens = min(self._tokens + (now - self._tokens_at) * self.rate_limit_per_sec,
+                                   float(self.rate_limit_per_sec))
+                self._tokens_at = now
+                if self._tokens < 1:
+                    self.stats['rate_limited'] += 1
+                    raise ccxt.RateLimitExceeded(f"fake {method}: 429 Too Many Requests")
+                self._tokens -= 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+            latency = (self.latency_ms + self._random.random() * self.latency_jitter_ms) / 1000
+
+        clock.sleep(latency)
+        if fail:
+            self.stats['errors'] += 1
+            raise ccxt.NetworkError(f"fake {method}: simulated network error")
+
+    # === Prices ===
+
+    def _series_for(self, symbol):
+        series = self._series.get(symbol)
+        if series is None:
+            raise ccxt.BadSymbol(f"fake does not have market symbol {symbol}")
+        return series
+
+    def _minute_index(self, now_ms):
+        return (now_ms - self.origin_ms) // MINUTE_MS
+
+    def _current(self, symbol, now_ms):
+        # Series extended to the open minute, plus that minute's partial candle so far
+        series = self._series_for(symbol)
+        index = self._minute_index(now_ms)
+        series.extend_to(index, self._start_price[symbol])
+        o, h, l, c, v = series.data[:, index].tolist()
+        progress = (now_ms - self.origin_ms) % MINUTE_MS / MINUTE_MS
+        price = o + (c - o) * progress
+        partial = (o, max(o, price, o + (h - o) * progress), min(o, price, o - (o - l) * progress), price, v * progress)
+        return series, index, partial
+
+    def _last_price(self, symbol, now_ms=None):
+        return self._current(symbol, now_ms or clock.milliseconds())[2][3]
+
+    def _bid_ask(self, symbol, now_ms=None):
+        last = self._last_price(symbol, now_ms)
+        return last * (1 - self.spread / 2), last * (1 + self.spread / 2)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        self._request('fetch_ohlcv')
+        tf_ms = timeframe_to_ms(timeframe)
+        limit = min(limit or 500, 1000)
+        now_ms = clock.milliseconds()
+        with self._lock:
+            series, index, partial = self._current(symbol, now_ms)
+            current_bucket = now_ms // tf_ms * tf_ms
+            if since is None:
+                first_bucket = current_bucket - (limit - 1) * tf_ms
+            else:
+                first_bucket = -(-since // tf_ms) * tf_ms
+            if first_bucket > current_bucket:
+                return []
+            last_bucket = min(first_bucket + (limit - 1) * tf_ms, current_bucket)
+
+            start = max(self._minute_index(first_bucket), 0)
+            stop = min(self._minute_index(last_bucket + tf_ms - 1), index) + 1
+            if start >= stop:
+                return []
+            block = series.view(start, stop).copy()
+            if stop - 1 == index:
+                block[:, -1] = partial
+
+        timestamps = self.origin_ms + np.arange(start, stop) * MINUTE_MS
+        buckets = timestamps // tf_ms * tf_ms
+        edges = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[edges[1:], len(buckets)] - 1
+        rows = np.column_stack([
+            block[0, edges],
+            np.maximum.reduceat(block[1], edges),
+            np.minimum.reduceat(block[2], edges),
+            block[3, ends],
+            np.add.reduceat(block[4], edges),
+        ])
+        return [[int(ts)] + row for ts, row in zip(buckets[edges], rows.tolist())]
+
+    def _ticker(self, symbol, now_ms):
+        series, index, partial = self._current(symbol, now_ms)
+        start = max(index - DAY_MINUTES + 1, 0)
+        day = series.view(start, index + 1)
+        last = partial[3]
+        open_ = day[0, 0]
+        volume = float(day[4, :-1].sum() + partial[4])
+        quote_volume = float((day[4, :-1] * day[3, :-1]).sum() + partial[4] * last)
+        return {
+            'symbol': symbol,
+            'timestamp': now_ms,
+            'datetime': self.iso8601(now_ms),
+            'high': float(max(day[1, :-1].max(initial=partial[1]), partial[1])),
+            'low': float(min(day[2, :-1].min(initial=partial[2]), partial[2])),
+            'bid': last * (1 - self.spread / 2),
+            'ask': last * (1 + self.spread / 2),
+            'open': float(open_),
+            'close': float(last),
+            'last': float(last),
+            'change': float(last - open_),
+            'percentage': float((last - open_) / open_ * 100),
+            'baseVolume': volume,
+            'quoteVolume': quote_volume,
+            'info': {},
+        }
+
+    def fetch_ticker(self, symbol, params={}):
+        self._request('fetch_ticker')
+        with self._lock:
+            self._match_orders()
+            return self._ticker(symbol, clock.milliseconds())
+
+    def fetch_tickers(self, symbols=None, params={}):
+        self._request('fetch_tickers')
+        now_ms = clock.milliseconds()
+        with self._lock:
+            self._match_orders()
+            return {s: self._ticker(s, now_ms) for s in (symbols or self.symbols) if s in self._series}
+
+    def fetch_order_book(self, symbol, limit=None, params={}):
+        self._request('fetch_order_book')
+        with self._lock:
+            bid, ask = self._bid_ask(symbol)
+        depth = limit or 5
+        size = self._series_for(symbol).base_volume
+        return {
+            'symbol': symbol,
+            'bids': [[bid * (1 - self.spread * i), size] for i in range(depth)],
+            'asks': [[ask * (1 + self.spread * i), size] for i in range(depth)],
+            'timestamp': clock.milliseconds(),
+        }
+
+    def fetch_position(self, symbol, params={}):
+        raise ccxt.NotSupported("fake fetch_position() is not supported (spot only)")
+
+    # === Account ===
+
+    def fetch_balance(self, params={}):
+        self._request('fetch_balance')
+        with self._lock:
+            self._match_orders()
+            balance = {'info': {}, 'free': {}, 'used': {}, 'total': {}}
+            for currency in set(self._balance) | set(self._used):
+                free = self._balance.get(currency, 0.0)
+                used = self._used.get(currency, 0.0)
+                balance[currency] = {'free': free, 'used': used, 'total': free + used}
+                balance['free'][currency] = free
+                balance['used'][currency] = used
+                balance['total'][currency] = free + used
+            return balance
+
+    def _reserve(self, currency, amount):
+        if self._balance.get(currency, 0.0) + 1e-12 < amount:
+            raise ccxt.InsufficientFunds(
+                f"fake: insufficient {currency} balance ({self._balance.get(currency, 0.0):.8f} < {amount:.8f})"
+            )
+        self._balance[currency] = self._balance.get(currency, 0.0) - amount
+        self._used[currency] = self._used.get(currency, 0.0) + amount
+
+    def _release(self, currency, amount):
+        self._used[currency] = self._used.get(currency, 0.0) - amount
+        self._balance[currency] = self._balance.get(currency, 0.0) + amount
+
+    # === Orders ===
+
+    def _new_order(self, symbol, type_, side, amount, price):
+        self._series_for(symbol)
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f"fake: invalid amount {amount} for {symbol}")
+        if type_ == 'limit' and (price is None or price <= 0):
+            raise ccxt.InvalidOrder(f"fake: invalid price {price} for {symbol}")
+        now_ms = clock.milliseconds()
+        return {
+            'id': str(next(self._order_ids)), 'clientOrderId': None, 'symbol': symbol,
+            'timestamp': now_ms, 'datetime': self.iso8601(now_ms), 'lastTradeTimestamp': None,
+            'type': type_, 'side': side, 'price': price, 'amount': float(amount),
+            'filled': 0.0, 'remaining': float(amount), 'cost': 0.0, 'average': None,
+            'status': 'open', 'fee': {'cost': 0.0, 'currency': 'USDT'}, 'trades': [], 'info': {},
+        }
+
+    def _fill(self, order, qty, price):
+        base, quote = order['symbol'].split('/')
+        qty, price = float(qty), float(price)
+        cost = qty * price
+        fee = cost * self.fee_rate
+        if order['side'] == 'buy':
+            reserved = qty * order['price'] * (1 + self.fee_rate)  # buys reserve quote incl. fee
+            self._used[quote] = self._used.get(quote, 0.0) - reserved
+            self._balance[quote] = self._balance.get(quote, 0.0) + reserved - cost - fee
+            self._balance[base] = self._balance.get(base, 0.0) + qty
+        else:
+            self._used[base] = self._used.get(base, 0.0) - qty
+            self._balance[quote] = self._balance.get(quote, 0.0) + cost - fee
+
+        order['filled'] += qty
+        order['remaining'] = max(order['amount'] - order['filled'], 0.0)
+        order['cost'] += cost
+        order['average'] = order['cost'] / order['filled']
+        order['fee']['cost'] += fee
+        order['lastTradeTimestamp'] = clock.milliseconds()
+        if order['remaining'] <= 1e-12:
+            order['remaining'] = 0.0
+            order['status'] = 'closed'
+        self.stats['fills'] += 1
+
+    def _try_fill(self, order, now_ms):
+        bid, ask = self._bid_ask(order['symbol'], now_ms)
+        if self.fill_mode != 'immediate':
+            touched = ask <= order['price'] if order['side'] == 'buy' else bid >= order['price']
+            if not touched:
+                return
+        qty = order['remaining']
+        if self.fill_mode == 'partial':
+            qty = max(qty * self.partial_fill_ratio, min(qty, 0.01))
+        # Marketable limits fill at the touch, resting ones at their limit
+        price = min(order['price'], ask) if order['side'] == 'buy' else max(order['price'], bid)
+        self._fill(order, qty, price)
+
+    def _match_orders(self):
+        # Limit orders fill lazily, whenever the simulated account or market is looked at
+        if not self._open_ids:
+            return
+        now_ms = clock.milliseconds()
+        still_open = []
+        for order_id in self._open_ids:
+            order = self._orders[order_id]
+            self._try_fill(order, now_ms)
+            if order['status'] == 'open':
+                still_open.append(order_id)
+        self._open_ids = still_open
+
+    def _place_limit(self, symbol, side, amount, price):
+        with self._lock:
+            order = self._new_order(symbol, 'limit', side, amount, price)
+            base, quote = symbol.split('/')
+            if side == 'buy':
+                self._reserve(quote, order['amount'] * price * (1 + self.fee_rate))
+            else:
+                self._reserve(base, order['amount'])
+            self._orders[order['id']] = order
+            self._try_fill(order, order['timestamp'])
+            if order['status'] == 'open':
+                self._open_ids.append(order['id'])
+            return dict(order)
+
+    def _place_market(self, symbol, side, amount):
+        with self._lock:
+            order = self._new_order(symbol, 'market', side, amount, None)
+            base, quote = symbol.split('/')
+            bid, ask = self._bid_ask(symbol, order['timestamp'])
+            price = float(ask if side == 'buy' else bid)
+            if side == 'buy':
+                self._reserve(quote, order['amount'] * price * (1 + self.fee_rate))
+            else:
+                self._reserve(base, order['amount'])
+            order['price'] = price
+            self._orders[order['id']] = order
+            self._fill(order, order['amount'], price)
+            return dict(order)
+
+    def create_limit_buy_order(self, symbol, amount, price, params={}):
+        self._request('create_limit_buy_order')
+        return self._place_limit(symbol, 'buy', amount, price)
+
+    def create_limit_sell_order(self, symbol, amount, price, params={}):
+        self._request('create_limit_sell_order')
+        return self._place_limit(symbol, 'sell', amount, price)
+
+    def create_market_buy_order(self, symbol, amount, params={}):
+        self._request('create_market_buy_order')
+        return self._place_market(symbol, 'buy', amount)
+
+    def create_market_sell_order(self, symbol, amount, params={}):
+        self._request('create_market_sell_order')
+        return self._place_market(symbol, 'sell', amount)
+
+    def create_order(self, symbol, type, side, amount, price=None, params={}):
+        if type == 'limit':
+            return getattr(self, f"create_limit_{side}_order")(symbol, amount, price)
+        return getattr(self, f"create_market_{side}_order")(symbol, amount)
+
+    def _get_order(self, order_id):
+        order = self._orders.get(str(order_id))
+        if order is None:
+            raise ccxt.OrderNotFound(f"fake: order {order_id} not found")
+        return order
+
+    def fetch_order(self, id, symbol=None, params={}):
+        self._request('fetch_order')
+        with self._lock:
+            self._match_orders()
+            return dict(self._get_order(id))
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._request('fetch_open_orders')
+        with self._lock:
+            self._match_orders()
+            orders = [dict(self._orders[i]) for i in self._open_ids
+                      if symbol is None or self._orders[i]['symbol'] == symbol]
+        return orders[-limit:] if limit else orders
+
+    def cancel_order(self, id, symbol=None, params={}):
+        self._request('cancel_order')
+        with self._lock:
+            self._match_orders()
+            order = self._get_order(id)
+            if order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"fake: order {id} is already {order['status']}")
+            base, quote = order['symbol'].split('/')
+            if order['side'] == 'buy':
+                self._release(quote, order['remaining'] * order['price'] * (1 + self.fee_rate))
+            else:
+                self._release(base, order['remaining'])
+            order['status'] = 'canceled'
+            self._open_ids.remove(order['id'])
+            return dict(order)
+
+
+class AsyncFakeExchange:
+    # ccxt.async_support-shaped view of a FakeExchange (same market and account);
+    # blocking calls run in the default executor so simulated latency overlaps
+
+    _ASYNC_METHODS = {
+        'load_markets', 'fetch_ohlcv', 'fetch_ticker', 'fetch_tickers', 'fetch_order_book', 'fetch_balance',
+        'fetch_order', 'fetch_open_orders', 'cancel_order', 'create_order', 'create_limit_buy_order',
+        'create_limit_sell_order', 'create_market_buy_order', 'create_market_sell_order',
+    }
+
+    def __init__(self, exchange):
+        self._exchange = exchange
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if name not in self._ASYNC_METHODS:
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(attr, *args, **kwargs))
+        return call
+
+    async def close(self):
+        pass
+
+
+def _pb_varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _pb_field(field, value):
+    # Length-delimited (str / bytes / nested message) or varint (int) field
+    if isinstance(value, int):
+        return _pb_varint(field << 3) + _pb_varint(value)
+    if isinstance(value, str):
+        value = value.encode()
+    return _pb_varint(field << 3 | 2) + _pb_varint(len(value)) + value
+
+
+def encode_aggre_deal(channel, market_id, price, ts_ms):
+    # PushDataV3ApiWrapper { channel, symbol, publicAggreDeals { deals [{ price, quantity, tradeType, time }] } }
+    item = _pb_field(1, f"{price:.10g}") + _pb_field(2, '1') + _pb_field(3, 1) + _pb_field(4, ts_ms)
+    deals = _pb_field(1, item) + _pb_field(2, 'spot@public.aggre.deals.v3.api.pb@100ms')
+    return (_pb_field(1, channel + market_id) + _pb_field(3, market_id)
+            + _pb_field(314, deals) + _pb_field(6, ts_ms))
+
+
+class FakePriceServer:
+    # Local WebSocket stand-in for the exchange deals stream (MEXC spot v3
+    # aggregated deals, protobuf pushes, see utils.price_watcher.MexcDealsProtocol),
+    # fed from a FakeExchange. Needs aiohttp; start() returns the ws:// URL to
+    # point the price watcher at.
+
+    channel = MexcDealsProtocol.channel
+
+    def __init__(self, exchange, host='127.0.0.1', port=0, interval=0.5):
+        self.exchange = exchange
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.url = None
+        self.stats = {'clients': 0, 'messages': 0}
+        self._ids = {m['id']: symbol for symbol, m in exchange.markets.items()}
+        self._ready = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._clients = set()
+
+    async def _handle(self, request):
+        from aiohttp import web, WSMsgType
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._clients.add(ws)
+        self.stats['clients'] += 1
+        subscribed = set()
+
+        async def push():
+            while not ws.closed:
+                now_ms = clock.milliseconds()
+                for market_id in list(subscribed):
+                    with self.exchange._lock:
+                        price = self.exchange._last_price(self._ids[market_id], now_ms)
+                    await ws.send_bytes(encode_aggre_deal(self.channel, market_id, price, now_ms))
+                    self.stats['messages'] += 1
+                await asyncio.sleep(self.interval / clock.speed())
+
+        pusher = asyncio.ensure_future(push())
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                data = json.loads(msg.data)
+                method = data.get('method')
+                params = [p[len(self.channel):] for p in data.get('params', []) if p.startswith(self.channel)]
+                if method == 'PING':
+                    await ws.send_json({'id': 0, 'code': 0, 'msg': 'PONG'})
+                elif method == 'SUBSCRIPTION':
+                    subscribed.update(p for p in params if p in self._ids)
+                    await ws.send_json({'id': 0, 'code': 0, 'msg': ','.join(data.get('params', []))})
+                elif method == 'UNSUBSCRIPTION':
+                    subscribed.difference_update(params)
+                    await ws.send_json({'id': 0, 'code': 0, 'msg': ','.join(data.get('params', []))})
+        finally:
+            pusher.cancel()
+            self._clients.discard(ws)
+        return ws
+
+    async def _serve(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/ws', self._handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{self.host}:{self.port}/ws"
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._ready.set()
+        await self._stop.wait()
+        for ws in list(self._clients):
+            await ws.close()
+        await runner.cleanup()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+            self._thread.start()
+            self._ready.wait(10)
+        return self.url
+
+    def stop(self):
+        # Drops every connection, like an exchange-side disconnect
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(10)
+            self._thread = None
+            self._ready.clear()
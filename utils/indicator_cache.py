@@ -0,0 +1,103 @@
+# utils/indicator_cache.py
+#
+# Per-candle memoization for indicator columns. Entries are keyed by
+# (symbol, timeframe, last candle timestamp, indicator params), so every caller
+# in the same cycle gets the same computed column. When a new candle arrives
+# the whole (symbol, timeframe) entry is evicted.
+
+import threading
+
+import ta
+import config
+
+
+class IndicatorCache:
+    def __init__(self):
+        self._entries = {}          # (symbol, tf) -> {'ts', 'fingerprint', 'values'}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _fingerprint(df):
+        # The still-open candle keeps its timestamp while price moves, so its values are part of the key check
+        last = df.iloc[-1]
+        return len(df), float(last['high']), float(last['low']), float(last['close']), float(last['volume'])
+
+    def get(self, df, name, params, compute):
+        symbol = df.attrs.get('symbol')
+        tf = df.attrs.get('timeframe')
+        if symbol is None or tf is None or df.empty:
+            self.misses += 1
+            return compute()
+
+        key = (symbol, tf)
+        ts = df['timestamp'].iloc[-1]
+        fingerprint = self._fingerprint(df)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and ts < entry['ts']:
+                # Older frame than what we already cache: don't let it evict the newer entry
+                entry = None
+                cacheable = False
+            else:
+                cacheable = True
+                if entry is None or entry['ts'] != ts or entry['fingerprint'] != fingerprint:
+                    if entry is not None:
+                        self.evictions += 1
+                    entry = {'ts': ts, 'fingerprint': fingerprint, 'values': {}}
+                    self._entries[key] = entry
+                value = entry['values'].get((name, params))
+                if value is not None:
+                    self.hits += 1
+                    return value
+
+        self.misses += 1
+        value = compute()
+        if cacheable:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    entry['values'][(name, params)] = value
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'series': len(self._entries),
+        }
+
+
+indicator_cache = IndicatorCache()
+
+
+def cached_atr(df, window=14):
+    # Reuse the streamed column when the frame already carries it with the same window
+    if 'atr' in df.columns and window == config.atr_period:
+        compute = lambda: df['atr']
+    else:
+        compute = lambda: ta.volatility.AverageTrueRange(
+            high=df['high'], low=df['low'], close=df['close'], window=window
+        ).average_true_range()
+    return indicator_cache.get(df, 'atr', (window,), compute)
+
+
+def cached_rsi(df, window=14):
+    if 'rsi' in df.columns and window == 14:
+        compute = lambda: df['rsi']
+    else:
+        compute = lambda: ta.momentum.RSIIndicator(close=df['close'], window=window).rsi()
+    return indicator_cache.get(df, 'rsi', (window,), compute)
+
+
+def cached_volume_mean(df, window=20):
+    if 'volume_avg' in df.columns and window == int(config.volume_lookback):
+        compute = lambda: df['volume_avg']
+    else:
+        compute = lambda: df['volume'].rolling(window=window).mean()
+    return indicator_cache.get(df, 'volume_mean', (window,), compute)
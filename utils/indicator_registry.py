@@ -0,0 +1,194 @@
+# utils/indicator_registry.py
+#
+# Declarative indicator columns. Each registered indicator names the columns
+# it produces, the columns it needs (raw OHLCV or other indicators) and the
+# params it reads. IndicatorFrame computes a column the first time it is
+# asked for, resolving its dependencies first, and stores it on the frame so
+# every strategy reading it afterwards shares the result. Strategies and
+# filters declare the columns they read (STRATEGY_COLUMNS / FILTER_COLUMNS),
+# so entry_columns() is exactly what the active configuration pays for.
+
+import ta
+
+from utils.indicators import get_rsi, get_macd, detect_zigzag, detect_god_candle
+
+BASE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+DEFAULT_PARAMS = {
+    'rsi_period': 14,
+    'sma_period': 50,
+    'atr_period': 14,
+    'bb_period': 20,
+    'bb_stddev': 2,
+    'volume_lookback': 20,
+}
+
+# column -> spec; one spec may produce several columns (MACD line / signal / histogram)
+_REGISTRY = {}
+
+
+class IndicatorSpec:
+    def __init__(self, name, columns, requires, compute):
+        self.name = name
+        self.columns = columns
+        self.requires = requires
+        self.compute = compute
+
+
+def indicator(columns, requires=('close',)):
+    # Register compute(df, params) -> one series, or a tuple of series in `columns` order
+    columns = (columns,) if isinstance(columns, str) else tuple(columns)
+
+    def decorator(compute):
+        spec = IndicatorSpec(compute.__name__.lstrip('_'), columns, tuple(requires), compute)
+        for column in columns:
+            if column in _REGISTRY:
+                raise ValueError(f"Indicator column {column!r} is already registered")
+            _REGISTRY[column] = spec
+        return compute
+    return decorator
+
+
+def registered_columns():
+    return list(_REGISTRY)
+
+
+def dependencies(columns):
+    # All registered columns needed for `columns`, dependencies before dependents
+    ordered, visiting = [], set()
+
+    def visit(column):
+        if column in ordered or column in BASE_COLUMNS:
+            return
+        spec = _REGISTRY.get(column)
+        if spec is None:
+            raise KeyError(f"Unknown indicator column {column!r}")
+        if column in visiting:
+            raise ValueError(f"Indicator dependency cycle at {column!r}")
+        visiting.add(column)
+        for required in spec.requires:
+            visit(required)
+        visiting.discard(column)
+        for produced in spec.columns:
+            if produced not in ordered:
+                ordered.append(produced)
+
+    for column in columns:
+        visit(column)
+    return ordered
+
+
+# === Indicators ===
+
+@indicator('rsi')
+def _rsi(df, p):
+    if p['rsi_period'] == 14:
+        return get_rsi(df['close'])
+    return ta.momentum.RSIIndicator(close=df['close'], window=p['rsi_period']).rsi()
+
+
+@indicator(('macd', 'signal', 'macd_hist'))
+def _macd(df, p):
+    return get_macd(df['close'])
+
+
+@indicator(('upper_band', 'middle_band', 'lower_band'))
+def _bollinger(df, p):
+    bb = ta.volatility.BollingerBands(close=df['close'], window=p['bb_period'], window_dev=p['bb_stddev'])
+    return bb.bollinger_hband(), bb.bollinger_mavg(), bb.bollinger_lband()
+
+
+@indicator('sma')
+def _sma(df, p):
+    return ta.trend.SMAIndicator(close=df['close'], window=p['sma_period']).sma_indicator()
+
+
+@indicator('atr', requires=('high', 'low', 'close'))
+def _atr(df, p):
+    return ta.volatility.AverageTrueRange(
+        high=df['high'], low=df['low'], close=df['close'], window=p['atr_period']
+    ).average_true_range()
+
+
+@indicator('volume_avg', requires=('volume',))
+def _volume_avg(df, p):
+    return df['volume'].rolling(window=int(p['volume_lookback'])).mean()
+
+
+@indicator('zigzag', requires=('high', 'low'))
+def _zigzag(df, p):
+    return detect_zigzag(df)
+
+
+@indicator('god_candle', requires=('open', 'close'))
+def _god_candle(df, p):
+    return detect_god_candle(df)
+
+
+# === Lazy frame ===
+
+class IndicatorFrame:
+    # frame['rsi'] computes RSI (and whatever it depends on) on first access only
+    def __init__(self, df, params=None):
+        self.df = df
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.computed = []
+
+    def _compute(self, spec):
+        values = spec.compute(self.df, self.params)
+        if len(spec.columns) == 1:
+            values = (values,)
+        for column, series in zip(spec.columns, values):
+            self.df[column] = series
+        self.computed.extend(spec.columns)
+
+    def require(self, columns):
+        for column in dependencies(columns):
+            if column not in self.df.columns:
+                self._compute(_REGISTRY[column])
+        return self.df
+
+    def __getitem__(self, column):
+        if column not in self.df.columns:
+            self.require([column])
+        return self.df[column]
+
+    def __contains__(self, column):
+        return column in self.df.columns or column in _REGISTRY
+
+
+# === What strategies read ===
+
+# Entry strategies in evaluate_all_entry_conditions (utils/entry_conditions.py, utils/indicators.py)
+STRATEGY_COLUMNS = {
+    'Default Logic': ('rsi', 'macd_hist', 'lower_band', 'volume_avg'),
+    'RSI + MACD': ('rsi', 'macd_hist'),
+    'MACD + Volume': ('macd_hist', 'volume_avg'),
+    'RSI + Bollinger Bands': ('rsi', 'lower_band'),
+}
+
+# ...all on the 15m frame; the 1h frame only supplies the SMA trend
+TREND_COLUMNS = ('sma',)
+
+# config toggle -> extra 15m columns it reads
+FILTER_COLUMNS = {
+    'use_zigzag_filter': ('zigzag',),
+    'use_god_candle_filter': ('god_candle',),
+}
+
+
+def entry_columns(config, timeframe='15m', strategies=None):
+    # Columns the configured entry evaluation reads from a frame of this timeframe, in dependency order
+    if timeframe == '1h':
+        return dependencies(TREND_COLUMNS)
+    columns = []
+    for name in strategies or STRATEGY_COLUMNS:
+        columns.extend(STRATEGY_COLUMNS[name])
+    for toggle, extra in FILTER_COLUMNS.items():
+        if getattr(config, toggle, False):
+            columns.extend(extra)
+    return dependencies(dict.fromkeys(columns))
+
+
+def params_from_config(config):
+    return {key: getattr(config, key, default) for key, default in DEFAULT_PARAMS.items()}
@@ -2,61 +2,167 @@
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import ta  # pip install ta
 import config
 
 
-def calculate_zigzag(prices, deviation=5):
-    zigzag_points = []
-    last_extreme = prices[0]
-    trend = None
-
-    for i in range(1, len(prices)):
-        change = (prices[i] - last_extreme) / last_extreme * 100
-
-        if trend is None:
-            if abs(change) >= deviation:
-                trend = 'up' if change > 0 else 'down'
-                last_extreme = prices[i]
-                zigzag_points.append({'index': i, 'type': 'bottom' if trend == 'up' else 'top'})
-        else:
-            if trend == 'up':
-                if prices[i] > last_extreme:
-                    last_extreme = prices[i]
-                elif (last_extreme - prices[i]) / last_extreme * 100 >= deviation:
+ZIGZAG_TOP = 1
+ZIGZAG_BOTTOM = -1
+
+
+class ZigzagState:
+    # Resumable calculate_zigzag: feed closed candles with update() and only the new tail is scanned
+    def __init__(self, deviation=5):
+        self.deviation = deviation
+        self.count = 0
+        self.trend = None
+        self.last_extreme = None
+        self._indices = []
+        self._types = []
+
+    @property
+    def indices(self):
+        return np.asarray(self._indices, dtype=np.int64)
+
+    @property
+    def types(self):
+        return np.asarray(self._types, dtype=np.int8)
+
+    @property
+    def last_type(self):
+        return self._types[-1] if self._types else 0
+
+    def update(self, prices):
+        # The state machine is inherently sequential; a tight loop over a float list beats
+        # per-swing NumPy calls, and resuming means each price is only ever visited once
+        prices = np.asarray(prices, dtype=float).tolist()
+        offset = self.count
+        self.count += len(prices)
+        if not prices:
+            return
+        start = 0
+        if offset == 0:
+            self.last_extreme = prices[0]
+            start = 1
+
+        deviation = self.deviation
+        last = self.last_extreme
+        trend = self.trend
+        indices, types = self._indices, self._types
+        for i in range(start, len(prices)):
+            p = prices[i]
+            if trend is None:
+                change = (p - last) / last * 100
+                if abs(change) >= deviation:
+                    trend = 'up' if change > 0 else 'down'
+                    last = p
+                    indices.append(offset + i)
+                    types.append(ZIGZAG_BOTTOM if trend == 'up' else ZIGZAG_TOP)
+            elif trend == 'up':
+                if p > last:
+                    last = p
+                elif (last - p) / last * 100 >= deviation:
                     trend = 'down'
-                    last_extreme = prices[i]
-                    zigzag_points.append({'index': i, 'type': 'top'})
-            elif trend == 'down':
-                if prices[i] < last_extreme:
-                    last_extreme = prices[i]
-                elif (prices[i] - last_extreme) / last_extreme * 100 >= deviation:
+                    last = p
+                    indices.append(offset + i)
+                    types.append(ZIGZAG_TOP)
+            else:
+                if p < last:
+                    last = p
+                elif (p - last) / last * 100 >= deviation:
                     trend = 'up'
-                    last_extreme = prices[i]
-                    zigzag_points.append({'index': i, 'type': 'bottom'})
-    return zigzag_points
+                    last = p
+                    indices.append(offset + i)
+                    types.append(ZIGZAG_BOTTOM)
+        self.last_extreme = last
+        self.trend = trend
 
 
-def detect_zigzag(df, depth=5):
-    result = [0] * len(df)
-    for i in range(depth, len(df) - depth):
-        is_top = all(df['high'][i] > df['high'][i - j] and df['high'][i] > df['high'][i + j] for j in range(1, depth + 1))
-        is_bottom = all(df['low'][i] < df['low'][i - j] and df['low'][i] < df['low'][i + j] for j in range(1, depth + 1))
-        if is_top:
-            result[i] = 1
-        elif is_bottom:
-            result[i] = -1
+def calculate_zigzag_array(prices, deviation=5):
+    # Returns (indices, types) arrays; types are ZIGZAG_TOP / ZIGZAG_BOTTOM
+    state = ZigzagState(deviation)
+    state.update(prices)
+    return state.indices, state.types
+
+
+def calculate_zigzag(prices, deviation=5):
+    indices, types = calculate_zigzag_array(prices, deviation)
+    return [
+        {'index': int(i), 'type': 'top' if t == ZIGZAG_TOP else 'bottom'}
+        for i, t in zip(indices, types)
+    ]
+
+
+def _stack_batch(arrays):
+    # Left-pad ragged per-symbol arrays with NaN so they can be processed as one 2D block.
+    # NaN never compares true, so padding only touches candles the scalar versions skip anyway.
+    arrays = [np.asarray(a, dtype=float) for a in arrays]
+    width = max((len(a) for a in arrays), default=0)
+    block = np.full((len(arrays), width), np.nan)
+    for row, a in zip(block, arrays):
+        if len(a):
+            row[width - len(a):] = a
+    return block, [len(a) for a in arrays]
+
+
+def _zigzag_flags(high, low, depth):
+    # Works along the last axis, so 1D (one symbol) and 2D (many symbols) inputs share the code
+    n = high.shape[-1]
+    result = np.zeros(high.shape, dtype=np.int8)
+    if depth < 1:
+        result[...] = 1
+        return result
+    if n < 2 * depth + 1:
+        return result
+
+    # win[k] = max/min of the `depth` candles starting at k
+    win_high = sliding_window_view(high, depth, axis=-1).max(axis=-1)
+    win_low = sliding_window_view(low, depth, axis=-1).min(axis=-1)
+    center_high = high[..., depth:n - depth]
+    center_low = low[..., depth:n - depth]
+
+    is_top = (center_high > win_high[..., :n - 2 * depth]) & (center_high > win_high[..., depth + 1:])
+    is_bottom = (center_low < win_low[..., :n - 2 * depth]) & (center_low < win_low[..., depth + 1:])
+    result[..., depth:n - depth] = np.where(is_top, 1, np.where(is_bottom, -1, 0))
     return result
 
 
+def detect_zigzag(df, depth=5):
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    return _zigzag_flags(high, low, depth).tolist()
+
+
+def detect_zigzag_batch(highs, lows, depth=5):
+    # highs/lows: one array per symbol (lengths may differ); returns one flag array per symbol
+    high_block, lengths = _stack_batch(highs)
+    low_block, _ = _stack_batch(lows)
+    flags = _zigzag_flags(high_block, low_block, depth)
+    return [row[len(row) - n:] for row, n in zip(flags, lengths)]
+
+
+def _god_candle_flags(bodies, lookback, threshold):
+    n = bodies.shape[-1]
+    flags = np.zeros(bodies.shape, dtype=bool)
+    if lookback < 1 or n <= lookback:
+        return flags
+    # Mean of the `lookback` bodies before each candle
+    avg_body = sliding_window_view(bodies, lookback, axis=-1)[..., :n - lookback, :].mean(axis=-1)
+    flags[..., lookback:] = bodies[..., lookback:] > avg_body * threshold
+    return flags
+
+
 def detect_god_candle(df, lookback=5, threshold=2.0):
-    bodies = (df['close'] - df['open']).abs()
-    god_candle_flags = [False] * len(df)
-    for i in range(lookback, len(df)):
-        avg_body = bodies[i - lookback:i].mean()
-        current_body = bodies[i]
-        god_candle_flags[i] = current_body > (avg_body * threshold)
-    return god_candle_flags
+    bodies = np.abs(df['close'].to_numpy(dtype=float) - df['open'].to_numpy(dtype=float))
+    return _god_candle_flags(bodies, lookback, threshold).tolist()
+
+
+def detect_god_candle_batch(opens, closes, lookback=5, threshold=2.0):
+    open_block, lengths = _stack_batch(opens)
+    close_block, _ = _stack_batch(closes)
+    flags = _god_candle_flags(np.abs(close_block - open_block), lookback, threshold)
+    return [row[len(row) - n:] for row, n in zip(flags, lengths)]
 
 
 def is_volume_spike(df, window=20, multiplier=1.5):
@@ -90,92 +196,23 @@ def get_sma(close, period):
     return ta.trend.SMAIndicator(close=close, window=period).sma_indicator()
 
 
-def calculate_indicators(df):
+def calculate_indicators(df, columns=None, timeframe='15m'):
+    # Adds only the columns the entry strategies and enabled filters read from a frame of this
+    # timeframe (utils/indicator_registry.py); pass `columns` to ask for specific ones instead
+    from utils.indicator_registry import IndicatorFrame, entry_columns, params_from_config
+
     df['close'] = df['close'].astype(float)
     df['high'] = df['high'].astype(float)
     df['low'] = df['low'].astype(float)
     df['open'] = df['open'].astype(float)
     df['volume'] = df['volume'].astype(float)
 
-    df['rsi'] = get_rsi(df['close'])
-    macd = ta.trend.MACD(close=df['close'])
-    df['macd_hist'] = macd.macd_diff()
-
-    bb = ta.volatility.BollingerBands(close=df['close'], window=20, window_dev=2)
-    df['upper_band'] = bb.bollinger_hband()
-    df['middle_band'] = bb.bollinger_mavg()
-    df['lower_band'] = bb.bollinger_lband()
-
-    df['volume_avg'] = df['volume'].rolling(window=20).mean()
-    df['zigzag'] = detect_zigzag(df)
-    df['god_candle'] = detect_god_candle(df)
-
+    IndicatorFrame(df, params_from_config(config)).require(entry_columns(config, timeframe) if columns is None else columns)
     return df
 
 
 def evaluate_all_entry_conditions(df15, df1h, config):
-    results = []
-    try:
-        price = df15['close'].iloc[-1]
-        rsi_15 = df15['rsi'].iloc[-1]
-        macd_hist_15 = df15['macd_hist'].iloc[-1]
-        volume = df15['volume'].iloc[-1]
-        lower_bb = df15['lower_band'].iloc[-1]
-        avg_volume = df15['volume'].rolling(window=int(config.volume_lookback)).mean().iloc[-1]
-        sma_1h = df1h['sma'].iloc[-1] if 'sma' in df1h.columns else 0
-        price_trend = "Below SMA" if price < sma_1h else "Above SMA"
-
-        default_conditions = [
-            rsi_15 < 30,
-            macd_hist_15 > 0,
-            price < lower_bb,
-            volume > avg_volume,
-        ]
-        default_score = sum(default_conditions)
-        results.append({
-            'name': 'Default Logic',
-            'score': default_score,
-            'passed': default_score >= config.min_entry_signals_required,
-            'details': f"RSI: {rsi_15:.2f}, MACD Hist: {macd_hist_15:.4f}, Price: {price:.4f}, BB: {lower_bb:.4f}, Vol: {volume:.0f} > Avg: {avg_volume:.0f}"
-        })
-
-        cond1 = rsi_15 < 30
-        cond2 = macd_hist_15 > 0
-        results.append({
-            'name': 'RSI + MACD',
-            'score': cond1 + cond2,
-            'passed': cond1 and cond2,
-            'details': f"RSI: {rsi_15:.2f}, MACD Hist: {macd_hist_15:.4f}"
-        })
-
-        cond3 = macd_hist_15 > 0
-        cond4 = volume > avg_volume
-        results.append({
-            'name': 'MACD + Volume',
-            'score': cond3 + cond4,
-            'passed': cond3 and cond4,
-            'details': f"MACD Hist: {macd_hist_15:.4f}, Volume: {volume:.0f} > Avg: {avg_volume:.0f}"
-        })
-
-        cond5 = rsi_15 < 30
-        cond6 = price < lower_bb
-        results.append({
-            'name': 'RSI + Bollinger Bands',
-            'score': cond5 + cond6,
-            'passed': cond5 and cond6,
-            'details': f"RSI: {rsi_15:.2f}, Price: {price:.4f} < Lower BB: {lower_bb:.4f}"
-        })
-
-        best = sorted(
-            [r for r in results if r['passed']],
-            key=lambda x: (x['score'], x['name']), reverse=True
-        )
-
-        if best:
-            best_strategy = best[0]
-            return True, best_strategy['name'], f"{best_strategy['details']} | Score: {best_strategy['score']} | Trend: {price_trend}"
-        else:
-            return False, None, "❌ No entry condition met in any strategy."
-
-    except Exception as e:
-        return False, None, f"⚠️ Error evaluating entry conditions: {e}"
+    # Strategies are declared in utils/entry_rules.py; Default Logic passes at min_entry_signals_required
+    from utils.entry_rules import evaluate_entry
+    return evaluate_entry(df15, df1h, default_min_score=config.min_entry_signals_required,
+                          volume_lookback=config.volume_lookback)
@@ -0,0 +1,182 @@
+# utils/markets.py
+#
+# Shared market metadata per exchange id. Markets are loaded once (or restored
+# from an on-disk snapshot at startup), pushed into every exchange instance of
+# the same id via set_markets(), and refreshed in the background every TTL.
+
+import json
+import math
+import os
+import threading
+import time
+
+import config
+
+# ccxt precision modes (ccxt.DECIMAL_PLACES / ccxt.TICK_SIZE)
+DECIMAL_PLACES = 2
+TICK_SIZE = 4
+
+
+def _to_decimals(value, mode):
+    if value is None:
+        return None
+    if mode == TICK_SIZE:
+        return max(0, int(round(-math.log10(float(value))))) if value > 0 else None
+    return int(value)
+
+
+class MarketCache:
+    def __init__(self, exchange, ttl_sec=3600, snapshot_path=None):
+        self.exchange = exchange
+        self.exchange_id = exchange.id
+        self.ttl_sec = ttl_sec
+        self.snapshot_path = snapshot_path or f"markets_{exchange.id}.json"
+        self._exchanges = [exchange]
+        self._markets = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self.amount_decimals = {}
+        self.price_decimals = {}
+        self.min_cost = {}
+        self.min_amount = {}
+        self.active = set()
+
+    # === Loading ===
+
+    def _build_tables(self, markets):
+        mode = getattr(self.exchange, 'precisionMode', DECIMAL_PLACES)
+        amount_decimals, price_decimals, min_cost, min_amount, active = {}, {}, {}, {}, set()
+        for symbol, m in markets.items():
+            precision = m.get('precision') or {}
+            limits = m.get('limits') or {}
+            amount_decimals[symbol] = _to_decimals(precision.get('amount'), mode)
+            price_decimals[symbol] = _to_decimals(precision.get('price'), mode)
+            min_cost[symbol] = (limits.get('cost') or {}).get('min')
+            min_amount[symbol] = (limits.get('amount') or {}).get('min')
+            if m.get('active', False):
+                active.add(symbol)
+        self.amount_decimals, self.price_decimals = amount_decimals, price_decimals
+        self.min_cost, self.min_amount, self.active = min_cost, min_amount, active
+
+    def _install(self, markets, loaded_at):
+        self._markets = markets
+        self._loaded_at = loaded_at
+        self._build_tables(markets)
+        for ex in self._exchanges:
+            if ex is not self.exchange or ex.markets is not markets:
+                ex.set_markets(markets)
+
+    def _load_snapshot(self):
+        try:
+            if not os.path.exists(self.snapshot_path):
+                return False
+            with open(self.snapshot_path) as f:
+                markets = json.load(f)
+            if not markets:
+                return False
+            self._install(markets, os.path.getmtime(self.snapshot_path))
+            print(f"📦 Restored {len(markets)} {self.exchange_id} markets from {self.snapshot_path}")
+            return True
+        except Exception as e:
+            print(f"⚠️ Failed to load market snapshot {self.snapshot_path}: {e}")
+            return False
+
+    def _save_snapshot(self, markets):
+        try:
+            tmp = self.snapshot_path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(markets, f)
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            print(f"⚠️ Failed to save market snapshot {self.snapshot_path}: {e}")
+
+    def refresh(self):
+        markets = self.exchange.load_markets(True)
+        with self._lock:
+            self._install(markets, time.time())
+        self._save_snapshot(markets)
+        return markets
+
+    def _ensure_loaded(self):
+        if self._markets is not None:
+            return
+        with self._lock:
+            if self._markets is not None:
+                return
+            restored = self._load_snapshot()
+        if not restored:
+            self.refresh()
+        elif self.is_stale():
+            self.start()
+
+    def is_stale(self):
+        return time.time() - self._loaded_at > self.ttl_sec
+
+    def _refresh_loop(self):
+        while True:
+            wait = max(self._loaded_at + self.ttl_sec - time.time(), 0)
+            time.sleep(wait)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Market refresh failed for {self.exchange_id}: {e}")
+                time.sleep(60)
+
+    def start(self):
+        # Background TTL refresh; safe to call more than once
+        if self._refresh_thread is None or not self._refresh_thread.is_alive():
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresh_thread.start()
+
+    def attach(self, exchange):
+        # Share these markets with another instance of the same exchange (no extra download)
+        with self._lock:
+            if exchange not in self._exchanges:
+                self._exchanges.append(exchange)
+            if self._markets is not None:
+                exchange.set_markets(self._markets)
+
+    # === Lookups ===
+
+    def markets(self):
+        self._ensure_loaded()
+        return self._markets
+
+    def is_tradable(self, symbol):
+        self._ensure_loaded()
+        return symbol in self.active
+
+    def amount_precision(self, symbol):
+        # Decimals for order quantities; KeyError for an unknown symbol or a market without amount precision,
+        # so callers never round with None (round(x, None) silently rounds to a whole number)
+        self._ensure_loaded()
+        decimals = self.amount_decimals.get(symbol)
+        if decimals is None:
+            raise KeyError(f"No amount precision for {symbol}")
+        return decimals
+
+    def price_precision(self, symbol):
+        self._ensure_loaded()
+        return self.price_decimals.get(symbol)
+
+    def min_cost_for(self, symbol, default=None):
+        self._ensure_loaded()
+        value = self.min_cost.get(symbol)
+        return default if value is None else value
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_market_cache(exchange):
+    # One MarketCache per exchange id, shared by every instance of that exchange
+    with _caches_lock:
+        cache = _caches.get(exchange.id)
+        if cache is None:
+            cache = MarketCache(exchange, ttl_sec=getattr(config, 'markets_ttl_sec', 3600))
+            _caches[exchange.id] = cache
+            return cache
+    cache.attach(exchange)
+    return cache
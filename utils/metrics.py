@@ -0,0 +1,343 @@
+# utils/metrics.py
+#
+# In-process instrumentation. Histograms record latencies (exchange methods,
+# Telegram calls, trade loop stages), counters record events (OHLCV retries,
+# exchange errors), and collectors registered by the modules that own the
+# state report gauges when somebody looks (cache hit rates, queue depths,
+# price age). Recording is a bisect and a few adds under one lock, cheap
+# enough for every exchange call.
+#
+# serve() exposes everything in the Prometheus text format on a local HTTP
+# port (GET /metrics); summary() is the short version for Telegram's /metrics.
+
+import bisect
+import contextlib
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# Seconds; wide enough for a getUpdates long poll at the top end
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help); every family is listed here so the endpoint documents itself
+FAMILIES = {
+    'exchange_request_seconds': ('histogram', 'Exchange API call latency by method (after rate limiter waits)'),
+    'exchange_errors_total': ('counter', 'Exchange API calls that raised, by method and error type'),
+    'telegram_request_seconds': ('histogram', 'Telegram Bot API request latency by method'),
+    'telegram_errors_total': ('counter', 'Telegram Bot API requests that failed, by method'),
+    'telegram_command_seconds': ('histogram', 'Telegram command handler run time by command'),
+    'cycle_seconds': ('histogram', 'Full trade loop cycle time by engine'),
+    'stage_seconds': ('histogram', 'Trade loop stage time: scan and prefetch per cycle, the rest per symbol'),
+    'ohlcv_fetch_retries_total': ('counter', 'OHLCV fetch attempts that failed and were retried, by timeframe'),
+    'ohlcv_fetch_failures_total': ('counter', 'OHLCV fetches that failed on every attempt, by timeframe'),
+    'price_check_lag_seconds': ('histogram', 'Price band crossing detected -> stop/TP check started'),
+    'price_check_seconds': ('histogram', 'Stop/TP check run time after a price band crossing'),
+    'position_sync_seconds': ('histogram', 'Position sync pass run time'),
+    'position_sync_age_seconds': ('gauge', 'Seconds since the last completed position sync'),
+    'watched_price_age_seconds': ('gauge', 'Age of the stalest price among watched positions'),
+    'price_watch_queue_depth': ('gauge', 'Price band crossings waiting for a check'),
+    'price_watch_connected': ('gauge', '1 while the price stream is connected, 0 on REST polling'),
+    'price_watch_updates_total': ('counter', 'Price updates received, by source'),
+    'positions': ('gauge', 'Positions by state'),
+    'order_tracker_pending': ('gauge', 'Entry orders being tracked'),
+    'order_tracker_events_total': ('counter', 'Order tracker events by kind'),
+    'indicator_cache_requests_total': ('counter', 'Indicator cache lookups by result'),
+    'indicator_cache_hit_ratio': ('gauge', 'Indicator cache hits / lookups'),
+    'exchange_reads_total': ('counter', 'Exchange reads requested vs sent upstream after coalescing'),
+    'exchange_coalesced_ratio': ('gauge', 'Share of exchange reads served without a request of their own'),
+    'candle_store_requests_total': ('counter', 'Candle store updates by kind'),
+    'candle_store_fresh_ratio': ('gauge', 'Share of candle store updates served without a request'),
+    'rate_limit_queued': ('gauge', 'Calls waiting for rate limit tokens, by limiter, bucket and lane'),
+    'rate_limit_wait_max_seconds': ('gauge', 'Longest rate limiter wait so far, by limiter and bucket'),
+    'rate_limit_penalties_total': ('counter', '429 responses, by limiter and bucket'),
+    'telegram_queue_depth': ('gauge', 'Outgoing Telegram messages waiting, by priority'),
+    'telegram_dropped_total': ('counter', 'Outgoing Telegram messages dropped because the queue was full'),
+    'telegram_commands_in_flight': ('gauge', 'Regular Telegram commands running or queued'),
+}
+
+ENDPOINT_PREFIXES = ('fetch_', 'create_', 'cancel_', 'edit_')
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last = above the top bucket
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Estimated like Prometheus' histogram_quantile: linear within the bucket holding the rank
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.max
+                lower = self.buckets[i - 1] if i else 0.0
+                return min(lower + (self.buckets[i] - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+class MetricsRegistry:
+    def __init__(self, namespace='akaai', enabled=True):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}       # name -> {label key: Histogram}
+        self._counters = {}         # name -> {label key: value}
+        self._collectors = []
+        self._server = None
+
+    # === Recording (any thread) ===
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        # `with metrics.timer('stage_seconds', stage='fetch'):` observes the block's wall time, also when it raises
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, collect):
+        # collect() -> iterable of (name, labels dict, value), called on every scrape / summary
+        with self._lock:
+            self._collectors.append(collect)
+
+    # === Reading ===
+
+    def _collected(self):
+        # name -> {label key: value} from the collectors; one failing collector doesn't hide the rest
+        result = {}
+        for collect in list(self._collectors):
+            try:
+                for name, labels, value in collect():
+                    result.setdefault(name, {})[_key(labels)] = value
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        return result
+
+    def histogram(self, name, **labels):
+        with self._lock:
+            return self._histograms.get(name, {}).get(_key(labels))
+
+    def render(self):
+        # Prometheus text exposition format 0.0.4
+        collected = self._collected()
+        with self._lock:
+            histograms = {name: {k: (list(h.counts), h.sum, h.count) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+        for name, series in collected.items():
+            kind = FAMILIES.get(name, ('gauge', ''))[0]
+            if kind == 'counter':
+                counters.setdefault(name, {}).update(series)
+
+        lines = []
+        names = sorted(set(histograms) | set(counters) | set(collected))
+        for name in names:
+            kind, help_text = FAMILIES.get(name, ('gauge', ''))
+            full = f"{self.namespace}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            if name in histograms:
+                for labels, (counts, total, count) in sorted(histograms[name].items()):
+                    cumulative = 0
+                    for upper, n in zip(DEFAULT_BUCKETS + (math.inf,), counts):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{_format_labels(labels, ('le', _format_value(upper)))} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {total!r}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {count}")
+                continue
+            series = counters.get(name) if kind == 'counter' else collected.get(name)
+            for labels, value in sorted((series or {}).items()):
+                lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+        lines.append(f"# HELP {self.namespace}_uptime_seconds Seconds since the metrics registry started")
+        lines.append(f"# TYPE {self.namespace}_uptime_seconds gauge")
+        lines.append(f"{self.namespace}_uptime_seconds {time.time() - self.started:.1f}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, top=6):
+        # Short text for Telegram: slowest series per histogram, counters, non-zero gauges
+        collected = self._collected()
+        with self._lock:
+            histograms = {name: {k: (h.count, h.mean, h.quantile(0.95)) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        uptime = int(time.time() - self.started)
+        lines = [f"📊 Metrics (uptime {uptime // 3600}h{uptime % 3600 // 60:02d}m) | avg / p95 / calls"]
+        for name in sorted(histograms):
+            series = sorted(histograms[name].items(), key=lambda item: -item[1][2])
+            lines.append(f"\n⏱ {name}")
+            for labels, (count, mean, p95) in series[:top]:
+                label = ' '.join(str(v) for _, v in labels) or 'all'
+                lines.append(f"  {label}: {_ms(mean)} / {_ms(p95)} / {count}")
+            if len(series) > top:
+                lines.append(f"  … {len(series) - top} more")
+
+        for name, series in collected.items():
+            if FAMILIES.get(name, ('gauge',))[0] == 'counter':
+                counters.setdefault(name, {}).update(series)
+        counts = [(name, labels, value) for name, series in sorted(counters.items())
+                  for labels, value in sorted(series.items()) if value]
+        if counts:
+            lines.append("\n🔢 Counters")
+            lines.extend(f"  {name}{_short_labels(labels)}: {value:,.0f}" for name, labels, value in counts)
+
+        gauges = [(name, labels, value) for name, series in sorted(collected.items())
+                  if FAMILIES.get(name, ('gauge',))[0] == 'gauge'
+                  for labels, value in sorted(series.items()) if value]
+        if gauges:
+            lines.append("\n📏 Gauges (zeros omitted)")
+            lines.extend(f"  {name}{_short_labels(labels)}: {_gauge(name, value)}" for name, labels, value in gauges)
+        return '\n'.join(lines)
+
+    # === HTTP endpoint ===
+
+    def serve(self, host='127.0.0.1', port=9464):
+        # Background HTTP server for Prometheus scrapes; returns it, or None if the port can't be bound
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass    # scrapes every few seconds would drown the bot's own log
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._server = server
+        print(f"📊 Metrics at http://{host}:{server.server_port}/metrics")
+        return server
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def _short_labels(labels):
+    return f" [{' '.join(str(v) for _, v in labels)}]" if labels else ''
+
+
+def _gauge(name, value):
+    if name.endswith('_ratio'):
+        return f"{value:.0%}"
+    if name.endswith('_seconds'):
+        return f"{value:.1f}s"
+    return f"{value:g}"
+
+
+class TimedExchange:
+    # Wraps a ccxt client so every endpoint call lands in exchange_request_seconds{method}
+    def __init__(self, exchange, registry):
+        object.__setattr__(self, '_inner', exchange)
+        object.__setattr__(self, '_registry', registry)
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if callable(attr) and name.startswith(ENDPOINT_PREFIXES):
+            return lambda *args, **kwargs: self._call(name, attr, *args, **kwargs)
+        return attr
+
+    def __setattr__(self, name, value):
+        # Settings like enableRateLimit belong to the client
+        setattr(self._inner, name, value)
+
+    def _call(self, name, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            self._registry.inc('exchange_errors_total', method=name, error=type(e).__name__)
+            raise
+        finally:
+            self._registry.observe('exchange_request_seconds', time.perf_counter() - started, method=name)
+
+
+def instrument_exchange(exchange):
+    return TimedExchange(exchange, metrics) if metrics.enabled else exchange
+
+
+def start_server():
+    # Serve on config.metrics_host:metrics_port unless metrics are off or the port is 0
+    port = getattr(config, 'metrics_port', 9464)
+    if not metrics.enabled or not port:
+        return None
+    return metrics.serve(getattr(config, 'metrics_host', '127.0.0.1'), port)
+
+
+metrics = MetricsRegistry(enabled=getattr(config, 'metrics_enabled', True))
@@ -0,0 +1,208 @@
+# utils/optimizer.py
+#
+# Parallel grid sweep over the strategy knobs in config.py, on top of
+# utils.backtest. Indicator arrays are computed once per candle file and put
+# in one shared-memory block; worker processes attach to it on start-up, so
+# each task only ships a handful of parameter dicts instead of the arrays.
+#
+# Usage:
+#   python -m utils.optimizer candles_15m.csv [more.csv ...] [--grid grid.json]
+#                             [--workers N] [--top 10] [--export best_config.py]
+#
+# grid.json maps parameter names to lists of values, e.g.
+#   {"rsi_tolerance": [3, 5, 7], "tp_multipliers": [[1.5, 3, 4.5], [2, 4, 6]]}
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.backtest import load_candles, prepare_arrays, simulate, strategy_params
+
+DEFAULT_GRID = {
+    'rsi_entry_zones': [[55, 50, 45, 40, 35, 30], [45, 40, 35, 30], [35, 30, 25]],
+    'rsi_tolerance': [3, 5, 7],
+    'stop_loss_atr_multiplier': [1.0, 1.5, 2.0],
+    'trailing_atr_multiplier': [1.0, 1.5, 2.0],
+    'tp_multipliers': [[1.5, 3.0, 4.5], [2.0, 4.0, 6.0]],
+    'rsi_sell_base': [65, 70],
+    'rsi_sell_min': [60],
+    'rsi_sell_max': [75, 80],
+}
+
+# Tunable knobs a sweep may set (everything simulate() reads from the params dict)
+SWEEP_PARAMS = {
+    'rsi_entry_zones', 'rsi_tolerance', 'rsi_1h_max', 'rsi_atr_multiplier',
+    'stop_loss_atr_multiplier', 'trailing_atr_multiplier', 'tp_multipliers',
+    'rsi_sell_base', 'rsi_sell_min', 'rsi_sell_max', 'default_min_score',
+}
+
+# Backtest-only knobs: no config.py setting feeds them to the live bot
+BACKTEST_ONLY = {
+    'default_min_score': "Default Logic threshold; live entries use 3 (utils/entry_conditions.py)",
+}
+
+# P/L/DD divides by at least this share of the starting budget, so a combo that never drew down
+# (often a single winning fill) ranks by its P/L instead of an infinite ratio
+DRAWDOWN_FLOOR_PCT = 1.0
+
+
+def expand_grid(grid):
+    unknown = set(grid) - SWEEP_PARAMS
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    names = sorted(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+# === Shared memory layout: one float64 block, rows = (series, column) ===
+
+def _pack(series_arrays):
+    columns = sorted(series_arrays[0])
+    lengths = [len(a['close']) for a in series_arrays]
+    width = max(lengths)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(series_arrays) * len(columns) * width * 8, 8))
+    block = np.ndarray((len(series_arrays), len(columns), width), dtype=np.float64, buffer=shm.buf)
+    for s, arrays in enumerate(series_arrays):
+        for c, name in enumerate(columns):
+            block[s, c, :lengths[s]] = arrays[name]
+    layout = {'shape': block.shape, 'columns': columns, 'lengths': lengths}
+    return shm, layout
+
+
+_worker = {}
+
+
+def _attach(shm_name, layout):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(layout['shape'], dtype=np.float64, buffer=shm.buf)
+    series = []
+    for s, length in enumerate(layout['lengths']):
+        arrays = {name: block[s, c, :length] for c, name in enumerate(layout['columns'])}
+        arrays['timestamp'] = arrays['timestamp'].astype('int64')  # one small copy per worker
+        series.append(arrays)
+    _worker['shm'] = shm  # keep the mapping alive for the life of the worker
+    _worker['series'] = series
+
+
+def _evaluate(combos, fee_rate, respect_rsi_alerts):
+    results = []
+    for combo in combos:
+        pnl = realized = fees = max_dd = 0.0
+        trades = wins = 0
+        for arrays in _worker['series']:
+            r = simulate(arrays, combo, fee_rate=fee_rate, respect_rsi_alerts=respect_rsi_alerts)
+            pnl += r['pnl']
+            realized += r['realized_pnl']
+            fees += r['fees']
+            max_dd = max(max_dd, r['max_drawdown'])
+            trades += r['num_trades']
+            wins += sum(1 for tr in r['trades'] if tr['pnl'] > 0)
+        results.append({
+            'params': combo,
+            'pnl': pnl,
+            'realized_pnl': realized,
+            'fees': fees,
+            'max_drawdown': max_dd,
+            'num_trades': trades,
+            'win_rate': wins / trades if trades else 0.0,
+            'pnl_to_drawdown': pnl / max(max_dd, drawdown_floor(combo)),
+        })
+    return results
+
+
+def drawdown_floor(combo):
+    return strategy_params(combo)['budget_usdt'] * DRAWDOWN_FLOOR_PCT / 100
+
+
+def run_sweep(series_arrays, grid=None, workers=None, chunk_size=32, fee_rate=0.0, respect_rsi_alerts=True,
+              sort_by='pnl_to_drawdown', progress=None):
+    combos = list(expand_grid(grid or DEFAULT_GRID))
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    shm, layout = _pack(series_arrays)
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_attach,
+                                 initargs=(shm.name, layout)) as pool:
+            futures = [pool.submit(_evaluate, chunk, fee_rate, respect_rsi_alerts) for chunk in chunks]
+            for future in as_completed(futures):
+                results.extend(future.result())
+                if progress:
+                    progress(len(results), len(combos))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: (r[sort_by], r['pnl']), reverse=True)
+    return results
+
+
+def to_config_snippet(params):
+    # Lines ready to paste into config.py
+    lines = ["# === OPTIMIZER RESULT ==="]
+    for name in sorted(params):
+        if name in BACKTEST_ONLY:
+            lines.append(f"# {name} = {params[name]!r}  (not a config setting: {BACKTEST_ONLY[name]})")
+        else:
+            lines.append(f"{name} = {params[name]!r}")
+    return "\n".join(lines) + "\n"
+
+
+def format_results(results, top=10):
+    lines = [f"🏁 Top {min(top, len(results))} of {len(results)} combinations:"]
+    for rank, r in enumerate(results[:top], 1):
+        lines.append(
+            f"{rank:>3}. P/L ${r['pnl']:.2f} | DD ${r['max_drawdown']:.2f} | P/L/DD {r['pnl_to_drawdown']:.2f} | "
+            f"fills {r['num_trades']} | win {r['win_rate']:.0%} | {json.dumps(r['params'])}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Grid-search strategy knobs over historical candles')
+    parser.add_argument('candles', nargs='+', help='15m OHLCV CSV file(s)')
+    parser.add_argument('--grid', help='JSON file mapping parameter names to value lists')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=32)
+    parser.add_argument('--fee', type=float, default=0.0)
+    parser.add_argument('--all-levels', action='store_true', help='let every RSI level trigger repeatedly')
+    parser.add_argument('--sort-by', default='pnl_to_drawdown', choices=['pnl_to_drawdown', 'pnl', 'realized_pnl'])
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--export', help='write the best combination as a config.py snippet')
+    parser.add_argument('--results', help='write every result as JSON')
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    started = time.perf_counter()
+    series = [prepare_arrays(load_candles(path)) for path in args.candles]
+    total = int(np.prod([len(v) for v in grid.values()]))
+    print(f"🧮 {total} combinations x {len(series)} series | indicators ready in {time.perf_counter() - started:.2f}s")
+
+    results = run_sweep(
+        series, grid, workers=args.workers, chunk_size=args.chunk_size, fee_rate=args.fee,
+        respect_rsi_alerts=not args.all_levels, sort_by=args.sort_by
+    )
+    print(format_results(results, args.top))
+    print(f"⏱️ Sweep finished in {time.perf_counter() - started:.2f}s")
+
+    if results and args.export:
+        with open(args.export, 'w') as f:
+            f.write(to_config_snippet(results[0]['params']))
+        print(f"💾 Best parameters written to {args.export}")
+    if args.results:
+        with open(args.results, 'w') as f:
+            json.dump(results, f, indent=2, default=float, allow_nan=False)
+
+
+if __name__ == '__main__':
+    main()
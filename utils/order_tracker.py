@@ -0,0 +1,320 @@
+# utils/order_tracker.py
+#
+# Follows submitted limit orders after the caller has moved on. One
+# background thread polls each open order with fetch_order on its own
+# schedule: quickly right after placement or a fill, backing off while
+# nothing changes. Every fill increment is handed to on_fill(tracked, qty,
+# price, fee) as it is seen, so partial fills are acted on immediately; fee is
+# a ccxt-style {'cost', 'currency'} dict (or None) so the caller can convert it.
+# Orders still open after stale_sec are cancelled, or cancelled and re-placed
+# at the current touch (stale_action='reprice') up to max_reprices times.
+# on_done(tracked) fires once the order is finished either way. An order the
+# exchange reports as not found is only given up after not_found_polls misses
+# in a row, since a fresh order can briefly be missing from fetch_order.
+#
+# A private order stream can feed update(order) with ccxt order dicts; the
+# poll for an order is pushed back whenever such an update arrives.
+
+import heapq
+import itertools
+import threading
+
+import ccxt
+
+from utils import clock
+
+TERMINAL_STATUSES = ('closed', 'canceled', 'cancelled', 'expired', 'rejected')
+
+
+class TrackedOrder:
+    def __init__(self, symbol, side, order_id, qty, price, context=None):
+        self.symbol = symbol
+        self.side = side
+        self.order_id = str(order_id)   # current exchange order (changes when re-priced)
+        self.qty = float(qty)           # total quantity wanted across re-prices
+        self.price = float(price)       # current limit price
+        self.context = context or {}    # caller data, must be JSON serializable (persisted with snapshot())
+        self.filled = 0.0               # filled across every order placed for this entry
+        self.cost = 0.0
+        self.fee = 0.0
+        self.reprices = 0
+        self.status = 'open'            # open -> filled / canceled
+        self.created_at = clock.now()
+        self.placed_at = self.created_at
+        self.order_filled = 0.0         # filled / cost / fee already counted on the current order
+        self.order_cost = 0.0
+        self.order_fee = 0.0
+        self.interval = 0.0
+        self.next_poll = 0.0
+        self.not_found = 0              # consecutive OrderNotFound polls
+
+    @property
+    def remaining(self):
+        return max(self.qty - self.filled, 0.0)
+
+    @property
+    def avg_price(self):
+        return self.cost / self.filled if self.filled else 0.0
+
+    @property
+    def fill_ratio(self):
+        return self.filled / self.qty if self.qty else 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in (
+            'symbol', 'side', 'order_id', 'qty', 'price', 'context', 'filled', 'cost', 'fee', 'reprices',
+            'created_at', 'placed_at', 'order_filled', 'order_cost', 'order_fee')}
+
+    @classmethod
+    def from_dict(cls, data):
+        tracked = cls(data['symbol'], data['side'], data['order_id'], data['qty'], data['price'], data.get('context'))
+        for name in ('filled', 'cost', 'fee', 'reprices', 'created_at', 'placed_at',
+                     'order_filled', 'order_cost', 'order_fee'):
+            if name in data:
+                setattr(tracked, name, data[name])
+        return tracked
+
+
+class OrderTracker:
+    def __init__(self, exchange, on_fill=None, on_done=None, poll_min_sec=0.5, poll_max_sec=10, backoff=1.6,
+                 stale_sec=120, stale_action='cancel', max_reprices=2, reprice_offset=0.0, round_qty=None,
+                 not_found_polls=3):
+        self.exchange = exchange
+        self.on_fill = on_fill
+        self.on_done = on_done
+        self.poll_min_sec = poll_min_sec
+        self.poll_max_sec = poll_max_sec
+        self.backoff = backoff
+        self.stale_sec = stale_sec
+        self.stale_action = stale_action
+        self.max_reprices = max_reprices
+        self.reprice_offset = reprice_offset
+        self.round_qty = round_qty or (lambda symbol, qty: qty)
+        self.not_found_polls = not_found_polls
+        self._orders = {}               # order_id -> TrackedOrder
+        self._heap = []                 # (next_poll, seq, order_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._apply_lock = threading.RLock()  # polls and pushed updates for one order never interleave
+        self._thread = None
+        self.stats = {'tracked': 0, 'polls': 0, 'pushed': 0, 'fills': 0, 'filled': 0, 'canceled': 0,
+                      'repriced': 0, 'not_found': 0, 'errors': 0}
+
+    # === Submitting / querying (any thread) ===
+
+    def track(self, symbol, side, order, qty, price, context=None):
+        # order: the ccxt response of the create call; whatever it already reports as filled is applied now
+        tracked = TrackedOrder(symbol, side, order['id'], qty, price, context)
+        with self._cond:
+            self._orders[tracked.order_id] = tracked
+            self.stats['tracked'] += 1
+        self._apply(tracked, order)
+        if tracked.status == 'open':
+            self._schedule(tracked, self.poll_min_sec)
+        return tracked
+
+    def restore(self, records):
+        # Resume following orders saved with snapshot() before a restart
+        for data in (records or {}).values():
+            tracked = TrackedOrder.from_dict(data)
+            with self._cond:
+                self._orders[tracked.order_id] = tracked
+            self._schedule(tracked, 0)
+        if records:
+            print(f"📨 Order tracker: resumed {len(records)} open order(s)")
+
+    def update(self, order):
+        # Push path for order streams: apply a ccxt order dict for a tracked order
+        with self._cond:
+            tracked = self._orders.get(str(order.get('id')))
+        if tracked is None:
+            return False
+        self.stats['pushed'] += 1
+        self._apply(tracked, order)
+        if tracked.status == 'open':
+            self._schedule(tracked, max(tracked.interval, self.poll_min_sec))
+        return True
+
+    def nudge(self, symbol=None):
+        # Poll now (e.g. after orders were cancelled elsewhere)
+        for tracked in self.pending(symbol):
+            self._schedule(tracked, 0)
+
+    def pending(self, symbol=None):
+        with self._cond:
+            return [t for t in self._orders.values() if symbol is None or t.symbol == symbol]
+
+    def snapshot(self):
+        with self._cond:
+            return {order_id: t.to_dict() for order_id, t in self._orders.items()}
+
+    # === Scheduling ===
+
+    def _schedule(self, tracked, delay):
+        with self._cond:
+            tracked.next_poll = clock.now() + delay
+            heapq.heappush(self._heap, (tracked.next_poll, next(self._seq), tracked.order_id))
+            self._cond.notify()
+        if self._thread is None:
+            self._start()
+
+    def _next_due(self):
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, order_id = self._heap[0]
+                tracked = self._orders.get(order_id)
+                if tracked is None or tracked.next_poll != due:
+                    heapq.heappop(self._heap)   # finished or re-scheduled since
+                    continue
+                wait = due - clock.now()
+                if wait <= 0:
+                    heapq.heappop(self._heap)
+                    return tracked
+                self._cond.wait(wait / clock.speed())
+
+    def _run(self):
+        while True:
+            tracked = self._next_due()
+            try:
+                self._poll(tracked)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Order tracker: {tracked.symbol} order {tracked.order_id}: {e}")
+                self._schedule(tracked, self.poll_max_sec)
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    # === Order lifecycle ===
+
+    def _poll(self, tracked):
+        self.stats['polls'] += 1
+        try:
+            order = self.exchange.fetch_order(tracked.order_id, tracked.symbol)
+        except ccxt.OrderNotFound:
+            # Newly placed orders can lag behind fetch_order; give up only after repeated misses
+            self.stats['not_found'] += 1
+            tracked.not_found += 1
+            if tracked.not_found >= self.not_found_polls:
+                self._finish(tracked)
+            else:
+                self._schedule(tracked, max(tracked.interval, self.poll_min_sec))
+            return
+        tracked.not_found = 0
+        changed = self._apply(tracked, order)
+        if tracked.status != 'open':
+            return
+        if clock.now() - tracked.placed_at >= self.stale_sec:
+            self._handle_stale(tracked)
+            return
+        # Something happened: look again soon; otherwise back off
+        if changed:
+            tracked.interval = self.poll_min_sec
+        else:
+            tracked.interval = min(max(tracked.interval, self.poll_min_sec) * self.backoff, self.poll_max_sec)
+        self._schedule(tracked, tracked.interval)
+
+    def _apply(self, tracked, order):
+        # Count the fill increment since the last look at this order; True if anything new was filled
+        with self._apply_lock:
+            return self._apply_locked(tracked, order)
+
+    def _apply_locked(self, tracked, order):
+        changed = False
+        filled = float(order.get('filled') or 0.0)
+        if filled > tracked.order_filled + 1e-12:
+            qty = filled - tracked.order_filled
+            cost = order.get('cost')
+            if cost is None:
+                cost = filled * float(order.get('average') or order.get('price') or tracked.price)
+            price = (float(cost) - tracked.order_cost) / qty
+            order_fee = order.get('fee') or {}
+            fee_cost = order_fee.get('cost')
+            fee = None if fee_cost is None else float(fee_cost) - tracked.order_fee
+
+            tracked.order_filled, tracked.order_cost = filled, float(cost)
+            if fee is not None:
+                tracked.order_fee = float(fee_cost)
+            tracked.filled += qty
+            tracked.cost += qty * price
+            tracked.fee += fee or 0.0
+            self.stats['fills'] += 1
+            changed = True
+            fee = None if fee is None else {'cost': fee, 'currency': order_fee.get('currency')}
+            self._callback(self.on_fill, tracked, qty, price, fee)
+
+        if order.get('status') in TERMINAL_STATUSES:
+            self._finish(tracked)
+        return changed
+
+    def _handle_stale(self, tracked):
+        try:
+            final = self.exchange.cancel_order(tracked.order_id, tracked.symbol)
+            cancelled_here = True
+        except ccxt.OrderNotFound:
+            final, cancelled_here = None, False     # filled or cancelled elsewhere meanwhile
+        if not final or final.get('filled') is None:
+            final = self.exchange.fetch_order(tracked.order_id, tracked.symbol)
+        # Count fills that raced the cancel; whether the entry is over is decided here
+        self._apply(tracked, dict(final, status='open'))
+        if not cancelled_here or final.get('status') == 'closed':
+            self._finish(tracked)
+            return
+
+        qty = self.round_qty(tracked.symbol, tracked.remaining)
+        if self.stale_action == 'reprice' and tracked.reprices < self.max_reprices and qty > 0:
+            try:
+                self._reprice(tracked, qty)
+                return
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Order tracker: re-pricing {tracked.symbol} failed: {e}")
+        self._finish(tracked)
+
+    def _reprice(self, tracked, qty):
+        ticker = self.exchange.fetch_ticker(tracked.symbol)
+        if tracked.side == 'buy':
+            price = ticker['ask'] * (1 + self.reprice_offset)
+            order = self.exchange.create_limit_buy_order(tracked.symbol, qty, price)
+        else:
+            price = ticker['bid'] * (1 - self.reprice_offset)
+            order = self.exchange.create_limit_sell_order(tracked.symbol, qty, price)
+        with self._cond:
+            self._orders.pop(tracked.order_id, None)
+            tracked.order_id = str(order['id'])
+            tracked.price = float(price)
+            tracked.placed_at = clock.now()
+            tracked.order_filled = tracked.order_cost = tracked.order_fee = 0.0
+            tracked.interval = 0.0
+            tracked.not_found = 0
+            tracked.reprices += 1
+            self._orders[tracked.order_id] = tracked
+        self.stats['repriced'] += 1
+        print(f"🔁 Order tracker: re-priced {tracked.symbol} {tracked.side} {qty} @ {price:.6f}")
+        self._apply(tracked, order)
+        if tracked.status == 'open':
+            self._schedule(tracked, self.poll_min_sec)
+
+    def _finish(self, tracked):
+        with self._cond:
+            if tracked.status != 'open':
+                return
+            tracked.status = 'filled' if tracked.filled >= tracked.qty * 0.99 else 'canceled'
+            self._orders.pop(tracked.order_id, None)
+        self.stats[tracked.status] += 1
+        self._callback(self.on_done, tracked)
+
+    def _callback(self, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Order tracker callback failed for {args[0].symbol}: {e}")
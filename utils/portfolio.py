@@ -6,12 +6,15 @@ from config import (
     min_entry_signals_required, enable_advanced_entry_strategies
 )
 from utils.exchange_utils import get_exchange, fetch_ohlcv_safe
+from utils.markets import get_market_cache
 from utils.indicators import calculate_indicators, evaluate_all_entry_conditions
 from utils.bot_state import last_entry_info, last_exit_info
+from utils.trade_journal import trade_journal
 import config
 
 
 exchange = get_exchange()
+get_market_cache(exchange)  # reuse the bot's market metadata instead of downloading our own
 
 def show_balance():
     try:
@@ -32,17 +35,46 @@ def show_portfolio():
     except Exception as e:
         return f"❌ Error fetching portfolio: {e}"
 
+# PnL / fee / drawdown / position reports come from the trade journal's running totals (no exchange calls)
 def show_pnl():
-    return "📉 PNL tracking not implemented yet."
+    s = trade_journal.summary()
+    if not s['fills']:
+        return "📉 No fills recorded yet."
+    lines = [
+        f"📈 Realized PnL: ${s['realized']:.2f} | Fees: ${s['fees']:.2f} | Net: ${s['net']:.2f}",
+        f"🔸 {s['wins']} wins / {s['losses']} losses ({s['win_rate']:.0%}) | {s['fills']} fills",
+    ]
+    for symbol, st in sorted(trade_journal.symbol_stats().items(), key=lambda kv: -abs(kv[1]['realized']))[:10]:
+        lines.append(f"{symbol}: ${st['realized']:.2f} ({st['wins']}W/{st['losses']}L)")
+    return "\n".join(lines)
 
 def show_fees():
-    return "💸 Fee tracking not implemented yet."
+    s = trade_journal.summary()
+    if not s['fills']:
+        return "💸 No fills recorded yet."
+    share = s['fees'] / s['volume'] if s['volume'] else 0.0
+    lines = [f"💸 Fees paid: ${s['fees']:.4f} on ${s['volume']:.2f} traded ({share:.3%})"]
+    for symbol, st in sorted(trade_journal.symbol_stats().items(), key=lambda kv: -kv[1]['fees'])[:10]:
+        lines.append(f"{symbol}: ${st['fees']:.4f}")
+    return "\n".join(lines)
 
 def show_max_drawdown():
-    return "📉 Drawdown stats not implemented yet."
+    s = trade_journal.summary()
+    if not s['fills']:
+        return "📉 No fills recorded yet."
+    return (
+        f"📉 Max Drawdown: ${s['max_drawdown']:.2f} ({s['max_drawdown_pct']:.2%})\n"
+        f"🔸 Current: ${s['drawdown']:.2f} below peak ${s['peak']:.2f} | Net: ${s['net']:.2f}"
+    )
 
 def show_open_positions():
-    return "📈 Open positions tracking not implemented yet."
+    positions = trade_journal.open_positions()
+    if not positions:
+        return "📈 No open positions."
+    lines = ["📈 Open Positions:"]
+    for symbol, st in positions.items():
+        lines.append(f"{symbol}: {st['qty']:.6g} @ avg {st['avg_price']:.6g} (cost ${st['cost']:.2f})")
+    return "\n".join(lines)
 
 def show_position_details(symbol):
     try:
@@ -85,7 +117,7 @@ def recommend_symbol(pair):
             df1h = pd.DataFrame(df1h, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
 
         df15 = calculate_indicators(df15)
-        df1h = calculate_indicators(df1h)
+        df1h = calculate_indicators(df1h, timeframe='1h')
 
         passed, strategy, details = evaluate_all_entry_conditions(df15, df1h, config)
         if passed:
@@ -108,7 +140,7 @@ def get_scanner_results():
                 df1h = pd.DataFrame(df1h, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
 
             df15 = calculate_indicators(df15)
-            df1h = calculate_indicators(df1h)
+            df1h = calculate_indicators(df1h, timeframe='1h')
 
             passed, strategy, details = evaluate_all_entry_conditions(df15, df1h, config)
             if passed:
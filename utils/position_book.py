@@ -0,0 +1,183 @@
+# utils/position_book.py
+#
+# Open positions shared by the scan loop / async eval workers, the price
+# watcher, the order tracker, position sync and Telegram commands.
+#
+#   * Each symbol has its own lock: everything that reads a position, talks
+#     to the exchange about it and writes it back runs under that symbol's
+#     lock, so two symbols never wait on each other.
+#   * Every symbol moves through explicit states: opening (entry order
+#     working, may already hold partial fills) -> open -> closing -> gone.
+#     reserve() / begin_close() are the atomic gates: one entry per symbol
+#     within max_concurrent_trades, one close at a time per position.
+#   * Copy-on-write for readers that look across symbols (persistence,
+#     scans, reports): a writer publishes a copy of its position when it is
+#     done with it, and snapshot() hands out a read-only map of the published
+#     copies, rebuilt only after a change. Readers never see a half-edited
+#     position and never wait for a symbol's lock.
+
+import contextlib
+import copy
+import threading
+import types
+
+OPENING = 'opening'
+OPEN = 'open'
+CLOSING = 'closing'
+
+
+class PositionBook:
+    def __init__(self, positions=None):
+        self._lock = threading.Lock()           # guards the dicts below, never held across exchange calls
+        self._symbol_locks = {}
+        self._positions = {}                    # symbol -> position dict (only touched under the symbol's lock)
+        self._states = {}                       # symbol -> OPENING / OPEN / CLOSING
+        self._closing_from = {}                 # symbol -> state to return to if a close leaves something
+        self._published = {}                    # symbol -> copy of the position as of its last write
+        self._version = 0
+        self._snapshot = (None, types.MappingProxyType({}))
+        for symbol, pos in (positions or {}).items():
+            self._positions[symbol] = pos
+            self._states[symbol] = OPEN
+            self._publish(symbol)
+
+    # === Locks ===
+
+    def lock(self, symbol):
+        # Re-entrant per-symbol lock: `with book.lock(symbol):` around a whole read-decide-write step
+        with self._lock:
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = self._symbol_locks[symbol] = threading.RLock()
+            return lock
+
+    def _publish(self, symbol):
+        # Caller holds the symbol's lock (no writer can be mid-edit) and self._lock
+        pos = self._positions.get(symbol)
+        if pos is None:
+            self._published.pop(symbol, None)
+        else:
+            self._published[symbol] = copy.deepcopy(pos)
+        self._version += 1
+
+    # === Reads ===
+
+    def get(self, symbol, default=None):
+        # Live position dict; mutate it only inside edit() (or while holding lock(symbol))
+        return self._positions.get(symbol, default)
+
+    def __getitem__(self, symbol):
+        return self._positions[symbol]
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def state(self, symbol):
+        return self._states.get(symbol)
+
+    def active_count(self):
+        # Entries working + positions held + positions being closed
+        return len(self._states)
+
+    def state_counts(self):
+        with self._lock:
+            states = list(self._states.values())
+        return {state: states.count(state) for state in (OPENING, OPEN, CLOSING)}
+
+    def snapshot(self):
+        # Read-only {symbol: position copy}; rebuilt at most once per change, shared by every reader until then
+        version, view = self._snapshot
+        if version == self._version:
+            return view
+        with self._lock:
+            view = types.MappingProxyType(dict(self._published))
+            self._snapshot = (self._version, view)
+        return view
+
+    def items(self):
+        return self.snapshot().items()
+
+    def keys(self):
+        return self.snapshot().keys()
+
+    # === Transitions ===
+
+    def reserve(self, symbol, limit):
+        # -> True and symbol is OPENING when it had no state and fewer than `limit` symbols are active
+        with self._lock:
+            if symbol in self._states or len(self._states) >= limit:
+                return False
+            self._states[symbol] = OPENING
+            return True
+
+    def release(self, symbol):
+        # Entry abandoned before anything filled
+        with self.lock(symbol), self._lock:
+            if self._states.get(symbol) == OPENING and symbol not in self._positions:
+                del self._states[symbol]
+
+    def put(self, symbol, pos, state=OPEN):
+        with self.lock(symbol), self._lock:
+            self._positions[symbol] = pos
+            self._states[symbol] = state
+            self._publish(symbol)
+
+    def mark(self, symbol, state):
+        # OPENING -> OPEN once the entry order is done, or OPENING for an order resumed after a restart
+        with self.lock(symbol), self._lock:
+            self._states[symbol] = state
+
+    @contextlib.contextmanager
+    def edit(self, symbol):
+        # Yields the live position (None if there is none) under the symbol's lock; readers see the change afterwards
+        with self.lock(symbol):
+            try:
+                yield self._positions.get(symbol)
+            finally:
+                with self._lock:
+                    self._publish(symbol)
+
+    def begin_close(self, symbol):
+        # -> the position, now CLOSING, or None if it is gone or another thread is already closing it
+        with self.lock(symbol), self._lock:
+            if symbol not in self._positions or self._states.get(symbol) == CLOSING:
+                return None
+            self._closing_from[symbol] = self._states.get(symbol, OPEN)
+            self._states[symbol] = CLOSING
+            return self._positions[symbol]
+
+    def end_close(self, symbol, remaining_qty=0.0):
+        # Close finished: drop the position, or keep the rest of it (partial TP, failed sell) in its previous state
+        with self.lock(symbol), self._lock:
+            state = self._closing_from.pop(symbol, OPEN)
+            if symbol not in self._positions:
+                self._states.pop(symbol, None)
+            elif remaining_qty > 0:
+                self._positions[symbol]['qty'] = remaining_qty
+                self._states[symbol] = state
+            else:
+                del self._positions[symbol]
+                self._states.pop(symbol, None)
+            self._publish(symbol)
+
+    def remove(self, symbol):
+        with self.lock(symbol), self._lock:
+            removed = self._positions.pop(symbol, None)
+            self._states.pop(symbol, None)
+            self._closing_from.pop(symbol, None)
+            self._publish(symbol)
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+            self._states.clear()
+            self._closing_from.clear()
+            self._published.clear()
+            self._version += 1
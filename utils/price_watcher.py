@@ -0,0 +1,325 @@
+# utils/price_watcher.py
+#
+# Push-based last-price feed for open positions. Prices come from a WebSocket
+# deals stream (aiohttp, optional) and fall back to polling fetch_tickers for
+# the watched symbols while the socket is down. While it is up, any watched
+# symbol the stream has gone quiet on (rejected subscription, illiquid market)
+# is polled over REST too, so a live socket can't starve a stop. Each watched
+# symbol carries a precomputed (low, high) band; on_cross(symbol, price) only
+# fires when an update leaves the band, so stop / trailing / take-profit checks
+# run on crossings instead of on a fixed timer.
+
+import asyncio
+import json
+import queue
+import threading
+import time
+
+from utils import clock
+from utils.metrics import metrics
+
+try:
+    import aiohttp
+except ImportError:  # optional: without aiohttp the watcher only polls over REST
+    aiohttp = None
+
+
+def _pb_varint(buf, i):
+    value = shift = 0
+    while True:
+        byte = buf[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, i
+        shift += 7
+
+
+def pb_fields(buf):
+    # Minimal protobuf wire reader: yields (field number, value); varints as int, everything else as bytes
+    i, n = 0, len(buf)
+    while i < n:
+        key, i = _pb_varint(buf, i)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, i = _pb_varint(buf, i)
+        elif wire == 2:
+            length, i = _pb_varint(buf, i)
+            value, i = bytes(buf[i:i + length]), i + length
+        elif wire in (1, 5):
+            size = 8 if wire == 1 else 4
+            value, i = bytes(buf[i:i + size]), i + size
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire}")
+        yield field, value
+
+
+class MexcDealsProtocol:
+    # MEXC spot v3 aggregated deals (wss://wbs-api.mexc.com/ws): JSON control
+    # messages, protobuf pushes (PushDataV3ApiWrapper, mexcdevelop/websocket-proto).
+    # Swap in another object with the same four methods to stream from a different venue.
+    channel = 'spot@public.aggre.deals.v3.api.pb@100ms@'
+
+    # PushDataV3ApiWrapper: channel = 1, symbol = 3, publicAggreDeals = 314
+    # PublicAggreDealsV3Api: deals = 1; PublicAggreDealsV3ApiItem: price = 1, time = 4
+    WRAPPER_CHANNEL, WRAPPER_SYMBOL, WRAPPER_AGGRE_DEALS = 1, 3, 314
+    DEALS_ITEMS, ITEM_PRICE, ITEM_TIME = 1, 1, 4
+
+    def subscribe(self, market_ids):
+        return {'method': 'SUBSCRIPTION', 'params': [self.channel + m for m in market_ids]}
+
+    def unsubscribe(self, market_ids):
+        return {'method': 'UNSUBSCRIPTION', 'params': [self.channel + m for m in market_ids]}
+
+    def ping(self):
+        return {'method': 'PING'}
+
+    def parse(self, data):
+        # -> [(market_id, price, timestamp_ms)]; data is a text (JSON control) or binary (protobuf) frame
+        if isinstance(data, str):
+            message = json.loads(data)
+            if 'Not Subscribed' in str(message.get('msg', '')):
+                print(f"⚠️ Price stream rejected a subscription: {message['msg']}")
+            return []
+        channel, market_id, body = '', None, None
+        for field, value in pb_fields(data):
+            if field == self.WRAPPER_CHANNEL:
+                channel = value.decode()
+            elif field == self.WRAPPER_SYMBOL:
+                market_id = value.decode()
+            elif field == self.WRAPPER_AGGRE_DEALS:
+                body = value
+        if body is None or not channel.startswith(self.channel):
+            return []
+        market_id = market_id or channel[len(self.channel):]
+        deals = []
+        for field, item in pb_fields(body):
+            if field != self.DEALS_ITEMS:
+                continue
+            price = ts = None
+            for f, value in pb_fields(item):
+                if f == self.ITEM_PRICE:
+                    price = float(value.decode())
+                elif f == self.ITEM_TIME:
+                    ts = value
+            if price is not None:
+                deals.append((market_id, price, ts))
+        return deals
+
+
+class PriceWatcher:
+    def __init__(self, exchange, on_cross, ws_url=None, protocol=None, poll_sec=2, ping_sec=20,
+                 max_reconnect_sec=60, stale_sec=None):
+        self.exchange = exchange
+        self.on_cross = on_cross
+        self.ws_url = ws_url if aiohttp is not None else None
+        self.protocol = protocol or MexcDealsProtocol()
+        self.poll_sec = poll_sec
+        self.ping_sec = ping_sec
+        self.max_reconnect_sec = max_reconnect_sec
+        self.stale_sec = stale_sec or poll_sec * 3  # stream silent this long on a watched symbol -> poll it over REST
+        self.prices = {}                # symbol -> (price, clock.now())
+        self.connected = False
+        self._bands = {}                # symbol -> (low, high)
+        self._watched_at = {}           # symbol -> clock.now() when first watched
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._checker = None
+        self.stats = {'ws_updates': 0, 'rest_polls': 0, 'stale_polls': 0, 'crossings': 0, 'reconnects': 0}
+
+        if ws_url and aiohttp is None:
+            print("⚠️ aiohttp not installed, price watcher falls back to REST polling")
+
+    # === Watches ===
+
+    def watch(self, symbol, low=None, high=None):
+        # Fire on_cross on the next update with price <= low or price >= high; call again with the new band after handling it
+        with self._lock:
+            self._bands[symbol] = (low, high)
+            self._watched_at.setdefault(symbol, clock.now())
+
+    def unwatch(self, symbol):
+        with self._lock:
+            self._bands.pop(symbol, None)
+            self._watched_at.pop(symbol, None)
+
+    def watched(self):
+        with self._lock:
+            return list(self._bands)
+
+    def stale_symbols(self, max_age=None):
+        # Watched symbols without a price update for max_age seconds (counted from the watch if none came yet)
+        max_age = self.stale_sec if max_age is None else max_age
+        now = clock.now()
+        with self._lock:
+            watched = dict(self._watched_at)
+        return [s for s, since in watched.items()
+                if now - (self.prices[s][1] if s in self.prices else since) > max_age]
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stalest_age(self):
+        # Seconds since the oldest last price among watched symbols (no price yet counts as not stale)
+        now = clock.now()
+        ages = [now - self.prices[s][1] for s in self.watched() if s in self.prices]
+        return max(ages, default=0.0)
+
+    def last_price(self, symbol, max_age=None):
+        entry = self.prices.get(symbol)
+        if entry is None or (max_age is not None and clock.now() - entry[1] > max_age):
+            return None
+        return entry[0]
+
+    # === Price updates ===
+
+    def on_price(self, symbol, price):
+        self.prices[symbol] = (price, clock.now())
+        self._check(symbol, price)
+
+    def _check(self, symbol, price):
+        with self._lock:
+            band = self._bands.get(symbol)
+            if band is None or symbol in self._pending:
+                return
+            low, high = band
+            if not ((low is not None and price <= low) or (high is not None and price >= high)):
+                return
+            self._pending.add(symbol)
+        self.stats['crossings'] += 1
+        self._queue.put((symbol, time.perf_counter()))
+
+    def _check_loop(self):
+        # Crossings are handled off the stream thread: order placement must never stall price updates
+        while True:
+            symbol, queued_at = self._queue.get()
+            with self._lock:
+                self._pending.discard(symbol)
+            price = self.last_price(symbol)
+            if price is None:
+                continue
+            started = time.perf_counter()
+            metrics.observe('price_check_lag_seconds', started - queued_at)
+            try:
+                self.on_cross(symbol, price)
+            except Exception as e:
+                print(f"⚠️ Price watcher check failed for {symbol}: {e}")
+            metrics.observe('price_check_seconds', time.perf_counter() - started)
+
+    # === REST fallback ===
+
+    def poll_once(self, symbols=None):
+        symbols = self.watched() if symbols is None else symbols
+        if not symbols:
+            return
+        self.stats['rest_polls'] += 1
+        if self.exchange.has.get('fetchTickers'):
+            tickers = self.exchange.fetch_tickers(symbols)
+        else:
+            tickers = {s: self.exchange.fetch_ticker(s) for s in symbols}
+        for symbol, ticker in tickers.items():
+            if ticker and ticker.get('last') is not None:
+                self.on_price(symbol, float(ticker['last']))
+
+    async def _poll_for(self, seconds):
+        loop = asyncio.get_running_loop()
+        deadline = None if seconds is None else clock.now() + seconds
+        while deadline is None or clock.now() < deadline:
+            try:
+                await loop.run_in_executor(None, self.poll_once)
+            except Exception as e:
+                print(f"⚠️ Price poll failed: {e}")
+            await asyncio.sleep(self.poll_sec / clock.speed())
+
+    # === WebSocket stream ===
+
+    def _market_ids(self, symbols):
+        markets = self.exchange.markets or {}
+        return {(markets.get(s) or {}).get('id') or s.replace('/', ''): s for s in symbols}
+
+    async def _sync_subscriptions(self, ws, subscribed):
+        wanted = self._market_ids(self.watched())
+        added = [m for m in wanted if m not in subscribed]
+        removed = [m for m in subscribed if m not in wanted]
+        if added:
+            await ws.send_json(self.protocol.subscribe(added))
+        if removed:
+            await ws.send_json(self.protocol.unsubscribe(removed))
+        subscribed.clear()
+        subscribed.update(wanted)
+
+    async def _stream(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.ws_url) as ws:
+                self.connected = True
+                print(f"📡 Price stream connected: {self.ws_url}")
+                subscribed = {}
+                last_seen = last_ping = last_stale_check = time.monotonic()
+                stale_poll = None
+                try:
+                    while True:
+                        await self._sync_subscriptions(ws, subscribed)
+                        now = time.monotonic()
+                        if now - last_ping >= self.ping_sec:
+                            await ws.send_json(self.protocol.ping())
+                            last_ping = now
+                        if now - last_seen > self.ping_sec * 3:
+                            raise ConnectionError("no data or pong from price stream")
+                        # Pongs keep the socket alive even when a symbol gets no deals: cover those over REST
+                        idle = stale_poll is None or stale_poll.done()
+                        if idle and now - last_stale_check >= self.poll_sec / clock.speed():
+                            last_stale_check = now
+                            stale_poll = asyncio.ensure_future(self._poll_stale())
+                        try:
+                            msg = await ws.receive(timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        if msg.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                            raise ConnectionError(f"price stream closed ({msg.type.name})")
+                        last_seen = time.monotonic()
+                        self._on_message(msg.data, subscribed)
+                finally:
+                    if stale_poll is not None:
+                        stale_poll.cancel()
+
+    def _on_message(self, data, subscribed):
+        for market_id, price, _ in self.protocol.parse(data):
+            symbol = subscribed.get(market_id)
+            if symbol:
+                self.stats['ws_updates'] += 1
+                self.on_price(symbol, price)
+
+    async def _poll_stale(self):
+        stale = self.stale_symbols()
+        if not stale:
+            return
+        self.stats['stale_polls'] += 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.poll_once, stale)
+        except Exception as e:
+            print(f"⚠️ Price poll for quiet symbols failed: {e}")
+
+    async def _run(self):
+        if not self.ws_url:
+            await self._poll_for(None)
+        backoff = 1
+        while True:
+            started = time.monotonic()
+            try:
+                await self._stream()
+            except Exception as e:
+                print(f"⚠️ Price stream down ({e}), polling REST for {backoff}s")
+            self.connected = False
+            self.stats['reconnects'] += 1
+            backoff = 1 if time.monotonic() - started > 60 else min(backoff * 2, self.max_reconnect_sec)
+            await self._poll_for(backoff)
+
+    def start(self):
+        # Safe to call more than once
+        if self._thread is None or not self._thread.is_alive():
+            self._checker = threading.Thread(target=self._check_loop, daemon=True)
+            self._checker.start()
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+            self._thread.start()
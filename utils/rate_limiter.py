@@ -0,0 +1,251 @@
+# utils/rate_limiter.py
+#
+# Process-wide rate limiting per exchange account. Every client for the same
+# exchange id + API key shares one RateLimiter (get_rate_limiter), which holds
+# weighted token buckets per endpoint class (public market data, private
+# account reads, orders). Waiters queue by lane: 'critical' (orders, stops)
+# goes ahead of 'normal' (trade loop) and 'background' (scanner, Telegram
+# info commands). A 429 drains the bucket and pauses it with exponential
+# backoff instead of each caller sleeping on its own.
+
+import contextlib
+import functools
+import heapq
+import itertools
+import threading
+
+import ccxt
+
+from utils import clock
+
+LANES = ('critical', 'normal', 'background')
+
+DEFAULT_BUCKETS = {
+    # tokens refilled per second, bucket size
+    'public': {'rate': 20, 'burst': 20},
+    'private': {'rate': 10, 'burst': 10},
+    'orders': {'rate': 5, 'burst': 5},
+}
+
+# method -> (bucket, weight); anything else starting with fetch_ counts as ('public', 1)
+DEFAULT_ENDPOINTS = {
+    'load_markets': ('public', 10),
+    'fetch_ohlcv': ('public', 1),
+    'fetch_ticker': ('public', 1),
+    'fetch_tickers': ('public', 10),
+    'fetch_order_book': ('public', 1),
+    'fetch_balance': ('private', 5),
+    'fetch_open_orders': ('private', 3),
+    'fetch_order': ('private', 1),
+    'fetch_my_trades': ('private', 5),
+    'fetch_position': ('private', 1),
+    'create_order': ('orders', 1),
+    'create_limit_buy_order': ('orders', 1),
+    'create_limit_sell_order': ('orders', 1),
+    'create_market_buy_order': ('orders', 1),
+    'create_market_sell_order': ('orders', 1),
+    'cancel_order': ('orders', 1),
+    'cancel_all_orders': ('orders', 1),
+}
+
+RATE_LIMIT_ERRORS = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+_thread_lane = threading.local()
+
+
+def set_thread_lane(name):
+    # Default lane for every call made from the current thread
+    if name not in LANES:
+        raise ValueError(f"Unknown lane {name!r}, expected one of {LANES}")
+    _thread_lane.name = name
+
+
+@contextlib.contextmanager
+def lane(name):
+    previous = getattr(_thread_lane, 'name', None)
+    set_thread_lane(name)
+    try:
+        yield
+    finally:
+        _thread_lane.name = previous
+
+
+def run_in_lane(name):
+    # Decorator form of lane() for functions that should always run in one lane
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with lane(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_lane():
+    return getattr(_thread_lane, 'name', None)
+
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = clock.now()
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.waiting = []               # heap of (lane priority, seq)
+        self.queued = [0] * len(LANES)
+        self.stats = {'acquired': 0, 'waited': 0, 'wait_total_sec': 0.0, 'wait_max_sec': 0.0, 'penalties': 0}
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    def __init__(self, name, buckets=None, endpoints=None, base_backoff_sec=1.0, max_backoff_sec=30.0):
+        self.name = name
+        self.endpoints = dict(DEFAULT_ENDPOINTS, **(endpoints or {}))
+        self.base_backoff_sec = base_backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self._buckets = {
+            bucket: _Bucket(**settings) for bucket, settings in dict(DEFAULT_BUCKETS, **(buckets or {})).items()
+        }
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def is_endpoint(self, method):
+        return method in self.endpoints or method.startswith('fetch_')
+
+    def classify(self, method):
+        return self.endpoints.get(method, ('public', 1))
+
+    def _lane_for(self, bucket, lane_name):
+        lane_name = lane_name or current_lane() or ('critical' if bucket == 'orders' else 'normal')
+        return LANES.index(lane_name)
+
+    def acquire(self, method, lane_name=None):
+        # Blocks until the method's bucket has room; returns seconds waited
+        bucket_name, weight = self.classify(method)
+        bucket = self._buckets[bucket_name]
+        weight = min(weight, bucket.burst)
+        priority = self._lane_for(bucket_name, lane_name)
+        entry = (priority, next(self._seq))
+        started = clock.now()
+
+        with self._cond:
+            heapq.heappush(bucket.waiting, entry)
+            bucket.queued[priority] += 1
+            try:
+                while True:
+                    now = clock.now()
+                    if bucket.waiting[0] != entry:
+                        self._cond.wait()       # the head of the queue wakes everyone once it's through
+                        continue
+                    bucket.refill(now)
+                    wait = max(bucket.blocked_until - now,
+                               (weight - bucket.tokens) / bucket.rate if bucket.tokens < weight else 0.0)
+                    if wait <= 0:
+                        bucket.tokens -= weight
+                        break
+                    self._cond.wait(wait / clock.speed())
+            finally:
+                bucket.waiting.remove(entry)
+                heapq.heapify(bucket.waiting)
+                bucket.queued[priority] -= 1
+                self._cond.notify_all()
+
+            waited = clock.now() - started
+            bucket.stats['acquired'] += 1
+            if waited > 0.001:
+                bucket.stats['waited'] += 1
+                bucket.stats['wait_total_sec'] += waited
+                bucket.stats['wait_max_sec'] = max(bucket.stats['wait_max_sec'], waited)
+        return waited
+
+    def penalize(self, method):
+        # Exchange answered 429: empty the bucket and pause it, doubling the pause while 429s continue
+        bucket = self._buckets[self.classify(method)[0]]
+        with self._cond:
+            bucket.backoff = min(bucket.backoff * 2 if bucket.backoff else self.base_backoff_sec, self.max_backoff_sec)
+            bucket.tokens = 0.0
+            bucket.blocked_until = max(bucket.blocked_until, clock.now() + bucket.backoff)
+            bucket.stats['penalties'] += 1
+            self._cond.notify_all()
+        return bucket.backoff
+
+    def succeeded(self, method):
+        bucket = self._buckets[self.classify(method)[0]]
+        if bucket.backoff:
+            with self._cond:
+                bucket.backoff = 0.0
+
+    def metrics(self):
+        now = clock.now()
+        with self._cond:
+            result = {}
+            for name, bucket in self._buckets.items():
+                bucket.refill(now)
+                stats = bucket.stats
+                result[name] = {
+                    'tokens': round(bucket.tokens, 2),
+                    'queued': dict(zip(LANES, bucket.queued)),
+                    'acquired': stats['acquired'],
+                    'waited': stats['waited'],
+                    'wait_avg_ms': stats['wait_total_sec'] / stats['waited'] * 1000 if stats['waited'] else 0.0,
+                    'wait_max_ms': stats['wait_max_sec'] * 1000,
+                    'penalties': stats['penalties'],
+                    'blocked_for_sec': max(bucket.blocked_until - now, 0.0),
+                }
+            return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(exchange, buckets=None, endpoints=None):
+    # One limiter per exchange id + account, shared by every client instance in the process
+    api_key = getattr(exchange, 'apiKey', None)
+    key = (exchange.id, api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            name = f"{exchange.id}:{'…' + api_key[-4:] if api_key else 'public'}"  # never log the full key
+            limiter = _limiters[key] = RateLimiter(name, buckets, endpoints)
+        return limiter
+
+
+def all_rate_limiters():
+    with _limiters_lock:
+        return {limiter.name: limiter for limiter in _limiters.values()}
+
+
+class RateLimitedExchange:
+    # Wraps a ccxt client so every endpoint call first takes tokens from the shared limiter
+
+    def __init__(self, exchange, limiter):
+        self._inner = exchange
+        self.rate_limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if callable(attr) and self.rate_limiter.is_endpoint(name):
+            return lambda *args, **kwargs: self._call(name, attr, *args, **kwargs)
+        return attr
+
+    def _call(self, name, method, *args, **kwargs):
+        self.rate_limiter.acquire(name)
+        try:
+            result = method(*args, **kwargs)
+        except RATE_LIMIT_ERRORS:
+            self.rate_limiter.penalize(name)
+            raise
+        self.rate_limiter.succeeded(name)
+        return result
+
+
+def limit_exchange(exchange, buckets=None, endpoints=None):
+    # Route a client through the shared limiter; its own per-instance throttle is switched off
+    exchange.enableRateLimit = False
+    return RateLimitedExchange(exchange, get_rate_limiter(exchange, buckets, endpoints))
@@ -0,0 +1,145 @@
+# utils/request_coalescer.py
+#
+# Single-flight layer in front of an exchange client. Identical read calls
+# (same method and arguments) made while one is already in flight wait for
+# that call and share its result; results are then reused for a short,
+# per-method freshness window. Order placement and cancellation pass straight
+# through and drop cached balance / order reads. Results are shared between
+# callers, so treat them as read-only.
+
+import functools
+import threading
+
+from utils import clock
+
+# Seconds a finished result is reused; 0 = only share calls that are still in flight
+DEFAULT_FRESHNESS = {
+    'fetch_ticker': 1,
+    'fetch_tickers': 1,
+    'fetch_balance': 5,
+    'fetch_ohlcv': 1,
+    'fetch_order_book': 1,
+    'fetch_open_orders': 1,
+    'fetch_order': 0,
+    'load_markets': 0,
+}
+
+WRITE_METHODS = {
+    'create_order', 'create_limit_buy_order', 'create_limit_sell_order',
+    'create_market_buy_order', 'create_market_sell_order', 'cancel_order', 'cancel_all_orders',
+}
+INVALIDATED_BY_WRITES = {'fetch_balance', 'fetch_open_orders', 'fetch_order'}
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _Flight:
+    __slots__ = ('event', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class CoalescingExchange:
+    # Drop-in wrapper: everything that isn't a coalesced read or a write is the wrapped exchange's own attribute
+
+    def __init__(self, exchange, freshness=None, max_entries=2000):
+        self._inner = exchange
+        self.freshness = dict(DEFAULT_FRESHNESS, **(freshness or {}))
+        self._max_entries = max_entries
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesce_stats = {}        # method -> {'calls', 'upstream', 'coalesced', 'fresh_hits'}
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name in self.freshness:
+            return functools.partial(self._read, name, attr)
+        if name in WRITE_METHODS:
+            return functools.partial(self._write, attr)
+        return attr
+
+    def _stat(self, name):
+        stat = self.coalesce_stats.get(name)
+        if stat is None:
+            stat = self.coalesce_stats[name] = {'calls': 0, 'upstream': 0, 'coalesced': 0, 'fresh_hits': 0}
+        return stat
+
+    def _prune(self, now):
+        longest = max(self.freshness.values())
+        for key, flight in list(self._flights.items()):
+            if flight.finished_at is not None and now - flight.finished_at >= longest:
+                del self._flights[key]
+
+    def _read(self, name, method, *args, **kwargs):
+        key = (name, _freeze(args), _freeze(kwargs))
+        now = clock.now()
+        with self._flights_lock:
+            stat = self._stat(name)
+            stat['calls'] += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                if flight.finished_at is None:
+                    stat['coalesced'] += 1
+                elif now - flight.finished_at < self.freshness[name]:
+                    stat['fresh_hits'] += 1
+                    return flight.result
+                else:
+                    flight = None
+            leader = flight is None
+            if leader:
+                if len(self._flights) >= self._max_entries:
+                    self._prune(now)
+                flight = self._flights[key] = _Flight()
+                stat['upstream'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = method(*args, **kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                flight.finished_at = clock.now()
+                # Errors are shared with whoever was waiting, never cached
+                if (flight.error is not None or not self.freshness[name]) and self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.event.set()
+
+    def invalidate(self, methods=None):
+        with self._flights_lock:
+            for key, flight in list(self._flights.items()):
+                if flight.finished_at is not None and (methods is None or key[0] in methods):
+                    del self._flights[key]
+
+    def _write(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.invalidate(INVALIDATED_BY_WRITES)
+
+    def summary(self):
+        calls = sum(s['calls'] for s in self.coalesce_stats.values())
+        upstream = sum(s['upstream'] for s in self.coalesce_stats.values())
+        return {
+            'calls': calls,
+            'upstream': upstream,
+            'saved': calls - upstream,
+            'saved_rate': (calls - upstream) / calls if calls else 0.0,
+        }
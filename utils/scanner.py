@@ -1,29 +1,36 @@
 # utils/scanner.py
 
 import ccxt
-import time
-from utils.exchange import get_top_volatile_tokens  # make sure this is correct
+from utils.volatility_detector import get_top_volatile_tokens
 import config
+from utils import clock
+from utils.markets import get_market_cache
+from utils.exchange_utils import get_exchange, rate_limited
+from utils.rate_limiter import set_thread_lane
 
 # Global cache for scanner
 volatile_cache = {}
 
 def scanner_loop():
-    exchange = ccxt.binance({
-        "enableRateLimit": True,
-        "options": {"adjustForTimeDifference": True}
-    })
+    # Scanning yields to orders and the trade loop on a shared rate limit
+    set_thread_lane('background')
+    if getattr(config, 'exchange_backend', 'mexc') == 'fake':
+        # Offline runs scan the simulated market instead of Binance
+        exchange = get_exchange()
+    else:
+        exchange = rate_limited(ccxt.binance({
+            "enableRateLimit": True,
+            "options": {"adjustForTimeDifference": True}
+        }))
+    # Markets for this exchange come from the shared cache / snapshot and refresh in the background
+    markets = get_market_cache(exchange)
+    markets.start()
 
     while True:
         try:
-            tokens = get_top_volatile_tokens(
-                exchange,
-                top_n=config.top_n_volatile,         # e.g. 5
-                interval='15m',
-                min_volume=config.min_volume,        # e.g. 500000
-                min_change_percent=config.min_change_percent,  # e.g. 2
-                max_price=config.max_price           # Optional
-            )
+            # Same filters as the trade loop; one bulk fetch_tickers call per scan
+            filters = {k: v for k, v in config.volatility_filters.items() if k != 'scan_interval'}
+            tokens = get_top_volatile_tokens(exchange, **filters)
 
             # ✅ Update global cache
             volatile_cache.clear()
@@ -37,4 +44,4 @@ def scanner_loop():
         except Exception as e:
             print("⚠️ Volatile token scanner failed:", e)
 
-        time.sleep(config.scan_interval)  # e.g. 60s
+        clock.sleep(config.volatility_filters.get('scan_interval', 60))  # e.g. 60s
@@ -0,0 +1,212 @@
+# utils/state_store.py
+#
+# Journaled store for the bot's persistent dicts (open positions, RSI alerts,
+# last trade times, daily loss). save(name, data) diffs data against what was
+# last persisted and appends one small JSON line per changed or removed key;
+# the journal is fsynced in batches by a background thread. Every
+# compact_sec (or compact_records appended lines) the current state is written
+# to a snapshot and the journal starts over. Startup = load the snapshot,
+# replay the journal lines after it.
+
+import atexit
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_FILE = 'snapshot.json'
+JOURNAL_FILE = 'journal.jsonl'
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class StateStore:
+    def __init__(self, directory='state', fsync_sec=1.0, compact_sec=3600, compact_records=5000):
+        self.directory = directory
+        self.fsync_sec = fsync_sec
+        self.compact_sec = compact_sec
+        self.compact_records = compact_records
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self._lock = threading.RLock()
+        self._persisted = {}            # name -> {key: serialized value}, i.e. what's on disk
+        self._seq = 0
+        self._journal = None
+        self._closed = False
+        self._journal_records = 0
+        self._dirty = False
+        self._compacted_at = time.time()
+        self._thread = None
+        self.stats = {'records': 0, 'saves': 0, 'fsyncs': 0, 'compactions': 0, 'replayed': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        atexit.register(self.close)
+
+    # === Startup ===
+
+    def _recover(self):
+        started = time.time()
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._seq = snapshot.get('seq', 0)
+            self._persisted = {
+                name: {key: _dumps(value) for key, value in values.items()}
+                for name, values in snapshot.get('state', {}).items()
+            }
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                lines = f.readlines()
+            valid_bytes = 0
+            for i, line in enumerate(lines):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    if i == len(lines) - 1:
+                        # Torn last line from a crash mid-write: cut it so new appends start clean
+                        with open(self.journal_path, 'r+b') as f:
+                            f.truncate(valid_bytes)
+                        break
+                    raise
+                valid_bytes += len(line)
+                if record['s'] <= self._seq:
+                    continue            # already in the snapshot (crash between snapshot and truncate)
+                values = self._persisted.setdefault(record['n'], {})
+                if record.get('d'):
+                    values.pop(record['k'], None)
+                else:
+                    values[record['k']] = _dumps(record['v'])
+                self._seq = record['s']
+                self._journal_records += 1
+                self.stats['replayed'] += 1
+
+        if self._journal_records:
+            print(f"💾 State restored: replayed {self._journal_records} journal records in "
+                  f"{(time.time() - started) * 1000:.0f}ms")
+
+    def load(self, name, legacy_file=None):
+        # Current value of a stored dict; on first run it is imported from the old whole-file JSON if present
+        with self._lock:
+            values = self._persisted.get(name)
+            if values is None and legacy_file and os.path.exists(legacy_file):
+                try:
+                    with open(legacy_file, encoding='utf-8') as f:
+                        data = json.load(f)
+                    self.save(name, data)
+                    print(f"💾 Imported {legacy_file} into the state journal")
+                except Exception as e:
+                    print(f"⚠️ Could not import {legacy_file}: {e}")
+                values = self._persisted.get(name)
+            return {key: json.loads(value) for key, value in (values or {}).items()}
+
+    # === Writes ===
+
+    def save(self, name, data):
+        # Journal only the keys of data that changed since the last save; returns the number of records written.
+        # _persisted only takes the changes once they are written, so a failed write is retried by the next save.
+        # After close() (atexit) saves are ignored: threads still running at exit must not half-update the store.
+        current = {str(key): _dumps(value) for key, value in list(data.items())}
+        with self._lock:
+            if self._closed:
+                return 0
+            persisted = self._persisted.get(name, {})
+            seq = self._seq
+            lines, changed = [], {}
+            for key, value in current.items():
+                if persisted.get(key) != value:
+                    seq += 1
+                    lines.append(f'{{"s":{seq},"n":{json.dumps(name)},"k":{json.dumps(key)},"v":{value}}}\n')
+                    changed[key] = value
+            removed = [k for k in persisted if k not in current]
+            for key in removed:
+                seq += 1
+                lines.append(_dumps({'s': seq, 'n': name, 'k': key, 'd': 1}) + '\n')
+
+            self.stats['saves'] += 1
+            if lines:
+                offset = self._journal.tell()
+                try:
+                    self._journal.write(''.join(lines))
+                    self._journal.flush()
+                except Exception:
+                    self._truncate(offset)
+                    raise
+                persisted = self._persisted.setdefault(name, {})
+                persisted.update(changed)
+                for key in removed:
+                    del persisted[key]
+                self._seq = seq
+                self._journal_records += len(lines)
+                self.stats['records'] += len(lines)
+                self._dirty = True
+                if self._thread is None:
+                    self._start()
+            return len(lines)
+
+    def _truncate(self, offset):
+        # Cut a partly written batch (e.g. ENOSPC) so the journal does not keep a torn line in the middle
+        try:
+            self._journal.seek(offset)
+            self._journal.truncate()
+        except Exception as e:
+            print(f"⚠️ State journal: could not cut a failed write: {e}")
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and not self._closed:
+                os.fsync(self._journal.fileno())
+                self._dirty = False
+                self.stats['fsyncs'] += 1
+
+    def compact(self):
+        # Snapshot the current state, then start an empty journal
+        with self._lock:
+            if self._closed:
+                return
+            state = {
+                name: {key: json.loads(value) for key, value in values.items()}
+                for name, values in self._persisted.items()
+            }
+            tmp = self.snapshot_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self._seq, 'saved_at': time.time(), 'state': state}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+
+            self._journal.close()
+            self._journal = open(self.journal_path, 'w', encoding='utf-8')
+            self._journal_records = 0
+            self._dirty = False
+            self._compacted_at = time.time()
+            self.stats['compactions'] += 1
+
+    # === Background fsync / compaction ===
+
+    def _maintain(self):
+        while True:
+            time.sleep(self.fsync_sec)
+            try:
+                if (self._journal_records >= self.compact_records
+                        or (self._journal_records and time.time() - self._compacted_at >= self.compact_sec)):
+                    self.compact()
+                else:
+                    self.sync()
+            except Exception as e:
+                print(f"⚠️ State store maintenance failed: {e}")
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._maintain, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._lock:
+            if self._journal and not self._journal.closed:
+                self.sync()
+                self._journal.close()
+            self._closed = True
@@ -0,0 +1,365 @@
+# utils/streaming_indicators.py
+#
+# Incremental versions of the indicators in utils/indicators.py. Every
+# indicator keeps just enough state (Wilder / EMA averages, rolling sums) to
+# take the next candle in O(1), and can roll back the last candle so the
+# still-open bar can be re-applied every time it changes. Warm-up behaviour
+# follows the `ta` library so values line up with get_rsi / get_macd / etc.
+
+import math
+import threading
+from collections import deque
+
+from utils.indicators import ZigzagState
+
+NAN = float('nan')
+
+
+class _Ewm:
+    # pandas ewm(adjust=False): s0 = x0, s = (1 - a) * s + a * x; NaNs before the first value are skipped
+    __slots__ = ('alpha', 'min_periods', 'value', 'count')
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    def state(self):
+        return self.value, self.count
+
+    def restore(self, state):
+        self.value, self.count = state
+
+    def update(self, x):
+        if x != x:  # NaN
+            return self.output()
+        self.value = x if self.value is None else (1 - self.alpha) * self.value + self.alpha * x
+        self.count += 1
+        return self.output()
+
+    def output(self):
+        return self.value if self.count >= self.min_periods else NAN
+
+
+class _Rolling:
+    # Rolling mean / population std over a fixed window using running sum and sum of squares
+    __slots__ = ('window', 'values', 'sum', 'sumsq', 'since_resync')
+
+    RESYNC_EVERY = 1000  # recompute the sums from scratch now and then to stop float drift
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.since_resync = 0
+
+    def append(self, x):
+        self.values.append(x)
+        self.sum += x
+        self.sumsq += x * x
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.sum -= old
+            self.sumsq -= old * old
+        self.since_resync += 1
+        if self.since_resync >= self.RESYNC_EVERY:
+            self.sum = math.fsum(self.values)
+            self.sumsq = math.fsum(v * v for v in self.values)
+            self.since_resync = 0
+
+    def replace_last(self, x):
+        old = self.values[-1]
+        self.values[-1] = x
+        self.sum += x - old
+        self.sumsq += x * x - old * old
+
+    def mean(self):
+        if len(self.values) < self.window:
+            return NAN
+        return self.sum / self.window
+
+    def std(self):
+        if len(self.values) < self.window:
+            return NAN
+        mean = self.sum / self.window
+        return math.sqrt(max(self.sumsq / self.window - mean * mean, 0.0))
+
+
+class StreamingRSI:
+    # ta.momentum.RSIIndicator: Wilder smoothing via ewm(alpha=1/window, adjust=False)
+    def __init__(self, window=14):
+        self.prev_close = None
+        self.up = _Ewm(1.0 / window, window)
+        self.down = _Ewm(1.0 / window, window)
+        self._saved = None
+
+    def _state(self):
+        return self.prev_close, self.up.state(), self.down.state()
+
+    def _restore(self, state):
+        self.prev_close, up, down = state
+        self.up.restore(up)
+        self.down.restore(down)
+
+    def _update(self, close):
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        up = self.up.update(diff if diff > 0 else 0.0)
+        down = self.down.update(-diff if diff < 0 else 0.0)
+        self.prev_close = close
+        if up != up or down != down:
+            return NAN
+        if down == 0:
+            return 100.0
+        return 100.0 - (100.0 / (1.0 + up / down))
+
+    def append(self, close):
+        self._saved = self._state()
+        return self._update(close)
+
+    def replace_last(self, close):
+        self._restore(self._saved)
+        return self._update(close)
+
+
+class StreamingMACD:
+    # ta.trend.MACD: EMA(12) - EMA(26), signal = EMA(9) of the MACD line
+    def __init__(self, window_fast=12, window_slow=26, window_sign=9):
+        self.fast = _Ewm(2.0 / (window_fast + 1), window_fast)
+        self.slow = _Ewm(2.0 / (window_slow + 1), window_slow)
+        self.sign = _Ewm(2.0 / (window_sign + 1), window_sign)
+        self._saved = None
+
+    def _update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.sign.update(macd)
+        return macd, signal, macd - signal
+
+    def append(self, close):
+        self._saved = (self.fast.state(), self.slow.state(), self.sign.state())
+        return self._update(close)
+
+    def replace_last(self, close):
+        fast, slow, sign = self._saved
+        self.fast.restore(fast)
+        self.slow.restore(slow)
+        self.sign.restore(sign)
+        return self._update(close)
+
+
+class StreamingBollinger:
+    # ta.volatility.BollingerBands: rolling mean +/- window_dev * population std
+    def __init__(self, window=20, window_dev=2):
+        self.rolling = _Rolling(window)
+        self.window_dev = window_dev
+
+    def _output(self):
+        mavg = self.rolling.mean()
+        std = self.rolling.std()
+        return mavg + self.window_dev * std, mavg, mavg - self.window_dev * std
+
+    def append(self, close):
+        self.rolling.append(close)
+        return self._output()
+
+    def replace_last(self, close):
+        self.rolling.replace_last(close)
+        return self._output()
+
+
+class StreamingSMA:
+    def __init__(self, window):
+        self.rolling = _Rolling(window)
+
+    def append(self, x):
+        self.rolling.append(x)
+        return self.rolling.mean()
+
+    def replace_last(self, x):
+        self.rolling.replace_last(x)
+        return self.rolling.mean()
+
+
+class StreamingATR:
+    # ta.volatility.AverageTrueRange: mean of the first `window` true ranges, then Wilder smoothing.
+    # Like `ta`, values before the first full window are 0.
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = None
+        self.count = 0
+        self.tr_sum = 0.0
+        self.atr = 0.0
+        self._saved = None
+
+    def _update(self, high, low, close):
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count < self.window:
+            self.tr_sum += tr
+            return 0.0
+        if self.count == self.window:
+            self.atr = (self.tr_sum + tr) / self.window
+        else:
+            self.atr = (self.atr * (self.window - 1) + tr) / float(self.window)
+        return self.atr
+
+    def append(self, high, low, close):
+        self._saved = (self.prev_close, self.count, self.tr_sum, self.atr)
+        return self._update(high, low, close)
+
+    def replace_last(self, high, low, close):
+        self.prev_close, self.count, self.tr_sum, self.atr = self._saved
+        return self._update(high, low, close)
+
+
+INDICATOR_COLUMNS = [
+    'rsi', 'macd', 'signal', 'macd_hist', 'upper_band', 'middle_band', 'lower_band',
+    'sma', 'atr', 'volume_avg'
+]
+
+
+class StreamingIndicators:
+    # All indicator columns for one (symbol, timeframe) series, with a bounded output history
+    def __init__(self, rsi_period=14, sma_period=50, atr_period=14, bb_period=20, bb_stddev=2,
+                 volume_lookback=20, max_history=1000, zigzag_deviation=None):
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD()
+        self.bb = StreamingBollinger(bb_period, bb_stddev)
+        self.sma = StreamingSMA(sma_period)
+        self.atr = StreamingATR(atr_period)
+        self.volume_avg = StreamingSMA(volume_lookback)
+        self.max_history = max_history
+        # ZigZag only ever sees closed candles: a candle's close is fed in once the next one opens
+        self.zigzag = ZigzagState(zigzag_deviation) if zigzag_deviation else None
+        self._open_close = None
+        self.timestamps = []
+        self.history = {col: [] for col in INDICATOR_COLUMNS}
+
+    @property
+    def last_timestamp(self):
+        return self.timestamps[-1] if self.timestamps else None
+
+    def _row(self, op, high, low, close, volume):
+        macd, signal, hist = getattr(self.macd, op)(close)
+        upper, middle, lower = getattr(self.bb, op)(close)
+        return {
+            'rsi': getattr(self.rsi, op)(close),
+            'macd': macd,
+            'signal': signal,
+            'macd_hist': hist,
+            'upper_band': upper,
+            'middle_band': middle,
+            'lower_band': lower,
+            'sma': getattr(self.sma, op)(close),
+            'atr': getattr(self.atr, op)(high, low, close),
+            'volume_avg': getattr(self.volume_avg, op)(volume),
+        }
+
+    def update(self, ts, open_, high, low, close, volume):
+        # Returns False if the candle is older than the last one seen (caller must reseed)
+        last = self.last_timestamp
+        if last is not None and ts < last:
+            return False
+
+        if ts == last:
+            row = self._row('replace_last', high, low, close, volume)
+            for col, value in row.items():
+                self.history[col][-1] = value
+            self._open_close = close
+            return True
+
+        if self.zigzag is not None and self._open_close is not None:
+            self.zigzag.update([self._open_close])
+        self._open_close = close
+
+        row = self._row('append', high, low, close, volume)
+        self.timestamps.append(ts)
+        for col, value in row.items():
+            self.history[col].append(value)
+
+        # Trim in chunks so the front-of-list delete stays amortised O(1)
+        if len(self.timestamps) > 2 * self.max_history:
+            cut = len(self.timestamps) - self.max_history
+            del self.timestamps[:cut]
+            for values in self.history.values():
+                del values[:cut]
+        return True
+
+    def latest(self):
+        return {col: values[-1] for col, values in self.history.items()} if self.timestamps else {}
+
+    def columns_for(self, timestamps):
+        # Indicator values aligned to the given (sorted) candle timestamps, or None if they don't line up
+        if not timestamps:
+            return None
+        last = timestamps[-1]
+        end = len(self.timestamps)
+        while end > 0 and self.timestamps[end - 1] > last:
+            end -= 1
+        start = end - len(timestamps)
+        if end == 0 or self.timestamps[end - 1] != last or start < 0 or self.timestamps[start] != timestamps[0]:
+            return None
+        return {col: values[start:end] for col, values in self.history.items()}
+
+
+class IndicatorEngine:
+    # Keeps one StreamingIndicators per (symbol, timeframe), fed by CandleStore merges
+    def __init__(self, **params):
+        self.params = params
+        self._series = {}
+        self._lock = threading.Lock()
+        self.stats = {'appended': 0, 'reseeds': 0}
+
+    def _reseed(self, key, rows):
+        engine = StreamingIndicators(**self.params)
+        for r in rows:
+            engine.update(*r[:6])
+        self._series[key] = engine
+        self.stats['reseeds'] += 1
+
+    def on_candles(self, key, rows, start):
+        # CandleStore listener: rows[start:] were appended or replaced
+        with self._lock:
+            engine = self._series.get(key)
+            if engine is None or (start < len(rows) and engine.last_timestamp is not None
+                                  and rows[start][0] < engine.last_timestamp):
+                self._reseed(key, rows)
+                return
+            for r in rows[start:]:
+                engine.update(*r[:6])
+                self.stats['appended'] += 1
+
+    def zigzag_last_type(self, symbol, tf):
+        # ZIGZAG_TOP / ZIGZAG_BOTTOM of the latest confirmed swing, 0 if none (or zigzag disabled)
+        with self._lock:
+            engine = self._series.get((symbol, tf))
+            return engine.zigzag.last_type if engine and engine.zigzag else 0
+
+    def latest(self, symbol, tf):
+        with self._lock:
+            engine = self._series.get((symbol, tf))
+            return engine.latest() if engine else {}
+
+    def attach(self, df, symbol, tf):
+        # Adds the streamed indicator columns to a candle frame; returns False if the engine
+        # isn't aligned with the frame (e.g. it changed underneath us) so the caller can fall back
+        if df is None or df.empty:
+            return False
+        ts = df['timestamp']
+        if str(ts.dtype).startswith('datetime64'):
+            timestamps = ts.to_numpy().astype('datetime64[ms]').astype('int64').tolist()
+        else:
+            timestamps = ts.tolist()
+        with self._lock:
+            engine = self._series.get((symbol, tf))
+            columns = engine.columns_for(timestamps) if engine else None
+        if columns is None:
+            return False
+        for col, values in columns.items():
+            df[col] = values
+        return True
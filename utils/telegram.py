@@ -1,11 +1,190 @@
-from config import use_telegram, telegram_token, telegram_chat_id
+# utils/telegram.py
+#
+# Outbound Telegram messages. notify() only queues the text; a background
+# worker sends it over one pooled HTTP session with timeouts. Messages that
+# arrive close together are joined into one sendMessage (up to Telegram's
+# 4096 characters), sends are spaced per chat and a 429 honours retry_after.
+# 'critical' messages (fills, exits, failures on the order path) go out ahead
+# of 'info' ones and are the last to be dropped when the queue is full.
+
+import atexit
+import collections
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
 
-def notify(msg):
-    if use_telegram:
-        url = f"https://api.telegram.org/bot{telegram_token}/sendMessage"
-        data = {"chat_id": telegram_chat_id, "text": msg}
+import config
+from config import use_telegram, telegram_token, telegram_chat_id
+from utils.metrics import metrics
+
+PRIORITIES = ('critical', 'info')
+MAX_MESSAGE_CHARS = 4096
+
+
+class TelegramNotifier:
+    def __init__(self, token, chat_id, max_queue=500, batch_sec=1.0, min_interval_sec=1.0, timeout_sec=10):
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.max_queue = max_queue
+        self.batch_sec = batch_sec
+        self.min_interval_sec = min_interval_sec
+        self.timeout_sec = timeout_sec
+        self._queues = {p: collections.deque() for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._next_send = 0.0
+        self._sending = False
+        self._thread = None
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=1))
+        self.stats = {'queued': 0, 'sent_messages': 0, 'requests': 0, 'dropped': 0, 'errors': 0, 'throttled': 0}
+
+    # === Producer side (any thread, never blocks on the network) ===
+
+    def notify(self, msg, priority='info'):
+        msg = str(msg)
+        with self._cond:
+            queue = self._queues[priority]
+            if sum(len(q) for q in self._queues.values()) >= self.max_queue:
+                # Full: drop the oldest informational message; with only critical ones queued,
+                # an info message is dropped itself and a critical one replaces the oldest critical
+                self.stats['dropped'] += 1
+                if self._queues['info']:
+                    self._queues['info'].popleft()
+                elif priority == 'info':
+                    return
+                else:
+                    queue.popleft()
+            queue.append((time.monotonic(), msg))
+            self.stats['queued'] += 1
+            self._cond.notify()
+        if self._thread is None:
+            self._start()
+
+    # === Worker ===
+
+    def _take_batch(self):
+        # -> list of messages for one request: critical first, as many whole messages as fit
+        batch, size = [], 0
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                text = queue[0][1]
+                if len(text) > MAX_MESSAGE_CHARS:
+                    text = text[:MAX_MESSAGE_CHARS - 1] + '…'
+                added = len(text) + (2 if batch else 0)
+                if batch and size + added > MAX_MESSAGE_CHARS:
+                    return batch
+                queue.popleft()
+                batch.append(text)
+                size += added
+        return batch
+
+    def _wait_for_batch(self):
+        # Critical messages go as soon as the chat's send interval allows; info waits batch_sec to collect a burst
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                critical, info = self._queues['critical'], self._queues['info']
+                if critical:
+                    ready_at = self._next_send
+                elif info:
+                    ready_at = max(self._next_send, info[0][0] + self.batch_sec)
+                else:
+                    self._cond.wait()
+                    continue
+                if now >= ready_at:
+                    self._sending = True
+                    return self._take_batch()
+                self._cond.wait(ready_at - now)
+
+    def _post(self, text):
+        # True once Telegram accepted (or permanently rejected) the text; False to retry it
+        self.stats['requests'] += 1
         try:
-            requests.post(url, data=data)
-        except Exception as e:
+            with metrics.timer('telegram_request_seconds', method='sendMessage'):
+                resp = self._session.post(self.url, data={'chat_id': self.chat_id, 'text': text},
+                                          timeout=self.timeout_sec)
+        except requests.RequestException as e:
+            self.stats['errors'] += 1
+            metrics.inc('telegram_errors_total', method='sendMessage')
             print("Telegram error:", e)
+            self._next_send = time.monotonic() + 5
+            return False
+        if resp.status_code == 429:
+            self.stats['throttled'] += 1
+            metrics.inc('telegram_errors_total', method='sendMessage')
+            try:
+                retry_after = resp.json().get('parameters', {}).get('retry_after', 5)
+            except ValueError:
+                retry_after = 5
+            self._next_send = time.monotonic() + retry_after
+            return False
+        self._next_send = time.monotonic() + self.min_interval_sec
+        if not resp.ok:
+            self.stats['errors'] += 1
+            metrics.inc('telegram_errors_total', method='sendMessage')
+            print(f"Telegram error: HTTP {resp.status_code} {resp.text[:200]}")
+        return True
+
+    def _send(self, batch):
+        if self._post('\n\n'.join(batch)):
+            self.stats['sent_messages'] += len(batch)
+            return
+        # Not delivered: put it back at the front so ordering and priority hold on the retry
+        with self._cond:
+            for text in reversed(batch):
+                self._queues['critical'].appendleft((0.0, text))
+
+    def _run(self):
+        while True:
+            batch = self._wait_for_batch()
+            try:
+                self._send(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print("Telegram error:", e)
+            finally:
+                self._sending = False
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout_sec=5):
+        # Wait (bounded) for queued messages to go out, e.g. before the process exits
+        deadline = time.monotonic() + timeout_sec
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._sending and not any(self._queues.values()):
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def pending(self):
+        with self._cond:
+            return {p: len(q) for p, q in self._queues.items()}
+
+    def collect_metrics(self):
+        for priority, depth in self.pending().items():
+            yield 'telegram_queue_depth', {'priority': priority}, depth
+        yield 'telegram_dropped_total', {}, self.stats['dropped']
+
+
+notifier = TelegramNotifier(
+    telegram_token, telegram_chat_id,
+    max_queue=getattr(config, 'telegram_queue_size', 500),
+    batch_sec=getattr(config, 'telegram_batch_sec', 1.0),
+    min_interval_sec=getattr(config, 'telegram_min_interval_sec', 1.0),
+    timeout_sec=getattr(config, 'telegram_timeout_sec', 10)
+)
+atexit.register(notifier.flush)
+metrics.add_collector(notifier.collect_metrics)
+
+
+def notify(msg, priority='info'):
+    if use_telegram:
+        notifier.notify(msg, priority)
@@ -4,7 +4,12 @@ import config
 import fcntl
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from utils.bot_state import is_bot_active
+from utils.telegram import notifier
+from utils.rate_limiter import set_thread_lane
+from utils.metrics import metrics
 
 # === LOCKFILE to prevent multiple polling instances ===
 LOCK_PATH = "/tmp/telegram_poll.lock"
@@ -20,158 +25,112 @@ except IOError:
 
 _last_update_id_holder = {"value": None}
 
-def send_msg(msg):
+def send_msg(msg, priority='info'):
+    # Replies go through the shared background notifier (utils/telegram.py)
     if config.use_telegram:
-        try:
-            url = f"https://api.telegram.org/bot{config.telegram_token}/sendMessage"
-            data = {"chat_id": config.telegram_chat_id, "text": msg}
-            requests.post(url, data=data)
-        except Exception as e:
-            print("Telegram send error:", e)
+        notifier.notify(msg, priority)
 
-def check_telegram_commands():
-    from bot import panic_close_all_positions, cancel_all_orders
-    from utils.portfolio import (
-        show_balance, show_portfolio, show_pnl, show_fees, show_max_drawdown,
-        show_open_positions, show_position_details, show_pending_orders,
-        show_orderbook_snapshot, recommend_symbol, show_last_entry,
-        show_last_close, manual_buy, manual_sell, manual_cancel,
-        trigger_take_profit, trigger_stop_loss, get_scanner_results
-    )
+# === Command handlers: each takes the split, lowercased message ===
 
-    url = f"https://api.telegram.org/bot{config.telegram_token}/getUpdates"
+def _portfolio_reply(name, upper_args=True):
+    # Reply with utils.portfolio.<name>(*args)
+    def handler(parts):
+        import utils.portfolio as portfolio
+        args = [p.upper() for p in parts[1:]] if upper_args else parts[1:]
+        send_msg(getattr(portfolio, name)(*args))
+    return handler
+
+
+def _start(parts):
+    is_bot_active["status"] = True
+    send_msg("✅ Bot STARTED. GET RICH 💵", 'critical')
+
+
+def _stop(parts):
+    is_bot_active["status"] = False
+    send_msg("⛔ Bot STOPPED.", 'critical')
+
+
+def _status(parts):
+    send_msg("🟢 Bot is RUNNING. GET RICH 💵" if is_bot_active["status"] else "🔴 Bot is STOPPED.")
+
+
+def _panic_close(parts):
+    from bot import panic_close_all_positions
+    send_msg("⚠️ Closing all open positions...", 'critical')
+    panic_close_all_positions()
 
+
+def _cancel_all(parts):
+    from bot import cancel_all_orders
+    send_msg("⚠️ Cancelling all open orders...", 'critical')
+    cancel_all_orders()
+
+
+def _restart(parts):
+    send_msg("♻️ Restarting bot (soft reload)...", 'critical')
+    notifier.flush()
+    os.execlp("python", "python", "main.py")
+
+
+def _reboot_server(parts):
+    send_msg("🔁 Rebooting server...", 'critical')
+    notifier.flush()
+    os.system("reboot")
+
+
+def _manual_buy(parts):
+    from utils.portfolio import manual_buy
     try:
-        params = {"timeout": 10}
-        if _last_update_id_holder["value"]:
-            params["offset"] = _last_update_id_holder["value"] + 1
+        amount = float(parts[2])
+    except ValueError:
+        send_msg("❌ Invalid amount format.")
+        return
+    send_msg(manual_buy(parts[1].upper(), amount))
 
-        resp = requests.get(url, params=params, timeout=10)
-        data = resp.json()
 
-        if not data.get("ok"):
-            print("⚠️ Telegram polling failed:", data)
+def _improve(parts):
+    symbol = parts[1].upper()
+    try:
+        from utils.indicators import evaluate_all_entry_conditions, calculate_indicators, get_sma
+        from utils.dataset import fetch_candles
+
+        df15 = fetch_candles(symbol, interval="15m")
+        df1h = fetch_candles(symbol, interval="1h")
+
+        if df15 is None or df1h is None:
+            send_msg(f"⚠️ Unable to fetch data for {symbol}.")
             return
 
-        for update in data.get("result", []):
-            _last_update_id_holder["value"] = update["update_id"]
-            message = update.get("message", {})
-            if not message or "text" not in message:
-                continue
+        config_obj = type('Config', (), {
+            'min_entry_signals_required': config.min_entry_signals_required,
+            'volume_lookback': config.volume_lookback
+        })()
 
-            text = message.get("text", "")
-            chat_id = str(message.get("chat", {}).get("id"))
+        df15 = calculate_indicators(df15)
+        df1h['sma'] = get_sma(df1h['close'], 50)
 
-            print(f"📩 Received message: {text} from chat ID: {chat_id}")
+        passed, strategy, message = evaluate_all_entry_conditions(df15, df1h, config_obj)
+
+        if passed:
+            send_msg(f"✅ {symbol} PASSED: {strategy}\n{message}")
+        else:
+            send_msg(f"❌ {symbol} NOT recommended.\n{message}")
+    except Exception as e:
+        send_msg(f"⚠️ Error improving {symbol}: {e}")
 
-            if chat_id not in map(str, config.telegram_allowed_users):
-                print("⛔ Unauthorized user.")
-                continue
 
-            cmd = text.strip().lower()
-            parts = cmd.split()
-
-            if cmd == "/start":
-                is_bot_active["status"] = True
-                send_msg("✅ Bot STARTED. GET RICH 💵")
-            elif cmd == "/stop":
-                is_bot_active["status"] = False
-                send_msg("⛔ Bot STOPPED.")
-            elif cmd == "/status":
-                msg = "🟢 Bot is RUNNING. GET RICH 💵" if is_bot_active["status"] else "🔴 Bot is STOPPED."
-                send_msg(msg)
-            elif cmd == "/panicclose":
-                send_msg("⚠️ Closing all open positions...")
-                panic_close_all_positions()
-            elif cmd == "/cancelall":
-                send_msg("⚠️ Cancelling all open orders...")
-                cancel_all_orders()
-            elif cmd == "/restart":
-                send_msg("♻️ Restarting bot (soft reload)...")
-                os.execlp("python", "python", "main.py")
-            elif cmd == "/rebootserver":
-                send_msg("🔁 Rebooting server...")
-                os.system("reboot")
-
-            elif cmd in ["/balance", "/b"]:
-                send_msg(show_balance())
-            elif cmd == "/portfolio":
-                send_msg(show_portfolio())
-            elif cmd == "/pnl":
-                send_msg(show_pnl())
-            elif cmd == "/fees":
-                send_msg(show_fees())
-            elif cmd == "/maxdrawdown":
-                send_msg(show_max_drawdown())
-            elif cmd == "/openpositions":
-                send_msg(show_open_positions())
-            elif cmd.startswith("/position") and len(parts) == 2:
-                send_msg(show_position_details(parts[1].upper()))
-            elif cmd == "/orders":
-                send_msg(show_pending_orders())
-            elif cmd.startswith("/orderbook") and len(parts) == 2:
-                send_msg(show_orderbook_snapshot(parts[1].upper()))
-            elif cmd.startswith("/recommend") and len(parts) == 2:
-                send_msg(recommend_symbol(parts[1].upper()))
-            elif cmd == "/lastentry":
-                send_msg(show_last_entry())
-            elif cmd == "/lastclose":
-                send_msg(show_last_close())
-
-            elif cmd.startswith("/buy") and len(parts) == 3:
-                try:
-                    amount = float(parts[2])
-                    send_msg(manual_buy(parts[1].upper(), amount))
-                except ValueError:
-                    send_msg("❌ Invalid amount format.")
-            elif cmd.startswith("/sell") and len(parts) == 2:
-                send_msg(manual_sell(parts[1].upper()))
-            elif cmd.startswith("/cancel") and len(parts) == 2:
-                send_msg(manual_cancel(parts[1].upper()))
-            elif cmd.startswith("/takeprofit") and len(parts) == 2:
-                send_msg(trigger_take_profit(parts[1].upper()))
-            elif cmd.startswith("/stoploss") and len(parts) == 2:
-                send_msg(trigger_stop_loss(parts[1].upper()))
-            elif cmd == "/scanner":
-                send_msg(get_scanner_results())
-
-            # ✅ /improve <symbol>
-            elif cmd.startswith("/improve") and len(parts) == 2:
-                try:
-                    from utils.indicators import evaluate_all_entry_conditions, calculate_indicators, get_sma
-                    from utils.dataset import fetch_candles
-
-                    symbol = parts[1].upper()
-                    df15 = fetch_candles(symbol, interval="15m")
-                    df1h = fetch_candles(symbol, interval="1h")
-
-                    if df15 is None or df1h is None:
-                        send_msg(f"⚠️ Unable to fetch data for {symbol}.")
-                        continue
-
-                    config_obj = type('Config', (), {
-                        'min_entry_signals_required': config.min_entry_signals_required,
-                        'volume_lookback': config.volume_lookback
-                    })()
-
-                    df15 = calculate_indicators(df15)
-                    df1h['sma'] = get_sma(df1h['close'], 50)
-
-                    passed, strategy, message = evaluate_all_entry_conditions(df15, df1h, config_obj)
-
-                    if passed:
-                        send_msg(f"✅ {symbol} PASSED: {strategy}\n{message}")
-                    else:
-                        send_msg(f"❌ {symbol} NOT recommended.\n{message}")
-                except Exception as e:
-                    send_msg(f"⚠️ Error improving {symbol}: {e}")
-
-            elif cmd == "/help":
-                send_msg("""✅Available Commands:
+def _metrics(parts):
+    # Loop, exchange and Telegram timings plus cache / queue gauges (utils/metrics.py)
+    send_msg(metrics.summary())
+
+
+HELP_TEXT = """✅Available Commands:
 /start - Start the bot
 /stop - Stop the bot
 /status - Bot status
 /improve <SYMBOL> - Evaluate signal strength
+/metrics - Latencies, loop timings, queues
 
 /balance - USDT balance
 /portfolio - Current portfolio
@@ -198,11 +157,171 @@ def check_telegram_commands():
 /cancelall
 /restart
 /rebootserver
-""")
+"""
+
+# command -> (handler, number of words including the command, lane)
+# 'inline' runs on the polling thread (flag flips only), 'priority' on the emergency workers, 'normal' on the pool
+COMMANDS = {
+    "/start": (_start, 1, 'inline'),
+    "/stop": (_stop, 1, 'inline'),
+    "/status": (_status, 1, 'inline'),
+    "/panicclose": (_panic_close, 1, 'priority'),
+    "/cancelall": (_cancel_all, 1, 'priority'),
+    "/restart": (_restart, 1, 'normal'),
+    "/rebootserver": (_reboot_server, 1, 'normal'),
+    "/balance": (_portfolio_reply('show_balance'), 1, 'normal'),
+    "/b": (_portfolio_reply('show_balance'), 1, 'normal'),
+    "/portfolio": (_portfolio_reply('show_portfolio'), 1, 'normal'),
+    "/pnl": (_portfolio_reply('show_pnl'), 1, 'normal'),
+    "/fees": (_portfolio_reply('show_fees'), 1, 'normal'),
+    "/maxdrawdown": (_portfolio_reply('show_max_drawdown'), 1, 'normal'),
+    "/openpositions": (_portfolio_reply('show_open_positions'), 1, 'normal'),
+    "/position": (_portfolio_reply('show_position_details'), 2, 'normal'),
+    "/orders": (_portfolio_reply('show_pending_orders'), 1, 'normal'),
+    "/orderbook": (_portfolio_reply('show_orderbook_snapshot'), 2, 'normal'),
+    "/recommend": (_portfolio_reply('recommend_symbol'), 2, 'normal'),
+    "/lastentry": (_portfolio_reply('show_last_entry'), 1, 'normal'),
+    "/lastclose": (_portfolio_reply('show_last_close'), 1, 'normal'),
+    "/buy": (_manual_buy, 3, 'normal'),
+    "/sell": (_portfolio_reply('manual_sell'), 2, 'normal'),
+    "/cancel": (_portfolio_reply('manual_cancel'), 2, 'normal'),
+    "/takeprofit": (_portfolio_reply('trigger_take_profit'), 2, 'normal'),
+    "/stoploss": (_portfolio_reply('trigger_stop_loss'), 2, 'normal'),
+    "/scanner": (_portfolio_reply('get_scanner_results'), 1, 'normal'),
+    "/improve": (_improve, 2, 'normal'),
+    "/metrics": (_metrics, 1, 'normal'),
+    "/help": (lambda parts: send_msg(HELP_TEXT), 1, 'inline'),
+}
+
+
+class CommandDispatcher:
+    # Runs commands off the polling thread. Emergency commands have their own workers, so a slow
+    # /scanner or /improve can never hold up /panicclose; the normal pool is bounded and says so when full.
+
+    def __init__(self, commands, workers=4, max_pending=16):
+        self.commands = commands
+        priority_workers = sum(1 for _, _, lane in commands.values() if lane == 'priority')
+        self._priority_pool = ThreadPoolExecutor(
+            max_workers=max(priority_workers, 1), thread_name_prefix='tg-priority',
+            initializer=set_thread_lane, initargs=('critical',)
+        )
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='tg-command',
+            initializer=set_thread_lane, initargs=('background',)
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.in_flight = 0              # regular commands holding a slot
+        self._in_flight_lock = threading.Lock()
+
+    def _run(self, name, handler, parts, release=None):
+        started = time.time()
+        try:
+            handler(parts)
+        except Exception as e:
+            print(f"⚠️ Command {name} failed: {e}")
+            send_msg(f"⚠️ {name} failed: {e}")
+        finally:
+            if release:
+                release()
+        elapsed = time.time() - started
+        metrics.observe('telegram_command_seconds', elapsed, command=name)
+        if elapsed > 5:
+            print(f"🐢 Command {name} took {elapsed:.1f}s")
+
+    def dispatch(self, text):
+        parts = text.strip().lower().split()
+        if not parts:
+            return False
+        entry = self.commands.get(parts[0])
+        if entry is None or len(parts) != entry[1]:
+            return False
+        handler, _, lane = entry
+
+        if lane == 'inline':
+            self._run(parts[0], handler, parts)
+        elif lane == 'priority':
+            self._priority_pool.submit(self._run, parts[0], handler, parts)
+        elif self._slots.acquire(blocking=False):
+            with self._in_flight_lock:
+                self.in_flight += 1
+            self._pool.submit(self._run, parts[0], handler, parts, self._release)
+        else:
+            send_msg(f"⏳ Busy with other commands, {parts[0]} skipped. Try again shortly.")
+        return True
+
+    def _release(self):
+        with self._in_flight_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+dispatcher = CommandDispatcher(
+    COMMANDS,
+    workers=getattr(config, 'telegram_command_workers', 4),
+    max_pending=getattr(config, 'telegram_command_queue', 16)
+)
+metrics.add_collector(lambda: [('telegram_commands_in_flight', {}, dispatcher.in_flight)])
+
+_session = requests.Session()
+
+
+def check_telegram_commands():
+    # Long poll: Telegram answers as soon as a message arrives, or after telegram_long_poll_sec with nothing
+    url = f"https://api.telegram.org/bot{config.telegram_token}/getUpdates"
+    long_poll_sec = getattr(config, 'telegram_long_poll_sec', 25)
+
+    try:
+        params = {"timeout": long_poll_sec, "allowed_updates": '["message"]'}
+        if _last_update_id_holder["value"]:
+            params["offset"] = _last_update_id_holder["value"] + 1
+
+        with metrics.timer('telegram_request_seconds', method='getUpdates'):
+            resp = _session.get(url, params=params, timeout=long_poll_sec + 10)
+        data = resp.json()
+
+        if not data.get("ok"):
+            print("⚠️ Telegram polling failed:", data)
+            metrics.inc('telegram_errors_total', method='getUpdates')
+            return False
+
+        for update in data.get("result", []):
+            _last_update_id_holder["value"] = update["update_id"]
+            message = update.get("message", {})
+            if not message or "text" not in message:
+                continue
+
+            text = message.get("text", "")
+            chat_id = str(message.get("chat", {}).get("id"))
+
+            print(f"📩 Received message: {text} from chat ID: {chat_id}")
+
+            if chat_id not in map(str, config.telegram_allowed_users):
+                print("⛔ Unauthorized user.")
+                continue
+
+            dispatcher.dispatch(text)
+        return True
     except Exception as e:
         print("Telegram command check failed:", e)
+        metrics.inc('telegram_errors_total', method='getUpdates')
+        return False
+
+
+_loop_lock = threading.Lock()
+_loop_running = False
+
 
 def telegram_command_loop():
+    # One polling loop per process; a second call returns immediately
+    global _loop_running
+    with _loop_lock:
+        if _loop_running:
+            return
+        _loop_running = True
+
+    # Info commands queue behind trading on the shared rate limit; /panicclose and /cancelall switch to 'critical'
+    set_thread_lane('background')
     while True:
-        check_telegram_commands()
-        time.sleep(getattr(config, "telegram_poll_delay", 5))  # Default to 5s
+        # Straight back into the next long poll; only wait after a failed one
+        if not check_telegram_commands():
+            time.sleep(getattr(config, "telegram_poll_delay", 5))
@@ -0,0 +1,241 @@
+# utils/trade_journal.py
+#
+# Every fill the bot makes, kept as numpy columns in memory and appended to a
+# fixed-width binary file (FILL_DTYPE records, readable with np.fromfile).
+# Aggregates are updated per fill as it arrives: average-cost inventory per
+# symbol, realized PnL, fees, the equity curve of realized PnL net of fees and
+# its running peak / max drawdown. Reports read those aggregates directly,
+# so they cost the same after ten fills or ten thousand.
+
+import os
+import threading
+import time
+
+import numpy as np
+
+import config
+from utils import clock
+
+FILL_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('symbol', 'S24'),
+    ('side', 'i1'),         # 1 = buy, -1 = sell
+    ('price', '<f8'),
+    ('qty', '<f8'),
+    ('fee', '<f8'),         # in quote currency
+])
+
+SIDES = {'buy': 1, 'sell': -1}
+
+
+class _SymbolStats:
+    __slots__ = ('qty', 'cost', 'realized', 'fees', 'volume', 'buys', 'sells', 'wins', 'losses')
+
+    def __init__(self):
+        self.qty = 0.0
+        self.cost = 0.0             # quote spent on the qty still held (average-cost basis)
+        self.realized = 0.0
+        self.fees = 0.0
+        self.volume = 0.0
+        self.buys = 0
+        self.sells = 0
+        self.wins = 0
+        self.losses = 0
+
+    @property
+    def avg_price(self):
+        return self.cost / self.qty if self.qty > 0 else 0.0
+
+
+class TradeJournal:
+    def __init__(self, path='logs/trade_journal.bin', starting_equity=0.0, fee_rate=0.001, capacity=1024):
+        self.path = path
+        self.starting_equity = float(starting_equity)
+        self.fee_rate = fee_rate
+        self._lock = threading.Lock()
+        self._columns = {name: np.empty(capacity, dtype=FILL_DTYPE[name]) for name in FILL_DTYPE.names}
+        self._columns['pnl'] = np.empty(capacity, dtype='<f8')
+        self._columns['equity'] = np.empty(capacity, dtype='<f8')
+        self.count = 0
+        self.symbols = {}           # symbol -> _SymbolStats
+        self.realized = 0.0
+        self.fees = 0.0
+        self.volume = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.equity = 0.0           # realized PnL net of fees since the journal started
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+
+        if path and os.path.exists(path):
+            self._replay()
+
+    # === Storage ===
+
+    def _replay(self):
+        started = time.time()
+        records = np.fromfile(self.path, dtype=FILL_DTYPE)
+        for r in records:
+            self._apply(float(r['ts']), r['symbol'].decode(), int(r['side']), float(r['price']),
+                        float(r['qty']), float(r['fee']))
+        if len(records):
+            print(f"📒 Trade journal: {len(records)} fills loaded in {(time.time() - started) * 1000:.0f}ms")
+
+    def _append_file(self, record):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            record.tofile(f)
+
+    def _grow(self):
+        for name, column in self._columns.items():
+            grown = np.empty(len(column) * 2, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self._columns[name] = grown
+
+    # === Fills ===
+
+    def _apply(self, ts, symbol, side, price, qty, fee):
+        stats = self.symbols.get(symbol)
+        if stats is None:
+            stats = self.symbols[symbol] = _SymbolStats()
+
+        pnl = 0.0
+        if side > 0:
+            stats.qty += qty
+            stats.cost += price * qty
+            stats.buys += 1
+        else:
+            # Sells realize against the average cost of what's held; anything beyond it (bought
+            # before the journal existed) has no known basis and realizes nothing
+            matched = min(qty, stats.qty)
+            if matched > 0:
+                basis = stats.avg_price * matched
+                pnl = price * matched - basis
+                stats.cost -= basis
+                stats.qty -= matched
+                if stats.qty <= 1e-12:
+                    stats.qty = stats.cost = 0.0
+            stats.sells += 1
+            if pnl > 0:
+                stats.wins += 1
+                self.wins += 1
+            elif pnl < 0:
+                stats.losses += 1
+                self.losses += 1
+
+        stats.realized += pnl
+        stats.fees += fee
+        stats.volume += price * qty
+        self.realized += pnl
+        self.fees += fee
+        self.volume += price * qty
+        self.equity += pnl - fee
+        self.peak = max(self.peak, self.equity)
+        drawdown = self.peak - self.equity
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+            base = self.starting_equity + self.peak
+            self.max_drawdown_pct = drawdown / base if base > 0 else 0.0
+
+        if self.count == len(self._columns['ts']):
+            self._grow()
+        i = self.count
+        for name, value in (('ts', ts), ('symbol', symbol.encode()), ('side', side), ('price', price),
+                            ('qty', qty), ('fee', fee), ('pnl', pnl), ('equity', self.equity)):
+            self._columns[name][i] = value
+        self.count += 1
+        return pnl
+
+    def record_fill(self, symbol, side, price, qty, fee=None, ts=None):
+        # fee: quote amount, a ccxt fee dict, or None to estimate it from fee_rate
+        if not qty or qty <= 0 or not price:
+            return 0.0
+        price, qty = float(price), float(qty)
+        if isinstance(fee, dict):
+            cost = fee.get('cost')
+            if cost is None:
+                fee = None
+            elif fee.get('currency') and fee['currency'] == symbol.split('/')[0]:
+                fee = float(cost) * price   # charged in the base asset
+            else:
+                fee = float(cost)
+        if fee is None:
+            fee = price * qty * self.fee_rate
+        ts = clock.now() if ts is None else ts
+
+        record = np.array([(ts, symbol.encode(), SIDES[side], price, qty, fee)], dtype=FILL_DTYPE)
+        with self._lock:
+            pnl = self._apply(ts, symbol, SIDES[side], price, qty, fee)
+            if self.path:
+                self._append_file(record)
+        return pnl
+
+    def record_order(self, symbol, side, order, price=None, qty=None):
+        # Record whatever a ccxt order reports as filled, falling back to the requested price / qty
+        order = order or {}
+        filled = order.get('filled')
+        if filled is None and order.get('status') in ('closed', None):
+            filled = qty                    # market orders often come back with only an id
+        return self.record_fill(symbol, side, fill_price(order, price), filled, order.get('fee'))
+
+    # === Reads ===
+
+    def column(self, name):
+        with self._lock:
+            return self._columns[name][:self.count].copy()
+
+    def equity_curve(self):
+        return self.column('ts'), self.column('equity')
+
+    def summary(self):
+        with self._lock:
+            decided = self.wins + self.losses
+            return {
+                'fills': self.count,
+                'realized': self.realized,
+                'fees': self.fees,
+                'net': self.equity,
+                'wins': self.wins,
+                'losses': self.losses,
+                'win_rate': self.wins / decided if decided else 0.0,
+                'volume': self.volume,
+                'peak': self.peak,
+                'drawdown': self.peak - self.equity,
+                'max_drawdown': self.max_drawdown,
+                'max_drawdown_pct': self.max_drawdown_pct,
+            }
+
+    def symbol_stats(self):
+        with self._lock:
+            return {
+                symbol: {
+                    'qty': s.qty, 'avg_price': s.avg_price, 'cost': s.cost, 'realized': s.realized,
+                    'fees': s.fees, 'volume': s.volume, 'buys': s.buys, 'sells': s.sells,
+                    'wins': s.wins, 'losses': s.losses,
+                }
+                for symbol, s in self.symbols.items()
+            }
+
+    def open_positions(self):
+        return {symbol: s for symbol, s in self.symbol_stats().items() if s['qty'] > 0}
+
+
+def fill_price(order, default=None):
+    # Average fill price of a ccxt order: average, else cost / filled, else its limit price, else default
+    order = order or {}
+    if order.get('average'):
+        return float(order['average'])
+    if order.get('cost') and order.get('filled'):
+        return float(order['cost']) / float(order['filled'])
+    return order.get('price') or default
+
+
+# Shared journal: bot records fills, utils/portfolio reports from it
+trade_journal = TradeJournal(
+    getattr(config, 'trade_journal_path', 'logs/trade_journal.bin'),
+    starting_equity=getattr(config, 'budget_usdt', 0),
+    fee_rate=getattr(config, 'trade_fee_rate', 0.001)
+)
@@ -1,6 +1,53 @@
 import ccxt, time
+import pandas as pd
 
-def get_top_volatile_tokens(exchange, top_n=1, interval='15m', min_volume=500000, min_change_percent=2, max_price=None):
+
+def _fetch_tickers_bulk(exchange, symbols, batch_size=None):
+    # ✅ One call for the whole market, or a few chunked calls if batch_size is set
+    if not batch_size:
+        tickers = exchange.fetch_tickers()
+        return {s: tickers[s] for s in symbols if s in tickers}
+
+    tickers = {}
+    for i in range(0, len(symbols), batch_size):
+        tickers.update(exchange.fetch_tickers(symbols[i:i + batch_size]))
+    return tickers
+
+
+def _fetch_tickers_per_symbol(exchange, symbols):
+    tickers = {}
+    for symbol in symbols:
+        try:
+            tickers[symbol] = exchange.fetch_ticker(symbol)
+        except Exception:
+            pass  # Ignore symbols that fail
+
+        time.sleep(exchange.rateLimit / 1000)
+    return tickers
+
+
+def rank_volatile_tickers(tickers, top_n=1, min_volume=500000, min_change_percent=2, max_price=None):
+    if not tickers:
+        return []
+
+    table = pd.DataFrame(
+        [(s, t.get('percentage'), t.get('quoteVolume'), t.get('last')) for s, t in tickers.items()],
+        columns=['symbol', 'percent', 'volume', 'price']
+    )
+    for col in ('percent', 'volume', 'price'):
+        table[col] = pd.to_numeric(table[col], errors='coerce')
+
+    mask = (table['percent'] >= min_change_percent) & (table['volume'] >= min_volume) & (table['price'] > 0)
+    if max_price is not None:
+        mask &= table['price'] <= max_price
+
+    # Sort by percent change descending (stable, so ties keep market order)
+    top = table[mask].sort_values('percent', ascending=False, kind='mergesort').head(top_n)
+    return [(s, float(p), float(v)) for s, p, v in zip(top['symbol'], top['percent'], top['volume'])]
+
+
+def get_top_volatile_tokens(exchange, top_n=1, interval='15m', min_volume=500000, min_change_percent=2, max_price=None,
+                            scan_mode='bulk', batch_size=None):
     try:
         markets = exchange.load_markets()
     except Exception as e:
@@ -8,23 +55,19 @@ def get_top_volatile_tokens(exchange, top_n=1, interval='15m', min_volume=500000
         return []
 
     usdt_pairs = [s for s in markets if s.endswith('/USDT') and markets[s].get('active', False)]
-    volatile_tokens = []
 
-    for symbol in usdt_pairs:
+    tickers = None
+    if scan_mode == 'bulk' and exchange.has.get('fetchTickers'):
         try:
-            ticker = exchange.fetch_ticker(symbol)
-            percent = ticker.get('percentage', 0)
-            vol = ticker.get('quoteVolume', 0)
-            price = ticker.get('last', 0)
-
-            if percent >= min_change_percent and vol >= min_volume:
-                if price and (max_price is None or price <= max_price):
-                    volatile_tokens.append((symbol, percent, vol))
-        except Exception:
-            continue  # Ignore symbols that fail
+            tickers = _fetch_tickers_bulk(exchange, usdt_pairs, batch_size)
+        except ccxt.NotSupported:
+            tickers = None
+        except Exception as e:
+            print(f"⚠️ Bulk ticker fetch failed: {e}")
+            return []
 
-        time.sleep(exchange.rateLimit / 1000)
+    # Per-symbol fallback only when bulk tickers are unsupported (or explicitly requested)
+    if tickers is None:
+        tickers = _fetch_tickers_per_symbol(exchange, usdt_pairs)
 
-    # Sort by percent change descending
-    volatile_tokens.sort(key=lambda x: x[1], reverse=True)
-    return volatile_tokens[:top_n]
+    return rank_volatile_tickers(tickers, top_n, min_volume, min_change_percent, max_price)